@@ -9,10 +9,13 @@ sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='repla
 
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 from pydantic import BaseModel
 from typing import Optional, List, Annotated
 import threading
+import asyncio
+import json
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import os
@@ -30,6 +33,11 @@ print("🔍 환경변수 로드 중...")
 load_dotenv(dotenv_path="../../.env")
 print("✅ .env 파일 로드 시도 완료")
 
+# 블로킹 모델 추론용 워커 풀 (환경변수 로드 이후 생성)
+from services.common.worker_pools import cpu_pool, io_pool, get_pool_stats
+from services.common.model_registry import model_registry
+from services.common.embedding_cache import embedding_cache
+
 # 주요 API 키 확인
 api_keys = {
     "ELEVEN_ST_API_KEY": os.getenv("ELEVEN_ST_API_KEY"),
@@ -1038,7 +1046,11 @@ GEMINI_HAIR_CHECK_AVAILABLE = False
 
 # Swin Hair Classification 모듈
 try:
-    from services.swin_hair_classification.hair_swin_check import analyze_hair_with_swin
+    from services.swin_hair_classification.hair_swin_check import (
+        analyze_hair_with_swin, classify_hair_with_swin, generate_result_text,
+        build_classification_payload, build_text_payload, generate_title_and_description_fallback,
+        get_batching_stats, get_cache_stats, start_llm_prewarm, warm_up_models, get_model_states
+    )
     SWIN_HAIR_CHECK_AVAILABLE = True
     print("Swin Hair Check 모듈 로드 성공")
 except ImportError as e:
@@ -1100,12 +1112,110 @@ def health_check():
     """헬스 체크 엔드포인트"""
     return {"status": "healthy", "service": "python-backend-integrated"}
 
+# 서버 시작 시 모델을 미리 로드하고 더미 forward로 워밍업 (기본 비활성화 → 첫 요청 시 로드)
+EAGER_MODEL_WARMUP = os.getenv("EAGER_MODEL_WARMUP", "false").lower() == "true"
+
+def _warm_up_all_models():
+    """Swin/BiSeNet, RAG 분석기 워밍업 (백그라운드 스레드에서 실행)"""
+    if SWIN_HAIR_CHECK_AVAILABLE:
+        try:
+            warm_up_models()
+        except Exception as e:
+            print(f"Swin 모델 워밍업 실패: {e}")
+    if HAIR_RAG_AVAILABLE:
+        try:
+            from services.hair_classification_rag.api.router import warm_up_analyzer
+            warm_up_analyzer()
+        except Exception as e:
+            print(f"RAG 분석기 워밍업 실패: {e}")
+
+@app.on_event("startup")
+def start_model_warmup():
+    if EAGER_MODEL_WARMUP:
+        threading.Thread(target=_warm_up_all_models, name="model-warmup", daemon=True).start()
+
+@app.get("/ready")
+def readiness_check():
+    """
+    모델별 로드 상태 (오케스트레이터 readiness probe용)
+    EAGER_MODEL_WARMUP 활성화 시 모든 모델 워밍업이 끝나야 200, 그 전에는 503
+    """
+    models = {}
+    ready = True
+    if SWIN_HAIR_CHECK_AVAILABLE:
+        swin_states = get_model_states()
+        models["swin"] = swin_states
+        ready = ready and swin_states["warm"]
+    if HAIR_RAG_AVAILABLE:
+        try:
+            from services.hair_classification_rag.api.router import get_analyzer_state
+            rag_state = get_analyzer_state()
+        except Exception as e:
+            rag_state = {"state": "failed", "error": str(e)}
+        models["hair_rag"] = rag_state
+        ready = ready and rag_state["state"] == "warm"
+
+    if not EAGER_MODEL_WARMUP:
+        # 지연 로드 모드에서는 첫 요청 시 로드하므로 항상 트래픽 수신 가능
+        ready = True
+
+    content = {"ready": ready, "eager_warmup": EAGER_MODEL_WARMUP, "models": models}
+    return JSONResponse(content=content, status_code=200 if ready else 503)
+
+@app.on_event("startup")
+def start_model_idle_evictor():
+    """유휴 모델 해제 스레드 (MODEL_IDLE_EVICT_SECONDS > 0일 때만)"""
+    model_registry.start_idle_evictor()
+
+@app.get("/debug/models")
+def debug_models():
+    """공유 모델 레지스트리 상태 (모델별 로드 시간, 파라미터 수, RSS 증가량, 유휴 시간)"""
+    return model_registry.stats()
+
+@app.get("/debug/embedding-cache")
+def debug_embedding_cache():
+    """공유 임베딩 캐시 상태 (RAG ConvNeXt/ViT + 데일리 CLIP, 모델별 메모리 / 디스크 적중률)"""
+    return embedding_cache.stats()
+
+@app.get("/worker-pools")
+def worker_pools_status():
+    """CPU/IO 워커 풀 상태 (실행 중 작업 수, 대기열 깊이, 거절 수)"""
+    return get_pool_stats()
+
 # --- Gemini 탈모 사진 분석 엔드포인트 (제거됨) ---
 # Swin Transformer 및 RAG 기반 분석으로 대체
 # 참조: /hair_swin_check, /api/hair-classification-rag/analyze-upload
 
 
 # --- Swin 탈모 사진 분석 전용 엔드포인트 ---
+# 스트리밍 모드에서 LLM 텍스트를 기다리는 최대 시간 (초과 시 기본 템플릿)
+SWIN_LLM_DEADLINE_SECONDS = float(os.getenv("SWIN_LLM_DEADLINE_SECONDS", "8"))
+
+async def _stream_hair_swin_result(fused_result: dict, cache_key, survey_data: Optional[dict], has_side_image: bool):
+    """
+    NDJSON 2단계 응답
+    1. classification: 융합된 stage / confidence / 가중치 (바로 전송)
+    2. text: LLM 제목 / 설명 / 조언 (마감 시간 초과 또는 실패 시 기본 템플릿, fallback=true)
+    """
+    yield json.dumps({"event": "classification", **build_classification_payload(fused_result)}, ensure_ascii=False) + "\n"
+
+    # 마감 시간이 지나도 LLM 호출은 백그라운드에서 끝까지 실행 → 결과는 캐시에 남아 재요청 시 사용
+    llm_task = asyncio.ensure_future(
+        io_pool.run(generate_result_text, fused_result, survey_data, has_side_image, cache_key))
+    llm_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    fallback = False
+    try:
+        llm_result = await asyncio.wait_for(asyncio.shield(llm_task), timeout=SWIN_LLM_DEADLINE_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"--- [DEBUG] LLM 마감 시간 초과 ({SWIN_LLM_DEADLINE_SECONDS}s) - 기본 템플릿 사용 ---")
+        llm_result, fallback = generate_title_and_description_fallback(fused_result['stage']), True
+    except Exception as e:
+        print(f"--- [DEBUG] LLM 포장 실패: {e} - 기본 템플릿 사용 ---")
+        llm_result, fallback = generate_title_and_description_fallback(fused_result['stage']), True
+
+    yield json.dumps({"event": "text", **build_text_payload(llm_result), "fallback": fallback}, ensure_ascii=False) + "\n"
+
 @app.post("/hair_swin_check")
 async def api_hair_swin_check(
     top_image: Annotated[UploadFile, File(...)],
@@ -1114,13 +1224,16 @@ async def api_hair_swin_check(
     age: Optional[str] = Form(None),
     familyHistory: Optional[str] = Form(None),
     recentHairLoss: Optional[str] = Form(None),
-    stress: Optional[str] = Form(None)
+    stress: Optional[str] = Form(None),
+    stream: bool = Query(False)
 ):
     """
     multipart/form-data로 전송된 Top/Side 이미지를 Swin으로 분석하여 표준 결과를 반환
     Side 이미지는 optional (여성의 경우 없을 수 있음)
     설문 데이터도 함께 받아서 동적 가중치 계산에 사용
 
+    ?stream=true: NDJSON 스트리밍 (분류 결과 이벤트 → LLM 텍스트 이벤트)
+
     ✅ 이미지 검증 추가: BiSeNet 귀 감지로 Top/Side 이미지 타입 검증
     """
     if not SWIN_HAIR_CHECK_AVAILABLE:
@@ -1148,8 +1261,17 @@ async def api_hair_swin_check(
             }
             print(f"--- [DEBUG] Survey data received: {survey_data} ---")
 
-        # bytes 데이터와 설문 데이터를 함께 전달
-        result = analyze_hair_with_swin(top_image_bytes, side_image_bytes, survey_data)
+        if stream:
+            # 분류는 먼저 끝내고 (오류는 HTTP 상태 코드로 전달), LLM 텍스트는 스트림으로 이어서 전송
+            fused_result, cache_key = await cpu_pool.run(
+                classify_hair_with_swin, top_image_bytes, side_image_bytes, survey_data)
+            return StreamingResponse(
+                _stream_hair_swin_result(fused_result, cache_key, survey_data, bool(side_image_bytes)),
+                media_type="application/x-ndjson"
+            )
+
+        # bytes 데이터와 설문 데이터를 함께 전달 (CPU 워커 풀에서 실행, 이벤트 루프 블로킹 방지)
+        result = await cpu_pool.run(analyze_hair_with_swin, top_image_bytes, side_image_bytes, survey_data)
 
         return result
     except HTTPException:
@@ -1159,6 +1281,26 @@ async def api_hair_swin_check(
         print(f"--- [DEBUG] Swin Error: {str(e)} ---")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/hair_swin_check/batching-stats")
+def api_hair_swin_batching_stats():
+    """Swin 마이크로 배칭 스케줄러 통계 (배치 크기 / 큐 대기 시간 히스토그램)"""
+    if not SWIN_HAIR_CHECK_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Swin 분석 모듈이 활성화되지 않았습니다.")
+    return get_batching_stats()
+
+@app.get("/hair_swin_check/cache-stats")
+def api_hair_swin_cache_stats():
+    """Swin 분석 결과 캐시 통계 (분류 결과 / LLM 텍스트 적중률, 사용 크기)"""
+    if not SWIN_HAIR_CHECK_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Swin 분석 모듈이 활성화되지 않았습니다.")
+    return get_cache_stats()
+
+@app.on_event("startup")
+def start_swin_llm_prewarm():
+    """Gemini 모델 선택 + LLM 포장 캐시 예열 (백그라운드)"""
+    if SWIN_HAIR_CHECK_AVAILABLE:
+        start_llm_prewarm()
+
 # --- 네이버 지역 검색 API 프록시 ---
 @app.get("/api/naver/local/search")
 async def search_naver_local(query: str):
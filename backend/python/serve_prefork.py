@@ -0,0 +1,222 @@
+"""
+Pre-fork 서빙 모드 (Linux 전용, CPU 추론)
+마스터 프로세스에서 app과 모든 모델 가중치(CLIP 3종, ConvNeXt-L, ViT-S, Swin Top/Side, BiSeNet)를 먼저 로드한 뒤
+uvicorn 워커를 fork → 가중치 페이지를 워커끼리 copy-on-write로 공유 (워커 수만큼 RSS가 늘어나지 않음)
+
+실행 (backend/python 디렉토리에서):
+    python serve_prefork.py --workers 4 --port 8000
+
+주의:
+    - fork 이후 CUDA를 쓸 수 없으므로 CPU 전용 (CUDA_VISIBLE_DEVICES= 로 실행)
+    - 마스터에서는 모델 로드만 하고 forward는 실행하지 않음 (워밍업은 각 워커의 EAGER_MODEL_WARMUP에서 실행)
+    - SWIN_MICRO_BATCHING 스레드는 fork 후 살아남지 않으므로 이 모드에서는 사용 불가
+    - SWIN_INFERENCE_BACKEND=onnx면 Swin / BiSeNet은 마스터에서 로드하지 않음
+      (ONNX Runtime 세션의 스레드 풀은 fork 후 살아남지 않으므로 각 워커가 첫 요청 때 세션을 생성)
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def log(message: str):
+    print(f"[prefork:{os.getpid()}] {message}", flush=True)
+
+
+def read_memory_mb(pid: int) -> dict:
+    """프로세스 RSS / PSS / 공유 메모리 (MB) - /proc 기준"""
+    memory = {'rss': None, 'pss': None, 'shared': None}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    memory[key.lower()] = round(int(value.split()[0]) / 1024, 1)
+                elif key in ('Shared_Clean', 'Shared_Dirty'):
+                    memory['shared'] = round((memory['shared'] or 0) + int(value.split()[0]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+def preload_models() -> dict:
+    """모든 서빙 모델을 마스터 프로세스에서 로드 (모델별 소요 시간 반환)"""
+    timings = {}
+
+    started = time.perf_counter()
+    from app import app  # noqa: F401 - import 시 CLIP 앙상블 등 모듈 수준 모델이 로드됨
+    timings['app_import'] = time.perf_counter() - started
+
+    try:
+        from services.swin_hair_classification.hair_swin_check import SWIN_INFERENCE_BACKEND, initialize_models
+        if SWIN_INFERENCE_BACKEND == "onnx":
+            log("SWIN_INFERENCE_BACKEND=onnx - Swin / BiSeNet 세션은 fork 후 각 워커에서 생성")
+        else:
+            started = time.perf_counter()
+            initialize_models()
+            timings['swin_bisenet'] = time.perf_counter() - started
+    except ImportError as e:
+        log(f"Swin 모듈 없음, 건너뜀: {e}")
+
+    try:
+        from services.hair_classification_rag.api.router import get_analyzer
+        started = time.perf_counter()
+        get_analyzer()
+        timings['hair_rag'] = time.perf_counter() - started
+    except Exception as e:
+        log(f"RAG 분석기 로드 실패, 워커에서 지연 로드: {e}")
+
+    return timings
+
+
+def iter_torch_modules():
+    """마스터에서 로드된 torch 모듈 (이름, 모듈)"""
+    import torch.nn as nn
+    from services.common.model_registry import model_registry
+
+    for name, model in model_registry.loaded_models().items():
+        if isinstance(model, nn.Module):
+            yield name, model
+
+    try:
+        from services.hair_loss_daily.services.clip_ensemble_service import clip_ensemble_service
+        for name, config in clip_ensemble_service.models.items():
+            yield f"clip_{name}", config['model']
+    except ImportError:
+        pass
+
+    try:
+        from services.hair_classification_rag.api import router as rag_router
+        if rag_router.analyzer is not None:
+            processor = rag_router.analyzer.image_processor
+            for name in ('conv_model', 'vit_model'):
+                if getattr(processor, name, None) is not None:
+                    yield name, getattr(processor, name)
+    except ImportError:
+        pass
+
+
+def freeze_weights(share_memory: bool) -> int:
+    """
+    fork 전에 가중치 고정
+    - requires_grad 해제 + eval (워커에서 가중치 페이지에 쓰지 않도록)
+    - share_memory=True면 텐서를 공유 메모리로 이동 (CoW 대신 명시적 공유)
+    - gc.freeze()로 마스터 객체를 GC 추적에서 제외 (GC가 객체 헤더를 건드려 페이지가 복사되는 것 방지)
+    """
+    count = 0
+    for _, module in iter_torch_modules():
+        module.eval()
+        for param in module.parameters():
+            param.requires_grad_(False)
+        if share_memory:
+            module.share_memory()
+        count += 1
+    gc.collect()
+    gc.freeze()
+    return count
+
+
+def run_worker(sock: socket.socket, torch_threads: int):
+    """fork된 워커: 마스터가 연 소켓으로 uvicorn 서버 실행"""
+    import torch
+    import uvicorn
+    from app import app
+
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+        # cpu_pool 스레드는 이 워커의 몫을 다시 풀 워커 수로 나눠 씀 (services/common/worker_pools.py)
+        os.environ["CPU_POOL_CORES"] = str(torch_threads)
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork uvicorn 서빙 (모델 가중치 copy-on-write 공유)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--share-memory", action="store_true", help="가중치를 공유 메모리로 이동 (기본: CoW 공유)")
+    parser.add_argument("--torch-threads", type=int, default=0,
+                        help="워커별 torch 스레드 수 (0이면 CPU 코어 수 / 워커 수)")
+    parser.add_argument("--report-delay", type=float, default=15.0, help="워커 메모리 리포트 시점 (fork 후 초)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        log("fork를 지원하지 않는 OS입니다 (Linux 전용). uvicorn app:app 으로 실행하세요.")
+        return 1
+
+    # 배처 스레드는 initialize_models()에서 시작되므로 로드 전에 확인
+    if os.getenv("SWIN_MICRO_BATCHING", "false").lower() == "true":
+        log("SWIN_MICRO_BATCHING 스레드는 fork 후 동작하지 않습니다. SWIN_MICRO_BATCHING=false로 실행하세요.")
+        return 1
+
+    startup_started = time.perf_counter()
+    timings = preload_models()
+
+    import torch
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        log("CUDA가 초기화된 뒤에는 fork할 수 없습니다. CUDA_VISIBLE_DEVICES= 로 CPU 실행하세요.")
+        return 1
+
+    frozen = freeze_weights(args.share_memory)
+    master_memory = read_memory_mb(os.getpid())
+    log(f"모델 {frozen}개 로드/고정 완료 - " +
+        ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items()))
+    log(f"마스터 메모리: RSS {master_memory['rss']}MB")
+
+    # 마스터가 소켓을 열고 워커가 상속 (SO_REUSEADDR)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, torch_threads)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    log(f"워커 {len(children)}개 시작 (pid={children}, torch 스레드 {torch_threads}), "
+        f"총 기동 시간 {time.perf_counter() - startup_started:.1f}s")
+
+    def _forward_signal(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _forward_signal)
+    signal.signal(signal.SIGINT, _forward_signal)
+
+    # 워커 메모리 리포트 (PSS는 공유 페이지를 나눠 계산한 실제 부담분)
+    time.sleep(args.report_delay)
+    for child in children:
+        memory = read_memory_mb(child)
+        log(f"워커 {child}: RSS {memory['rss']}MB / PSS {memory['pss']}MB / 공유 {memory['shared']}MB")
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid in children:
+            children.remove(pid)
+            log(f"워커 종료: {pid}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""
+서비스 공용 유틸리티 모듈
+"""
+from .worker_pools import BoundedWorkerPool, WorkerPoolFullError, cpu_pool, io_pool, get_pool_stats
+
+__all__ = [
+    "BoundedWorkerPool",
+    "WorkerPoolFullError",
+    "cpu_pool",
+    "io_pool",
+    "get_pool_stats",
+]
@@ -0,0 +1,280 @@
+"""
+프로세스 전역 임베딩 캐시 (같은 사진 재업로드 시 모델 forward 생략)
+- 키: (이미지 내용 해시, 모델 이름, 가중치 / 전처리 플래그)
+- 1단계: 메모리 LRU (EMBEDDING_CACHE_MAX_ENTRIES개)
+- 2단계: 디스크 (EMBEDDING_CACHE_DIR 설정 시) - 차원별 float32 파일을 memmap으로 읽고,
+  키 → (차원, 행) 인덱스는 append-only 로그로 기록 (pre-fork 워커끼리 같은 디렉토리 공유 가능)
+- 모델별 / 단계별 적중률은 stats()로 확인 (/debug/embedding-cache)
+
+캐시에서 꺼낸 배열은 복사본이므로 호출하는 쪽에서 제자리 연산을 해도 캐시가 오염되지 않는다.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows - 디스크 단계는 단일 프로세스 사용 전제
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.log"
+
+
+def hash_bytes(data: bytes) -> str:
+    """업로드 바이트 해시 (blake2b-128)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# id(이미지 객체) → (약한 참조, 해시) - 이미지가 해제되면 콜백으로 항목 삭제
+# image.info에 넣으면 crop / convert / resize 결과로 복사되어 다른 픽셀에 같은 해시가 붙으므로 쓰지 않음
+# (PIL Image는 __eq__를 정의해서 해시 불가 → WeakKeyDictionary 대신 id 기준)
+_image_hashes: Dict[int, Tuple[Any, str]] = {}
+_image_hashes_lock = threading.Lock()
+
+
+def _forget_image(key: int):
+    with _image_hashes_lock:
+        _image_hashes.pop(key, None)
+
+
+def hash_image(image) -> str:
+    """
+    PIL 이미지 픽셀 해시 (모드 / 크기 포함)
+    같은 이미지 객체는 살아 있는 동안 다시 계산하지 않음 (해시 후 제자리 수정하는 경우는 고려하지 않음)
+    """
+    key = id(image)
+    with _image_hashes_lock:
+        entry = _image_hashes.get(key)
+    if entry is not None and entry[0]() is image:
+        return entry[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    image_hash = digest.hexdigest()
+    try:
+        ref = weakref.ref(image, lambda _, key=key: _forget_image(key))
+    except TypeError:
+        return image_hash
+    with _image_hashes_lock:
+        _image_hashes[key] = (ref, image_hash)
+    return image_hash
+
+
+class _DiskTier:
+    """차원별 memmap float32 파일 + append-only 인덱스 로그"""
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._index_offset = 0
+        self._maps: Dict[int, np.memmap] = {}
+        self._full_logged = False
+        self._lock = threading.Lock()
+        self._read_new_entries()
+
+    def _vectors_path(self, dim: int) -> str:
+        return os.path.join(self.directory, f"vectors_{dim}.f32")
+
+    def _read_new_entries(self):
+        """다른 프로세스가 추가한 인덱스 줄까지 반영 (마지막으로 읽은 위치부터)"""
+        try:
+            if os.path.getsize(self.index_path) <= self._index_offset:
+                return
+        except OSError:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]  # 쓰는 중인 마지막 줄은 다음에 읽음
+        for line in complete.decode('utf-8').splitlines():
+            try:
+                key, dim, row = line.split('\t')
+                self.index[key] = (int(dim), int(row))
+            except ValueError:
+                continue
+        self._index_offset += len(complete)
+
+    def _vector(self, dim: int, row: int) -> Optional[np.ndarray]:
+        mapped = self._maps.get(dim)
+        if mapped is None or row >= mapped.shape[0]:
+            path = self._vectors_path(dim)
+            rows = os.path.getsize(path) // (dim * 4)
+            if row >= rows:
+                return None
+            mapped = np.memmap(path, dtype=np.float32, mode='r', shape=(rows, dim))
+            self._maps[dim] = mapped
+        return np.array(mapped[row])
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            location = self.index.get(key)
+            if location is None:
+                self._read_new_entries()
+                location = self.index.get(key)
+            if location is None:
+                return None
+            try:
+                return self._vector(*location)
+            except OSError:
+                return None
+
+    def put(self, key: str, vector: np.ndarray):
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(-1)
+        dim = vector.shape[0]
+        with self._lock:
+            if key in self.index:
+                return
+            if len(self.index) >= self.max_entries:
+                if not self._full_logged:
+                    logger.warning(f"[embedding_cache] 디스크 캐시가 가득 찼습니다 ({self.max_entries}개) - 메모리 캐시만 사용")
+                    self._full_logged = True
+                return
+
+            with open(self.index_path, 'ab') as index_file:
+                if fcntl is not None:
+                    fcntl.flock(index_file, fcntl.LOCK_EX)
+                try:
+                    # 벡터를 먼저 쓰고 인덱스 줄을 나중에 써서, 다른 프로세스는 완성된 벡터만 보게 함
+                    with open(self._vectors_path(dim), 'ab') as vectors_file:
+                        row = vectors_file.tell() // (dim * 4)
+                        vectors_file.write(vector.tobytes())
+                    index_file.write(f"{key}\t{dim}\t{row}\n".encode('utf-8'))
+                    index_file.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(index_file, fcntl.LOCK_UN)
+            self.index[key] = (dim, row)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class EmbeddingCache:
+    """(이미지 해시, 모델 이름, 전처리 플래그) → 임베딩 2단계 캐시"""
+
+    def __init__(self, max_entries: int = 4096, disk_dir: str = None, disk_max_entries: int = 200000):
+        self.max_entries = max(0, max_entries)
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_dir:
+            try:
+                self._disk = _DiskTier(disk_dir, disk_max_entries)
+            except OSError as e:
+                logger.warning(f"[embedding_cache] 디스크 캐시 비활성화 ({disk_dir}): {e}")
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self._disk is not None
+
+    @staticmethod
+    def make_key(image_hash: str, model_name: str, flags: str = "") -> str:
+        return f"{model_name}|{flags}|{image_hash}"
+
+    def _count(self, model_name: str, field: str):
+        counts = self._counts.setdefault(model_name, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+        counts[field] += 1
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, image_hash: str, model_name: str, flags: str = "") -> Optional[np.ndarray]:
+        """캐시된 임베딩 복사본 (없으면 None)"""
+        if not self.enabled:
+            return None
+        key = self.make_key(image_hash, model_name, flags)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._count(model_name, 'memory_hits')
+                return vector.copy()
+
+        vector = self._disk.get(key) if self._disk is not None else None
+        with self._lock:
+            if vector is None:
+                self._count(model_name, 'misses')
+                return None
+            self._count(model_name, 'disk_hits')
+            self._remember(key, vector)
+        return vector.copy()
+
+    def put(self, image_hash: str, model_name: str, flags: str, embedding: np.ndarray):
+        if not self.enabled or embedding is None:
+            return
+        key = self.make_key(image_hash, model_name, flags)
+        vector = np.array(embedding, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._remember(key, vector)
+        if self._disk is not None:
+            try:
+                self._disk.put(key, vector)
+            except OSError as e:
+                logger.warning(f"[embedding_cache] 디스크 캐시 쓰기 실패: {e}")
+
+    def get_or_compute(self, image_hash: str, model_name: str, flags: str,
+                       compute: Callable[[], Optional[np.ndarray]]) -> Optional[np.ndarray]:
+        """캐시에 없으면 compute()로 계산 후 저장 (None 결과는 저장하지 않음)"""
+        vector = self.get(image_hash, model_name, flags)
+        if vector is not None:
+            return vector
+        vector = compute()
+        if vector is not None:
+            self.put(image_hash, model_name, flags, vector)
+        return vector
+
+    def clear(self):
+        """메모리 단계만 비움 (디스크 파일은 서버를 내린 뒤 디렉토리째 삭제)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """/debug/embedding-cache 응답 (모델별 메모리 / 디스크 적중률)"""
+        with self._lock:
+            models = {}
+            totals = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+            for model_name, counts in self._counts.items():
+                lookups = sum(counts.values())
+                models[model_name] = {
+                    **counts,
+                    'hit_rate': round((counts['memory_hits'] + counts['disk_hits']) / lookups, 4) if lookups else None
+                }
+                for field, value in counts.items():
+                    totals[field] += value
+            lookups = sum(totals.values())
+            return {
+                'enabled': self.enabled,
+                'memory': {'entries': len(self._memory), 'max_entries': self.max_entries},
+                'disk': ({'dir': self._disk.directory, 'entries': len(self._disk), 'max_entries': self._disk.max_entries}
+                         if self._disk is not None else None),
+                **totals,
+                'hit_rate': round((totals['memory_hits'] + totals['disk_hits']) / lookups, 4) if lookups else None,
+                'models': models
+            }
+
+
+# 전역 캐시 (EMBEDDING_CACHE_MAX_ENTRIES=0 + EMBEDDING_CACHE_DIR 미설정이면 비활성화)
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "4096")),
+    disk_dir=os.getenv("EMBEDDING_CACHE_DIR") or None,
+    disk_max_entries=int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", "200000"))
+)
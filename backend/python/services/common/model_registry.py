@@ -0,0 +1,220 @@
+"""
+프로세스 전역 모델 레지스트리
+- 모델을 이름으로 한 번만 로드하고, 모든 서비스가 같은 인스턴스를 공유 (BiSeNet, Top Swin 등)
+- 모델별 로드 시간 / 파라미터 수 / 로드 전후 RSS 증가량 기록
+- 설정 시간 동안 사용되지 않은 모델은 레지스트리에서 해제 (pinned 모델 제외)
+
+모델을 오래 붙잡아 두는 쪽은 on_evict 콜백에서 참조를 놓아야 실제로 메모리가 반환된다.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_mb() -> Optional[float]:
+    """현재 프로세스 RSS (MB), 측정 불가 시 None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def count_parameters(model: Any) -> Dict[str, Any]:
+    """파라미터 수 / 크기 (torch 모듈이 아니면 None - ONNX 세션 등)"""
+    if not hasattr(model, 'parameters'):
+        return {'num_params': None, 'param_mb': None}
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except Exception:
+        return {'num_params': None, 'param_mb': None}
+    num_params = sum(p.numel() for p in model.parameters())
+    param_bytes = sum(t.numel() * t.element_size() for t in tensors)
+    return {'num_params': num_params, 'param_mb': round(param_bytes / (1024 * 1024), 1)}
+
+
+class _ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], pinned: bool,
+                 on_evict: Optional[Callable[[str], None]]):
+        self.name = name
+        self.loader = loader
+        self.pinned = pinned
+        self.on_evict = on_evict
+        self.lock = threading.Lock()
+
+        self.model = None
+        self.state = 'not_loaded'
+        self.error = None
+        self.loaded_at = None
+        self.last_used = None
+        self.load_seconds = None
+        self.rss_delta_mb = None
+        self.params = {'num_params': None, 'param_mb': None}
+        self.load_count = 0
+        self.evict_count = 0
+
+
+class ModelRegistry:
+    """이름 → 모델 로더를 등록하고, get() 시 한 번만 로드해서 공유"""
+
+    def __init__(self, idle_evict_seconds: float = 0):
+        self.idle_evict_seconds = idle_evict_seconds
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._evictor = None
+
+    def register(self, name: str, loader: Callable[[], Any], pinned: bool = False,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        """
+        모델 로더 등록 (이미 등록된 이름은 무시 → 먼저 등록한 로더 사용)
+        pinned=True: 유휴 해제 대상에서 제외
+        on_evict: 해제 시 호출 (모델을 붙잡고 있는 쪽이 참조를 놓는 콜백)
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _ModelEntry(name, loader, pinned, on_evict)
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._entries
+
+    def _entry(self, name: str) -> _ModelEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"등록되지 않은 모델입니다: {name}")
+        return entry
+
+    def get(self, name: str) -> Any:
+        """모델 반환 (처음이면 로드, 동시에 여러 스레드가 불러도 한 번만 로드)"""
+        entry = self._entry(name)
+        model = entry.model
+        if model is not None:
+            entry.last_used = time.monotonic()
+            return model
+
+        with entry.lock:
+            if entry.model is None:
+                entry.state = 'loading'
+                rss_before = current_rss_mb()
+                started = time.perf_counter()
+                try:
+                    model = entry.loader()
+                except Exception as e:
+                    entry.state = 'failed'
+                    entry.error = str(e)
+                    raise
+                rss_after = current_rss_mb()
+
+                entry.model = model
+                entry.state = 'loaded'
+                entry.error = None
+                entry.loaded_at = datetime.now().isoformat()
+                entry.load_seconds = round(time.perf_counter() - started, 3)
+                entry.rss_delta_mb = (round(rss_after - rss_before, 1)
+                                      if rss_before is not None and rss_after is not None else None)
+                entry.params = count_parameters(model)
+                entry.load_count += 1
+                logger.info(f"[model_registry] {name} 로드 완료 ({entry.load_seconds}s, RSS +{entry.rss_delta_mb}MB)")
+
+            entry.last_used = time.monotonic()
+            return entry.model
+
+    def loaded_models(self) -> Dict[str, Any]:
+        """현재 로드된 모델 (이름 → 모델), pre-fork 마스터에서 가중치 고정용"""
+        return {name: entry.model for name, entry in self._entries.items() if entry.model is not None}
+
+    def touch(self, *names: str):
+        """모델 사용 시각 갱신 (참조를 직접 들고 쓰는 쪽에서 요청마다 호출)"""
+        now = time.monotonic()
+        for name in names:
+            entry = self._entries.get(name)
+            if entry is not None and entry.model is not None:
+                entry.last_used = now
+
+    def evict(self, name: str) -> bool:
+        """모델 해제 (on_evict 콜백 호출 후 레지스트리 참조 제거)"""
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.model is None:
+                return False
+            entry.model = None
+            entry.state = 'evicted'
+            entry.evict_count += 1
+
+        # 콜백은 락 밖에서 호출 (콜백 안에서 다른 락을 잡아도 get()과 교착되지 않도록)
+        if entry.on_evict is not None:
+            try:
+                entry.on_evict(name)
+            except Exception as e:
+                logger.error(f"[model_registry] {name} 해제 콜백 실패: {e}")
+        logger.info(f"[model_registry] {name} 해제 (유휴)")
+        return True
+
+    def evict_idle(self) -> List[str]:
+        """idle_evict_seconds 이상 사용되지 않은 모델 해제 (pinned 제외)"""
+        if self.idle_evict_seconds <= 0:
+            return []
+        now = time.monotonic()
+        evicted = []
+        for name, entry in list(self._entries.items()):
+            if entry.pinned or entry.model is None or entry.last_used is None:
+                continue
+            if now - entry.last_used >= self.idle_evict_seconds and self.evict(name):
+                evicted.append(name)
+        if evicted:
+            import gc
+            gc.collect()
+        return evicted
+
+    def start_idle_evictor(self, interval_seconds: float = 60):
+        """유휴 모델 해제 백그라운드 스레드 시작 (idle_evict_seconds > 0일 때만, 한 번만)"""
+        if self.idle_evict_seconds <= 0 or self._evictor is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval_seconds)
+                self.evict_idle()
+
+        self._evictor = threading.Thread(target=_loop, name="model-evictor", daemon=True)
+        self._evictor.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """/debug/models 응답 (모델별 상태, 로드 시간, 파라미터, RSS)"""
+        now = time.monotonic()
+        models = {}
+        for name, entry in self._entries.items():
+            models[name] = {
+                'state': entry.state,
+                'pinned': entry.pinned,
+                'loaded_at': entry.loaded_at,
+                'idle_seconds': round(now - entry.last_used, 1) if entry.last_used is not None else None,
+                'load_seconds': entry.load_seconds,
+                'rss_delta_mb': entry.rss_delta_mb,
+                'num_params': entry.params['num_params'],
+                'param_mb': entry.params['param_mb'],
+                'load_count': entry.load_count,
+                'evict_count': entry.evict_count,
+                'error': entry.error
+            }
+        rss = current_rss_mb()
+        return {
+            'process_rss_mb': round(rss, 1) if rss is not None else None,
+            'idle_evict_seconds': self.idle_evict_seconds,
+            'models': models
+        }
+
+
+# 전역 레지스트리 (MODEL_IDLE_EVICT_SECONDS=0이면 유휴 해제 비활성화)
+model_registry = ModelRegistry(idle_evict_seconds=float(os.getenv("MODEL_IDLE_EVICT_SECONDS", "0")))
@@ -0,0 +1,154 @@
+"""
+블로킹 작업 실행 계층 (이벤트 루프 보호용)
+- CPU 바운드 모델 추론은 cpu_pool, 외부 API/LLM 같은 I/O 바운드 작업은 io_pool에서 실행
+- 풀의 대기열이 가득 차면 기다리지 않고 즉시 503(WorkerPoolFullError) 반환
+- 스레드 풀만 지원 (라우트가 넘기는 작업은 모델을 가진 서비스 인스턴스의 바운드 메서드라 프로세스로 pickle할 수 없음)
+- cpu_pool 스레드는 torch intra-op 스레드 수를 CPU_POOL_CORES / CPU_POOL_WORKERS로 제한 (코어 초과 구독 방지)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+
+class WorkerPoolFullError(HTTPException):
+    """워커 풀 대기열 초과 (503 Service Unavailable)"""
+
+    def __init__(self, pool_name: str):
+        super().__init__(
+            status_code=503,
+            detail=f"서버가 혼잡합니다. 잠시 후 다시 시도해주세요. (pool={pool_name})",
+            headers={"Retry-After": "1"}
+        )
+
+
+class BoundedWorkerPool:
+    """
+    크기와 대기열 길이가 제한된 워커 풀
+    - 동시에 받을 수 있는 작업 수 = max_workers(실행 중) + max_queue(대기 중)
+    - limit_torch_threads=True면 각 스레드의 torch intra-op 스레드 수를 (코어 수 / max_workers)로 제한
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, limit_torch_threads: bool = False):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.torch_threads = None
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"{name}-pool",
+            initializer=self._limit_torch_threads if limit_torch_threads else None
+        )
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _limit_torch_threads(self):
+        """
+        풀 스레드 시작 시 torch intra-op 스레드 수를 한 번 설정 (요청마다 바꾸지 않음)
+        워커마다 전체 코어 수만큼 intra-op 스레드를 쓰면 max_workers배로 초과 구독되므로 코어를 나눠 씀
+        CPU_POOL_CORES: 이 프로세스가 쓸 코어 수 (pre-fork 워커는 serve_prefork가 워커별 몫으로 설정, 없으면 전체 코어 수)
+        OpenMP 스레드 수는 스레드별 값이라 각 풀 스레드에서 같은 값으로 설정
+        """
+        try:
+            import torch
+        except ImportError:
+            return
+        cores = int(os.getenv("CPU_POOL_CORES", "0")) or os.cpu_count() or 1
+        self.torch_threads = max(1, cores // self.max_workers)
+        torch.set_num_threads(self.torch_threads)
+
+    def _try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self, failed: bool):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def _mark_running(self, delta: int):
+        with self._lock:
+            self._running += delta
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        fn(*args, **kwargs)를 풀에서 실행하고 결과를 기다림
+        대기열이 가득 차면 WorkerPoolFullError(503)를 즉시 발생
+        """
+        if not self._try_acquire():
+            raise WorkerPoolFullError(self.name)
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        failed = True
+        try:
+            result = await loop.run_in_executor(self._executor, self._track, call)
+            failed = False
+            return result
+        finally:
+            self._release(failed)
+
+    def _track(self, call: Callable[[], Any]) -> Any:
+        """스레드 풀에서 실제 실행 중인 작업 수 집계"""
+        self._mark_running(1)
+        try:
+            return call()
+        finally:
+            self._mark_running(-1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "torch_threads": self.torch_threads,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": max(0, self._in_flight - self._running),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected
+            }
+
+
+# 전역 풀 (환경변수로 크기 조정)
+# cpu_pool은 워커 수를 적게 두고 워커마다 intra-op 스레드를 나눠 주는 편이 모델 추론 처리량에 유리
+cpu_pool = BoundedWorkerPool(
+    "cpu",
+    max_workers=int(os.getenv("CPU_POOL_WORKERS", "2")),
+    max_queue=int(os.getenv("CPU_POOL_MAX_QUEUE", "16")),
+    limit_torch_threads=True
+)
+
+io_pool = BoundedWorkerPool(
+    "io",
+    max_workers=int(os.getenv("IO_POOL_WORKERS", "16")),
+    max_queue=int(os.getenv("IO_POOL_MAX_QUEUE", "64"))
+)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """전체 워커 풀 상태 (대기열 깊이 등)"""
+    return {
+        "cpu": cpu_pool.stats(),
+        "io": io_pool.stats()
+    }
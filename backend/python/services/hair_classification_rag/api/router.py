@@ -3,6 +3,8 @@ from fastapi.responses import JSONResponse
 from typing import Optional, List
 import logging
 import os
+import threading
+import time
 from datetime import datetime
 
 from ..models.schemas import (
@@ -18,18 +20,49 @@ router = APIRouter(prefix="/hair-classification-rag", tags=["hair-classification
 # 전역 분석기 인스턴스
 analyzer = None
 
+# 분석기 초기화 락 (동시 첫 요청에서 ConvNeXt-L 등을 중복 로드하지 않도록)
+_analyzer_lock = threading.Lock()
+_analyzer_state = {'state': 'not_loaded', 'updated_at': None, 'error': None}
+
+
+def _set_analyzer_state(state: str, error: str = None):
+    _analyzer_state.update(state=state, updated_at=datetime.now().isoformat(), error=error)
+
+
+def get_analyzer_state() -> dict:
+    """분석기 로드 상태 (not_loaded / loading / loaded / warm / failed)"""
+    return dict(_analyzer_state)
+
 
 def get_analyzer():
-    """분석기 인스턴스 가져오기"""
+    """분석기 인스턴스 가져오기 (한 스레드만 생성, 나머지는 생성이 끝날 때까지 대기)"""
     global analyzer
-    if analyzer is None:
-        try:
-            analyzer = HairLossAnalyzer()
-        except Exception as e:
-            logging.error(f"분석기 초기화 실패: {e}")
-            raise HTTPException(status_code=500, detail=f"분석기 초기화 실패: {str(e)}")
+    if analyzer is not None:
+        return analyzer
+
+    with _analyzer_lock:
+        if analyzer is None:
+            try:
+                _set_analyzer_state('loading')
+                analyzer = HairLossAnalyzer()
+                _set_analyzer_state('loaded')
+            except Exception as e:
+                _set_analyzer_state('failed', str(e))
+                logging.error(f"분석기 초기화 실패: {e}")
+                raise HTTPException(status_code=500, detail=f"분석기 초기화 실패: {str(e)}")
     return analyzer
 
+
+def warm_up_analyzer():
+    """분석기 생성 + 더미 이미지로 ConvNeXt/ViT 임베딩 한 번씩 추출 (커널/메모리 초기화)"""
+    from PIL import Image
+
+    started = time.perf_counter()
+    analyzer = get_analyzer()
+    analyzer.image_processor.extract_dual_embeddings(Image.new('RGB', (384, 384)))
+    _set_analyzer_state('warm')
+    logging.info(f"🔥 RAG 분석기 워밍업 완료 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
 @router.post("/setup", response_model=DatabaseSetupResponse)
 async def setup_database(request: DatabaseSetupRequest):
     """데이터베이스 설정 및 임베딩 업로드"""
@@ -90,6 +123,7 @@ async def analyze_uploaded_image(
     file: UploadFile = File(...),
     use_llm: bool = True,
     use_roi: bool = True,
+    cascade: Optional[bool] = None,
     age: Optional[str] = Form(None),
     gender: Optional[str] = Form(None),
     familyHistory: Optional[str] = Form(None),
@@ -134,7 +168,7 @@ async def analyze_uploaded_image(
 
         # 분석 실행 (ROI 기반, 설문 데이터 포함)
         analyzer = get_analyzer()
-        result = await analyzer.analyze_image(image, file.filename, use_llm=use_llm, use_roi=use_roi, survey_data=survey_data)
+        result = await analyzer.analyze_image(image, file.filename, use_llm=use_llm, use_roi=use_roi, survey_data=survey_data, cascade=cascade)
 
         if result['success']:
             # analysis_service에서 이미 grade로 변환 완료 (0-3)
@@ -217,9 +251,13 @@ async def add_folder_data(request: AddFolderRequest):
 
         if result['success']:
             return AddFolderResponse(**result)
+        elif result.get('busy'):
+            raise HTTPException(status_code=409, detail=result['error'])
         else:
             raise HTTPException(status_code=500, detail=result['error'])
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"폴더 데이터 추가 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
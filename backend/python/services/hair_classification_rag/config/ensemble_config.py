@@ -17,6 +17,12 @@ T_VIT = 0.20         # ViT 온도 파라미터 (더 smooth한 분포)
 # 앙상블 설정
 NUM_CLASSES = 5      # Sinclair Scale 5단계 (여성형 탈모)
 
+# 캐스케이드 모드 (ViT-S kNN 먼저, 확신이 낮을 때만 ConvNeXt-L 실행)
+# 임계값은 services/cascade_report.py 오프라인 리포트로 보정
+CASCADE_ENABLED = os.getenv("RAG_CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_MIN_PROB = float(os.getenv("RAG_CASCADE_MIN_PROB", "0.75"))      # ViT 최대 확률
+CASCADE_MIN_MARGIN = float(os.getenv("RAG_CASCADE_MIN_MARGIN", "0.40"))  # 1위 - 2위 확률 차이
+
 def get_ensemble_config():
     """앙상블 설정 반환"""
     return {
@@ -25,5 +31,10 @@ def get_ensemble_config():
         "top_k": TOP_K,
         "Tconv": T_CONV,
         "Tvit": T_VIT,
-        "num_classes": NUM_CLASSES
+        "num_classes": NUM_CLASSES,
+        "cascade": {
+            "enabled": CASCADE_ENABLED,
+            "min_prob": CASCADE_MIN_PROB,
+            "min_margin": CASCADE_MIN_MARGIN
+        }
     }
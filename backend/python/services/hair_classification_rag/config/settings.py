@@ -12,6 +12,32 @@ class Settings:
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
     INDEX_NAME: str = os.getenv("PINECONE_INDEX_NAME", "hair-loss-rag-analysis-convnext")
     PINECONE_ENVIRONMENT: str = "us-east-1-aws"
+    PINECONE_QUERY_TIMEOUT: float = float(os.getenv("PINECONE_QUERY_TIMEOUT", "3.0"))  # 인덱스별 검색 타임아웃 (초)
+    PINECONE_QUERY_WORKERS: int = int(os.getenv("PINECONE_QUERY_WORKERS", "8"))  # 동시 검색 스레드 수
+
+    # 로컬 FAISS 복제본 (services/local_index_sync.py로 동기화, 없거나 오래되면 Pinecone 사용)
+    LOCAL_INDEX_ENABLED: bool = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+    LOCAL_INDEX_DIR: str = os.getenv("LOCAL_INDEX_DIR", "data/local_index")
+    LOCAL_INDEX_MAX_AGE_HOURS: float = float(os.getenv("LOCAL_INDEX_MAX_AGE_HOURS", "168"))
+
+    # FAISS 인덱스 설정 (flat / hnsw / ivf_flat / ivf_pq)
+    FAISS_INDEX_TYPE: str = os.getenv("FAISS_INDEX_TYPE", "flat")
+    FAISS_HNSW_M: int = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_HNSW_EF_CONSTRUCTION: int = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+    FAISS_HNSW_EF_SEARCH: int = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+    FAISS_IVF_NLIST: int = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0이면 4*sqrt(N)
+    FAISS_IVF_NPROBE: int = int(os.getenv("FAISS_IVF_NPROBE", "8"))
+    FAISS_PQ_M: int = int(os.getenv("FAISS_PQ_M", "16"))  # 차원을 나누어 떨어지게 설정 (1536, 384 → 16)
+    FAISS_MMAP: bool = os.getenv("FAISS_MMAP", "true").lower() == "true"
+    FAISS_MAX_SEGMENTS: int = int(os.getenv("FAISS_MAX_SEGMENTS", "16"))  # 넘으면 스냅샷으로 합침
+
+    # Gemini LLM 호출 (마감 시간 초과 시 기본 템플릿, 동시 호출 수 제한, 느린 호출 헤지)
+    LLM_DEADLINE_SECONDS: float = float(os.getenv("RAG_LLM_DEADLINE_SECONDS", "12"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("RAG_LLM_MAX_CONCURRENCY", "8"))
+    LLM_USE_ASYNC_API: bool = os.getenv("RAG_LLM_USE_ASYNC_API", "true").lower() == "true"  # false면 전용 스레드 풀
+    LLM_HEDGE_ENABLED: bool = os.getenv("RAG_LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("RAG_LLM_HEDGE_PERCENTILE", "95"))  # 이 지연 백분위를 넘으면 재요청
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("RAG_LLM_HEDGE_MIN_SAMPLES", "20"))
 
     # FastAPI 설정
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -30,6 +56,17 @@ class Settings:
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".bmp"}
 
+    # 데이터셋 임베딩 파이프라인 (샤드 저장 위치 / 배치 / DataLoader 워커 / 샤드 크기)
+    EMBEDDING_SHARD_DIR: str = os.getenv("EMBEDDING_SHARD_DIR", "data/embedding_shards")
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+    EMBEDDING_NUM_WORKERS: int = int(os.getenv("EMBEDDING_NUM_WORKERS", "2"))
+    EMBEDDING_SHARD_SIZE: int = int(os.getenv("EMBEDDING_SHARD_SIZE", "512"))
+
+    # 단일 전처리 단계 (디코딩 / ROI 크롭 / 향상 1회, 모델 입력 크기로 바로 리사이즈)
+    # 기존 인덱스는 PIL 경로로 만들어져 있으므로 기본값은 false
+    # true로 바꾸려면 같은 설정으로 인덱스를 다시 만든 뒤 켤 것 (쿼리 / 인덱스 전처리가 달라지면 검색 품질 저하)
+    FUSED_PREPROCESS: bool = os.getenv("RAG_FUSED_PREPROCESS", "false").lower() == "true"
+
     # 모델 설정
     MODEL_NAME: str = "convnext_large.fb_in22k_ft_in1k_384"
     EMBEDDING_DIMENSION: int = 1536  # ConvNeXt-L feature dimension
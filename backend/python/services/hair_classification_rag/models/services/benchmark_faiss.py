@@ -0,0 +1,119 @@
+"""
+FAISSManager 인덱스 타입별 recall / 지연시간 벤치마크
+참조 세트 크기를 늘려가며 flat / hnsw / ivf_flat / ivf_pq의
+빌드 시간, 로드 시간(mmap), 검색 지연(p50/p95), recall@k(정확 검색 대비), 파일 크기, 증분 추가 시간 비교
+
+실행 (backend/python 디렉토리에서):
+    python -m services.hair_classification_rag.models.services.benchmark_faiss --sizes 1000 10000 50000 --dim 384
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .faiss_manager import FAISSManager, INDEX_TYPES
+
+
+def make_reference_set(num_vectors: int, dim: int, num_stages: int = 5, seed: int = 0):
+    """단계별로 뭉친 정규화 벡터 (실제 임베딩처럼 클러스터 구조) + 메타데이터"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_stages * 8, dim)).astype(np.float32)
+    assignments = rng.integers(0, len(centers), num_vectors)
+    vectors = centers[assignments] + 0.35 * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadata = [{
+        'stage': int(assignments[i] % num_stages) + 1,
+        'gender': 'female' if i % 4 else 'male',
+        'embedding_type': 'roi' if i % 2 else 'full',
+        'filename': f"img_{i}.jpg"
+    } for i in range(num_vectors)]
+    return vectors, metadata
+
+
+def _file_size_mb(manager: FAISSManager) -> float:
+    size = sum(os.path.getsize(p) for p in (manager.index_file, manager.columns_file) if os.path.exists(p))
+    return size / (1024 * 1024)
+
+
+def run_benchmark(sizes, dim: int, num_queries: int, top_k: int, index_types, search_filter):
+    rows = []
+    for size in sizes:
+        vectors, metadata = make_reference_set(size, dim)
+        queries, _ = make_reference_set(num_queries, dim, seed=1)
+
+        # 정확 검색 정답 (필터 적용 후 코사인 top-k)
+        allowed = np.array([all(m.get(f) == c["$eq"] for f, c in search_filter.items()) for m in metadata])
+        sims = queries @ vectors.T
+        sims[:, ~allowed] = -np.inf
+        truth = np.argsort(-sims, axis=1)[:, :top_k]
+        ids = [f"v{i}" for i in range(size)]
+
+        for index_type in index_types:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                index_file = os.path.join(tmp_dir, "bench.index")
+                metadata_file = os.path.join(tmp_dir, "bench_metadata.pkl")
+
+                manager = FAISSManager(dimension=dim, index_file=index_file, metadata_file=metadata_file,
+                                       metric="cosine", index_type=index_type)
+                started = time.perf_counter()
+                manager.upload_embeddings({'embeddings': vectors, 'metadata': metadata, 'ids': ids, 'recreate': True})
+                build_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                manager = FAISSManager(dimension=dim, index_file=index_file, metadata_file=metadata_file,
+                                       metric="cosine", index_type=index_type)
+                load_ms = (time.perf_counter() - started) * 1000
+
+                latencies, hits = [], 0
+                for q, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    matches = manager.query(q, top_k, search_filter)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    found = {int(m['id'][1:]) for m in matches}
+                    hits += len(found & set(expected.tolist()))
+
+                # 증분 추가 (1%) - append-only 세그먼트 저장 시간
+                extra = max(1, size // 100)
+                extra_vectors, extra_metadata = make_reference_set(extra, dim, seed=2)
+                started = time.perf_counter()
+                manager.upload_embeddings({'embeddings': extra_vectors, 'metadata': extra_metadata,
+                                           'ids': [f"x{i}" for i in range(extra)]})
+                append_ms = (time.perf_counter() - started) * 1000
+
+                rows.append({
+                    'size': size,
+                    'type': index_type,
+                    'build_s': build_seconds,
+                    'load_ms': load_ms,
+                    'p50_ms': float(np.percentile(latencies, 50)),
+                    'p95_ms': float(np.percentile(latencies, 95)),
+                    'recall': hits / (num_queries * top_k),
+                    'file_mb': _file_size_mb(manager),
+                    'append_ms': append_ms
+                })
+                r = rows[-1]
+                print(f"{size:>8} {index_type:>9} | build {r['build_s']:7.2f}s | load {r['load_ms']:7.1f}ms | "
+                      f"p50 {r['p50_ms']:6.3f}ms p95 {r['p95_ms']:6.3f}ms | recall@{top_k} {r['recall']:.3f} | "
+                      f"{r['file_mb']:7.1f}MB | append {r['append_ms']:6.1f}ms")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISSManager 인덱스 타입별 recall / 지연시간 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=384, help="384 (ViT-S) 또는 1536 (ConvNeXt-L)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--gender", default="female", help="검색 필터 (서비스와 동일한 gender 필터)")
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.dim, args.queries, args.top_k, args.types,
+                  {"gender": {"$eq": args.gender}})
+
+
+if __name__ == "__main__":
+    main()
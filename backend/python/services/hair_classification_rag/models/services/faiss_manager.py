@@ -1,35 +1,253 @@
 import os
+import json
 import faiss
 import numpy as np
 import pickle
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import logging
-from ..config import settings
+from ...config.settings import settings
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+
+def _to_python(value):
+    """NumPy 스칼라 → 파이썬 기본형"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ColumnarMetadata:
+    """
+    메타데이터를 필드별 NumPy 배열로 보관 (dict 리스트 pickle 대신 .npz 컬럼)
+    - 행 조회는 metadata[i] → dict (기존 list of dict와 같은 사용법)
+    - 필터는 컬럼 단위 벡터 비교로 평가
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray] = None, present: Dict[str, np.ndarray] = None,
+                 json_fields: List[str] = None, length: int = 0):
+        self.columns = columns or {}
+        self.present = present or {}  # 일부 행에만 있는 필드의 존재 여부
+        self.json_fields = set(json_fields or [])  # 리스트/딕셔너리 값은 JSON 문자열로 저장
+        self.length = length
+
+    @staticmethod
+    def _build_column(values: List[Any]) -> Tuple[np.ndarray, Optional[np.ndarray], bool]:
+        present = np.array([v is not None for v in values], dtype=bool)
+        sample = [v for v in values if v is not None]
+
+        if sample and all(isinstance(v, (bool, np.bool_)) for v in sample):
+            column = np.array([bool(v) if v is not None else False for v in values], dtype=bool)
+        elif sample and all(isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_)) for v in sample):
+            column = np.array([int(v) if v is not None else 0 for v in values], dtype=np.int64)
+        elif sample and all(isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_)) for v in sample):
+            column = np.array([float(v) if v is not None else np.nan for v in values], dtype=np.float64)
+        elif any(isinstance(v, (list, dict, tuple)) for v in sample):
+            column = np.array([json.dumps(v, ensure_ascii=False) if v is not None else '' for v in values])
+            return column, (None if present.all() else present), True
+        else:
+            column = np.array([str(v) if v is not None else '' for v in values])
+
+        return column, (None if present.all() else present), False
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> 'ColumnarMetadata':
+        fields = []
+        for row in rows:
+            for key in row:
+                if key not in fields:
+                    fields.append(key)
+
+        metadata = cls(length=len(rows))
+        for field in fields:
+            column, present, is_json = cls._build_column([row.get(field) for row in rows])
+            metadata.columns[field] = column
+            if present is not None:
+                metadata.present[field] = present
+            if is_json:
+                metadata.json_fields.add(field)
+        return metadata
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _value(self, field: str, i: int):
+        value = _to_python(self.columns[field][i])
+        if field in self.json_fields:
+            return json.loads(value)
+        return value
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0 or i >= self.length:
+            raise IndexError(i)
+        return {
+            field: self._value(field, i)
+            for field in self.columns
+            if field not in self.present or self.present[field][i]
+        }
+
+    def rows(self) -> List[Dict]:
+        return [self[i] for i in range(self.length)]
+
+    def extend(self, other: 'ColumnarMetadata') -> 'ColumnarMetadata':
+        """두 메타데이터를 이어붙인 새 객체 (필드 구성이 다르면 행 단위로 다시 구성)"""
+        if self.length == 0:
+            return other
+        if other.length == 0:
+            return self
+        same_schema = (list(self.columns) == list(other.columns) and not self.present and not other.present
+                       and self.json_fields == other.json_fields
+                       and all(self.columns[f].dtype.kind == other.columns[f].dtype.kind for f in self.columns))
+        if not same_schema:
+            return ColumnarMetadata.from_rows(self.rows() + other.rows())
+        columns = {f: np.concatenate([self.columns[f], other.columns[f]]) for f in self.columns}
+        return ColumnarMetadata(columns, {}, list(self.json_fields), self.length + other.length)
+
+    def filter_mask(self, search_filter: Optional[Dict]) -> np.ndarray:
+        """Pinecone 형식 필터 ({"field": {"$eq"|"$ne"|"$in"|"$nin": v}}) → 통과 행 마스크"""
+        mask = np.ones(self.length, dtype=bool)
+        for field, condition in (search_filter or {}).items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            column = self.columns.get(field)
+            present = self.present.get(field)
+            for op, expected in condition.items():
+                if column is None:
+                    matched = np.zeros(self.length, dtype=bool)
+                elif op in ("$eq", "$ne"):
+                    matched = column == expected
+                elif op in ("$in", "$nin"):
+                    matched = np.isin(column, list(expected))
+                else:
+                    raise ValueError(f"지원하지 않는 필터 연산자: {op}")
+                if present is not None:
+                    matched = matched & present
+                mask &= ~matched if op in ("$ne", "$nin") else matched
+        return mask
+
+    def save(self, path: str):
+        arrays = {f"col__{field}": column for field, column in self.columns.items()}
+        arrays.update({f"present__{field}": present for field, present in self.present.items()})
+        arrays['__fields__'] = np.array(list(self.columns))
+        arrays['__json_fields__'] = np.array(sorted(self.json_fields))
+        arrays['__length__'] = np.array(self.length)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ColumnarMetadata':
+        with np.load(path, allow_pickle=False) as data:
+            fields = [str(f) for f in data['__fields__']]
+            columns = {field: data[f"col__{field}"] for field in fields}
+            present = {field: data[f"present__{field}"] for field in fields if f"present__{field}" in data.files}
+            json_fields = [str(f) for f in data['__json_fields__']]
+            length = int(data['__length__'])
+        return cls(columns, present, json_fields, length)
+
 
 class FAISSManager:
-    def __init__(self):
-        """FAISS 매니저 초기화"""
-        self.dimension = settings.EMBEDDING_DIMENSION
-        self.index_file = os.path.join(settings.UPLOAD_DIR, "hair_loss_faiss.index")
-        self.metadata_file = os.path.join(settings.UPLOAD_DIR, "hair_loss_metadata.pkl")
-        self.index = None
-        self.metadata = []
+    def __init__(self, dimension: int = None, index_file: str = None, metadata_file: str = None,
+                 metric: str = "l2", index_type: str = None, use_mmap: bool = None):
+        """
+        FAISS 매니저 초기화
+        Args:
+            dimension: 임베딩 차원 (기본: settings.EMBEDDING_DIMENSION)
+            index_file / metadata_file: 저장 경로 (기본: UPLOAD_DIR 아래, 메타데이터는 같은 이름의 .npz 컬럼 파일)
+            metric: "l2" (거리 기반) 또는 "cosine" (정규화 + 내적, Pinecone cosine 점수와 동일)
+            index_type: "flat" / "hnsw" / "ivf_flat" / "ivf_pq" (기본: FAISS_INDEX_TYPE)
+            use_mmap: 저장된 인덱스를 mmap으로 읽기 (기본: FAISS_MMAP)
+        """
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        self.index_file = index_file or os.path.join(settings.UPLOAD_DIR, "hair_loss_faiss.index")
+        self.metadata_file = metadata_file or os.path.join(settings.UPLOAD_DIR, "hair_loss_metadata.pkl")
+        self.columns_file = os.path.splitext(self.metadata_file)[0] + ".npz"
+        self.segments_file = self.index_file + ".segments.json"
+        self.metric = metric
+        self.index_type = (index_type or settings.FAISS_INDEX_TYPE).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"지원하지 않는 FAISS 인덱스 타입: {self.index_type} (가능: {INDEX_TYPES})")
+        self.use_mmap = settings.FAISS_MMAP if use_mmap is None else use_mmap
+
+        self.index = None           # 기본(스냅샷) 인덱스 - mmap으로 열 수 있음
+        self.delta_index = None     # 스냅샷 이후 추가된 벡터 (append-only 세그먼트, 메모리 Flat 인덱스)
+        self.metadata = ColumnarMetadata()
+        self.segments = []
+        self._filter_cache = {}
         self.logger = logging.getLogger(__name__)
 
-        # 업로드 디렉토리 생성
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        # 저장 디렉토리 생성
+        os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
 
         # 기존 인덱스 로드
         self.load_index()
 
+    # ---------- 인덱스 구성 ----------
+
+    @property
+    def _faiss_metric(self):
+        return faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+
+    @property
+    def ntotal(self) -> int:
+        base = self.index.ntotal if self.index is not None else 0
+        delta = self.delta_index.ntotal if self.delta_index is not None else 0
+        return base + delta
+
+    def _factory_string(self, num_vectors: int) -> str:
+        """index_type → faiss.index_factory 문자열 (IVF 리스트 수 / PQ 비트 수는 학습 데이터 크기에 맞게 조정)"""
+        if self.index_type == "hnsw":
+            return f"HNSW{settings.FAISS_HNSW_M}"
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            nlist = settings.FAISS_IVF_NLIST or int(4 * np.sqrt(max(num_vectors, 1)))
+            nlist = max(1, min(nlist, num_vectors // 39 or 1))  # 리스트당 최소 39개 학습 벡터
+            if self.index_type == "ivf_flat":
+                return f"IVF{nlist},Flat"
+            nbits = int(max(1, min(8, np.log2(max(num_vectors, 2)))))
+            return f"IVF{nlist},PQ{settings.FAISS_PQ_M}x{nbits}"
+        return "Flat"
+
+    def _new_index(self, num_vectors: int = 0):
+        """설정된 타입/metric의 빈 인덱스 (IVF 계열은 train 필요)"""
+        index = faiss.index_factory(self.dimension, self._factory_string(num_vectors), self._faiss_metric)
+        if self.index_type == "hnsw":
+            index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+        return index
+
+    def _new_delta_index(self):
+        return faiss.IndexFlat(self.dimension, self._faiss_metric)
+
+    def _prepare_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _search_params(self, index, selector=None):
+        """인덱스 타입별 검색 파라미터 (efSearch / nprobe, 필터 selector)"""
+        base = faiss.downcast_index(index)
+        if isinstance(base, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = settings.FAISS_HNSW_EF_SEARCH
+        elif isinstance(base, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF()
+            params.nprobe = settings.FAISS_IVF_NPROBE
+        else:
+            params = faiss.SearchParameters()
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    # ---------- 저장 / 로드 ----------
+
     def create_index(self, delete_if_exists: bool = False) -> bool:
         """FAISS 인덱스 생성"""
         try:
             if delete_if_exists or not os.path.exists(self.index_file):
-                self.logger.info(f"새 FAISS 인덱스 생성 중... (차원: {self.dimension})")
-                # L2 거리 기반 인덱스 생성
-                self.index = faiss.IndexFlatL2(self.dimension)
-                self.metadata = []
+                self.logger.info(f"새 FAISS 인덱스 생성 중... (차원: {self.dimension}, 타입: {self.index_type})")
+                self.index = self._new_index()
+                self.delta_index = None
+                self.metadata = ColumnarMetadata()
+                self._filter_cache = {}
                 self.save_index()
                 self.logger.info("FAISS 인덱스 생성 완료")
                 return True
@@ -40,93 +258,216 @@ class FAISSManager:
             self.logger.error(f"FAISS 인덱스 생성 실패: {e}")
             return False
 
+    def _read_index(self, path: str):
+        """mmap 읽기 시도 (지원하지 않는 타입/버전이면 일반 읽기)"""
+        if self.use_mmap:
+            try:
+                return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except Exception as e:
+                self.logger.info(f"mmap 로드 불가, 일반 로드 사용: {e}")
+        return faiss.read_index(path)
+
+    def _load_metadata(self) -> Optional[ColumnarMetadata]:
+        if os.path.exists(self.columns_file):
+            return ColumnarMetadata.load(self.columns_file)
+        if os.path.exists(self.metadata_file):
+            # 하위 호환성: 기존 pickle(list of dict) 메타데이터
+            with open(self.metadata_file, 'rb') as f:
+                return ColumnarMetadata.from_rows(pickle.load(f))
+        return None
+
+    def _segment_paths(self, segment_id: int) -> Tuple[str, str]:
+        return (f"{self.index_file}.seg{segment_id:05d}.npy",
+                f"{os.path.splitext(self.columns_file)[0]}.seg{segment_id:05d}.npz")
+
     def load_index(self) -> bool:
-        """기존 인덱스 로드"""
+        """기존 인덱스 로드 (스냅샷 + append-only 세그먼트)"""
         try:
-            if os.path.exists(self.index_file) and os.path.exists(self.metadata_file):
-                self.index = faiss.read_index(self.index_file)
-                with open(self.metadata_file, 'rb') as f:
-                    self.metadata = pickle.load(f)
-                self.logger.info(f"기존 인덱스 로드 완료: {self.index.ntotal}개 벡터")
-                return True
-            else:
+            metadata = self._load_metadata() if os.path.exists(self.index_file) else None
+            if metadata is None:
                 self.logger.info("기존 인덱스가 없습니다. 새로 생성해야 합니다.")
                 return False
+
+            self.index = self._read_index(self.index_file)
+            self.metadata = metadata
+            self.delta_index = None
+            self.segments = []
+
+            if os.path.exists(self.segments_file):
+                with open(self.segments_file) as f:
+                    self.segments = json.load(f)['segments']
+                for segment_id in self.segments:
+                    vectors_path, columns_path = self._segment_paths(segment_id)
+                    if self.delta_index is None:
+                        self.delta_index = self._new_delta_index()
+                    self.delta_index.add(np.load(vectors_path))
+                    self.metadata = self.metadata.extend(ColumnarMetadata.load(columns_path))
+
+            self._filter_cache = {}
+            self.logger.info(f"기존 인덱스 로드 완료: {self.ntotal}개 벡터 (세그먼트 {len(self.segments)}개)")
+            return True
         except Exception as e:
             self.logger.error(f"인덱스 로드 실패: {e}")
             return False
 
     def save_index(self) -> bool:
-        """인덱스 저장"""
+        """인덱스 전체 저장 (스냅샷 재작성 + 세그먼트 정리)"""
         try:
-            if self.index is not None:
-                faiss.write_index(self.index, self.index_file)
-                with open(self.metadata_file, 'wb') as f:
-                    pickle.dump(self.metadata, f)
-                self.logger.info("인덱스 저장 완료")
-                return True
-            return False
+            if self.index is None:
+                return False
+
+            if self.delta_index is not None and self.delta_index.ntotal > 0:
+                # mmap으로 연 스냅샷은 읽기 전용이므로 메모리로 다시 읽어서 세그먼트를 합침
+                if self.use_mmap and os.path.exists(self.index_file):
+                    self.index = faiss.read_index(self.index_file)
+                self.index.add(self.delta_index.reconstruct_n(0, self.delta_index.ntotal))
+                self.delta_index = None
+
+            tmp_path = self.index_file + ".tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, self.index_file)
+            self.metadata.save(self.columns_file)
+
+            old_segments, self.segments = self.segments, []
+            if os.path.exists(self.segments_file):
+                os.remove(self.segments_file)
+            for segment_id in old_segments:
+                for path in self._segment_paths(segment_id):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            self.logger.info("인덱스 저장 완료")
+            return True
         except Exception as e:
             self.logger.error(f"인덱스 저장 실패: {e}")
             return False
 
+    def _append_segment(self, vectors: np.ndarray, metadata: ColumnarMetadata):
+        """추가분만 새 세그먼트 파일로 저장 (기존 스냅샷은 다시 쓰지 않음), 세그먼트 목록은 마지막에 원자적으로 교체"""
+        segment_id = (max(self.segments) + 1) if self.segments else 1
+        vectors_path, columns_path = self._segment_paths(segment_id)
+        np.save(vectors_path, vectors)
+        metadata.save(columns_path)
+
+        segments = self.segments + [segment_id]
+        tmp_path = self.segments_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'segments': segments}, f)
+        os.replace(tmp_path, self.segments_file)
+        self.segments = segments
+
     def upload_embeddings(self, embeddings_data: Dict, batch_size: int = 100) -> bool:
-        """임베딩 데이터를 FAISS에 업로드"""
+        """
+        임베딩 데이터를 FAISS에 업로드
+        - recreate=True 또는 인덱스가 비어있으면: 새 인덱스 학습/구성 후 스냅샷 저장
+        - 그 외: 추가분만 append-only 세그먼트로 저장 (FAISS_MAX_SEGMENTS를 넘으면 스냅샷으로 합침)
+        """
         try:
-            if self.index is None:
-                self.create_index()
-
-            embeddings = np.array(embeddings_data['embeddings'], dtype=np.float32)
-            metadata = embeddings_data['metadata']
+            embeddings = self._prepare_vectors(np.array(embeddings_data['embeddings'], dtype=np.float32))
             ids = embeddings_data['ids']
+            recreate = embeddings_data.get('recreate', False) or self.index is None or self.ntotal == 0
+            offset = 0 if recreate else self.ntotal
 
-            self.logger.info(f"총 {len(embeddings)}개 임베딩 업로드 시작...")
-
-            # 기존 데이터 초기화 (재생성 시)
-            if embeddings_data.get('recreate', False):
-                self.index = faiss.IndexFlatL2(self.dimension)
-                self.metadata = []
-
-            # 벡터 추가
-            self.index.add(embeddings)
-
-            # 메타데이터 추가
-            for i, (meta, id_) in enumerate(zip(metadata, ids)):
+            rows = []
+            for i, (meta, id_) in enumerate(zip(embeddings_data['metadata'], ids)):
                 meta_with_id = meta.copy()
                 meta_with_id['id'] = id_
-                meta_with_id['index_position'] = len(self.metadata) + i
-                self.metadata.append(meta_with_id)
+                meta_with_id['index_position'] = offset + i
+                rows.append(meta_with_id)
 
-            # 저장
-            self.save_index()
+            self.logger.info(f"총 {len(embeddings)}개 임베딩 업로드 시작...")
 
-            self.logger.info(f"업로드 완료. 총 벡터 수: {self.index.ntotal}")
+            if recreate:
+                # 스냅샷 새로 구성 (IVF 계열은 업로드 데이터로 학습)
+                self.index = self._new_index(len(embeddings))
+                if not self.index.is_trained:
+                    self.index.train(embeddings)
+                self.index.add(embeddings)
+                self.delta_index = None
+                self.metadata = ColumnarMetadata.from_rows(rows)
+                self._filter_cache = {}
+                self.save_index()
+            else:
+                new_metadata = ColumnarMetadata.from_rows(rows)
+                if self.delta_index is None:
+                    self.delta_index = self._new_delta_index()
+                self.delta_index.add(embeddings)
+                self.metadata = self.metadata.extend(new_metadata)
+                self._filter_cache = {}
+                self._append_segment(embeddings, new_metadata)
+                if len(self.segments) > settings.FAISS_MAX_SEGMENTS:
+                    self.save_index()
+
+            self.logger.info(f"업로드 완료. 총 벡터 수: {self.ntotal}")
             return True
 
         except Exception as e:
             self.logger.error(f"임베딩 업로드 실패: {e}")
             return False
 
+    # ---------- 검색 ----------
+
+    def _filter_positions(self, search_filter: Optional[Dict]) -> Optional[np.ndarray]:
+        """필터를 통과하는 벡터 위치 (필터 없음 → None, 필터별로 캐시)"""
+        if not search_filter:
+            return None
+        key = json.dumps(search_filter, sort_keys=True, default=str)
+        positions = self._filter_cache.get(key)
+        if positions is None:
+            positions = np.flatnonzero(self.metadata.filter_mask(search_filter)).astype(np.int64)
+            self._filter_cache[key] = positions
+        return positions
+
+    def _search(self, query_vector: np.ndarray, top_k: int,
+                positions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """스냅샷 + 세그먼트 인덱스를 함께 검색해서 상위 top_k (점수, 전체 위치) 반환"""
+        base_total = self.index.ntotal if self.index is not None else 0
+        results = []
+
+        for index, offset in ((self.index, 0), (self.delta_index, base_total)):
+            if index is None or index.ntotal == 0:
+                continue
+            selector = None
+            if positions is not None:
+                local = positions[(positions >= offset) & (positions < offset + index.ntotal)] - offset
+                if len(local) == 0:
+                    continue
+                local = np.ascontiguousarray(local, dtype=np.int64)
+                selector = faiss.IDSelectorBatch(len(local), faiss.swig_ptr(local))
+            k = min(top_k, index.ntotal)
+            params = self._search_params(index, selector)
+            scores, indices = index.search(query_vector, k, params=params)
+            valid = indices[0] >= 0
+            results.append((scores[0][valid], indices[0][valid] + offset))
+
+        if not results:
+            return np.array([], dtype=np.float32), np.array([], dtype=np.int64)
+
+        scores = np.concatenate([r[0] for r in results])
+        indices = np.concatenate([r[1] for r in results])
+        order = np.argsort(-scores if self.metric == "cosine" else scores, kind="stable")[:top_k]
+        return scores[order], indices[order]
+
     def search_similar_images(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict]:
         """유사한 이미지 검색"""
         try:
-            if self.index is None or self.index.ntotal == 0:
+            if self.index is None or self.ntotal == 0:
                 self.logger.warning("인덱스가 비어있습니다.")
                 return []
 
             # 쿼리 임베딩을 float32로 변환하고 2D 배열로 만들기
-            query_vector = np.array([query_embedding], dtype=np.float32)
+            query_vector = self._prepare_vectors(np.array([query_embedding], dtype=np.float32))
 
             # 검색 실행
-            distances, indices = self.index.search(query_vector, min(top_k, self.index.ntotal))
+            distances, indices = self._search(query_vector, min(top_k, self.ntotal))
 
             # 결과 포맷팅
             similar_images = []
-            for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
+            for i, (distance, idx) in enumerate(zip(distances, indices)):
                 if idx < len(self.metadata):
                     meta = self.metadata[idx]
                     # 거리를 유사도 점수로 변환 (거리가 작을수록 유사도가 높음)
-                    similarity_score = 1.0 / (1.0 + distance)
+                    similarity_score = float(distance) if self.metric == "cosine" else 1.0 / (1.0 + distance)
 
                     similar_images.append({
                         'id': meta['id'],
@@ -158,6 +499,34 @@ class FAISSManager:
             self.logger.error(f"유사 이미지 검색 실패: {e}")
             return []
 
+    def query(self, query_embedding: np.ndarray, top_k: int = 10, search_filter: Optional[Dict] = None) -> List[Dict]:
+        """
+        Pinecone query와 같은 형식으로 검색 ([{'id', 'score', 'metadata'}], 메타데이터 필터 지원)
+        cosine 인덱스의 score는 코사인 유사도 (Pinecone과 동일)
+        """
+        if self.index is None or self.ntotal == 0:
+            return []
+
+        query_vector = self._prepare_vectors(np.array([query_embedding], dtype=np.float32))
+        positions = self._filter_positions(search_filter)
+        if positions is not None and len(positions) == 0:
+            return []
+
+        scores, indices = self._search(query_vector, top_k, positions)
+
+        matches = []
+        for score, idx in zip(scores, indices):
+            meta = self.metadata[int(idx)]
+            score = float(score)
+            if self.metric != "cosine":
+                score = 1.0 / (1.0 + score)
+            matches.append({
+                'id': meta.get('id'),
+                'score': score,
+                'metadata': {k_: v for k_, v in meta.items() if k_ not in ('id', 'index_position')}
+            })
+        return matches
+
     def predict_hair_loss_stage(self, query_embedding: np.ndarray, top_k: int = 10) -> Dict:
         """탈모 단계 예측"""
         try:
@@ -243,9 +612,10 @@ class FAISSManager:
 
             return {
                 'success': True,
-                'total_vector_count': self.index.ntotal,
+                'total_vector_count': self.ntotal,
                 'dimension': self.dimension,
-                'index_type': 'FAISS IndexFlatL2',
+                'index_type': f"FAISS {self.index_type} ({self.metric})",
+                'segment_count': len(self.segments),
                 'metadata_count': len(self.metadata)
             }
         except Exception as e:
@@ -255,7 +625,8 @@ class FAISSManager:
     def index_exists(self) -> bool:
         """인덱스 존재 여부 확인"""
         try:
-            return os.path.exists(self.index_file) and os.path.exists(self.metadata_file)
+            return os.path.exists(self.index_file) and (
+                os.path.exists(self.columns_file) or os.path.exists(self.metadata_file))
         except Exception as e:
             self.logger.error(f"인덱스 존재 확인 실패: {e}")
             return False
@@ -2,7 +2,11 @@ import os
 import numpy as np
 import re
 from typing import Dict, List, Any, Optional, Tuple
+import asyncio
+import contextlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from .image_processor import ImageProcessor
 from .dual_pinecone_manager import DualPineconeManager
@@ -11,12 +15,43 @@ from ..config.settings import settings
 from ..config.ensemble_config import get_ensemble_config
 from PIL import Image
 
+try:
+    import fcntl
+except ImportError:  # Windows - 프로세스 내 잠금만 사용
+    fcntl = None
+
+# 폴더 인덱싱 전용 단일 워커 (몇 시간 걸릴 수 있으므로 요청용 cpu_pool / io_pool을 점유하지 않음)
+_indexing_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-indexing")
+_indexing_lock = threading.Lock()
+
+
+class IndexingBusyError(RuntimeError):
+    """이미 다른 폴더 인덱싱이 진행 중"""
+
+
+@contextlib.contextmanager
+def _shard_dir_lock(output_dir: str):
+    """샤드 디렉토리 단위 배타 잠금 (pre-fork 워커끼리 같은 state.json / 샤드 번호를 쓰지 않도록)"""
+    os.makedirs(os.path.dirname(output_dir) or '.', exist_ok=True)
+    with open(output_dir + '.lock', 'w') as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise IndexingBusyError(f"다른 프로세스가 인덱싱 중입니다: {output_dir}")
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
 class HairLossAnalyzer:
     def __init__(self):
         """여성형 탈모 RAG 분석기 초기화 (ROI 크롭 + ConvNeXt + ViT 듀얼 앙상블)"""
         try:
             self.image_processor = ImageProcessor()
-            self.dual_manager = DualPineconeManager()
+            self.dual_manager = DualPineconeManager(image_processor=self.image_processor)
             self.llm_analyzer = GeminiHairAnalyzer()
             self.ensemble_config = get_ensemble_config()
             self.logger = logging.getLogger(__name__)
@@ -56,27 +91,77 @@ class HairLossAnalyzer:
                 'timestamp': datetime.now().isoformat()
             }
 
-    async def analyze_image(self, image: Image.Image, filename: str, top_k: int = 10, use_llm: bool = True, viewpoint: str = None, use_roi: bool = True, survey_data: Dict = None) -> Dict:
-        """PIL Image 객체 분석 (ConvNeXt + ViT-S/16 앙상블, ROI 기반, Gemini LLM)"""
+    async def _predict_cascade(self, image: Image.Image, top_k: int, use_roi: bool) -> Tuple[Optional[Dict], Dict[str, Optional[int]]]:
+        """
+        캐스케이드 모드: ViT-S 임베딩 + 검색 먼저, 애매할 때만 ConvNeXt-L 임베딩 추출
+        전처리는 두 백본 몫을 한 번에 (폴백 시 ConvNeXt 입력 재사용), 추론은 cpu_pool / 검색은 io_pool
+        Returns: (앙상블 결과, 실제로 계산한 임베딩 차원 - 조기 종료 시 convnext는 None)
+        """
+        from services.common.worker_pools import cpu_pool
+
+        dims = {'convnext': None, 'vit': None}
+
+        # 임베딩 캐시에 있으면 forward 생략 (ConvNeXt는 ViT 결과가 애매할 때만 계산)
+        vit_embedding, conv_fn = await cpu_pool.run(self.image_processor.extract_cascade_embeddings, image, use_roi)
+        if vit_embedding is None:
+            return None, dims
+        dims['vit'] = len(vit_embedding)
+
+        async def conv_embedding_fn():
+            conv_embedding = await cpu_pool.run(conv_fn)
+            if conv_embedding is not None:
+                dims['convnext'] = len(conv_embedding)
+            return conv_embedding
+
+        ensemble_result = await self.dual_manager.predict_cascade_stage(vit_embedding, conv_embedding_fn, top_k, use_roi=use_roi)
+        return ensemble_result, dims
+
+    async def analyze_image(self, image: Image.Image, filename: str, top_k: int = 10, use_llm: bool = True, viewpoint: str = None, use_roi: bool = True, survey_data: Dict = None, cascade: Optional[bool] = None) -> Dict:
+        """
+        PIL Image 객체 분석 (ConvNeXt + ViT-S/16 앙상블, ROI 기반, Gemini LLM)
+        cascade: ViT-S 먼저 실행하고 확실하면 ConvNeXt-L 생략 (None이면 RAG_CASCADE_ENABLED 설정 따름)
+        """
         try:
-            # ROI 듀얼 임베딩 추출 (BiSeNet 세그멘테이션 적용)
-            if use_roi:
-                conv_embedding, vit_embedding = self.image_processor.extract_roi_dual_embeddings(image)
+            from services.common.worker_pools import cpu_pool, io_pool
+
+            if cascade is None:
+                cascade = self.ensemble_config["cascade"]["enabled"]
+
+            # 모델 추론은 cpu_pool, Pinecone 검색 대기는 io_pool에서 실행 (이벤트 루프를 막지 않도록)
+            if cascade:
+                ensemble_result, dims = await self._predict_cascade(image, top_k, use_roi)
+                if ensemble_result is None:
+                    return {
+                        'success': False,
+                        'error': '이미지 임베딩 추출 실패',
+                        'timestamp': datetime.now().isoformat()
+                    }
             else:
-                # Full 임베딩 (하위 호환성)
-                conv_embedding, vit_embedding = self.image_processor.extract_dual_embeddings(image)
+                # ROI 듀얼 임베딩 추출 (BiSeNet 세그멘테이션 적용)
+                if use_roi:
+                    conv_embedding, vit_embedding = await cpu_pool.run(self.image_processor.extract_roi_dual_embeddings, image)
+                else:
+                    # Full 임베딩 (하위 호환성)
+                    conv_embedding, vit_embedding = await cpu_pool.run(self.image_processor.extract_dual_embeddings, image)
 
-            if conv_embedding is None or vit_embedding is None:
-                return {
-                    'success': False,
-                    'error': '이미지 임베딩 추출 실패',
-                    'timestamp': datetime.now().isoformat()
-                }
+                if conv_embedding is None or vit_embedding is None:
+                    return {
+                        'success': False,
+                        'error': '이미지 임베딩 추출 실패',
+                        'timestamp': datetime.now().isoformat()
+                    }
 
-            # 앙상블 예측 수행 (ROI 임베딩으로 검색)
-            ensemble_result = self.dual_manager.predict_ensemble_stage(
-                conv_embedding, vit_embedding, top_k, viewpoint, use_roi=use_roi
-            )
+                dims = {'convnext': len(conv_embedding), 'vit': len(vit_embedding)}
+
+                # 앙상블 예측 수행 (ROI 임베딩으로 검색)
+                ensemble_result = await io_pool.run(
+                    self.dual_manager.predict_ensemble_stage,
+                    conv_embedding, vit_embedding, top_k, viewpoint, use_roi=use_roi
+                )
+
+            # 캐스케이드 조기 종료 시 ConvNeXt는 실행하지 않음
+            conv_dim = dims['convnext'] if dims['convnext'] is not None else 'skipped (cascade)'
+            embedding_dimension = f"ConvNeXt: {conv_dim}, ViT: {dims['vit']}"
 
             if ensemble_result['predicted_stage'] is None:
                 return {
@@ -129,7 +214,7 @@ class HairLossAnalyzer:
                             'method': combined_result['method'],
                             'llm_analysis': combined_result.get('analysis_details', {}).get('llm_analysis', {}),
                             'llm_reasoning': combined_result.get('analysis_details', {}).get('llm_reasoning', ''),
-                            'embedding_dimension': f"ConvNeXt: {len(conv_embedding)}, ViT: {len(vit_embedding)}",
+                            'embedding_dimension': embedding_dimension,
                             'search_parameters': {'top_k': top_k, 'llm_enabled': True, 'ensemble': True, 'survey_included': survey_data is not None}
                         },
                         'ensemble_details': ensemble_result.get('ensemble_details', {}),
@@ -159,7 +244,7 @@ class HairLossAnalyzer:
                         'filename': filename,
                         'method': 'ensemble_only',
                         'total_similar_found': len(ensemble_result['similar_images']),
-                        'embedding_dimension': f"ConvNeXt: {len(conv_embedding)}, ViT: {len(vit_embedding)}",
+                        'embedding_dimension': embedding_dimension,
                         'search_parameters': {'top_k': top_k, 'llm_enabled': False, 'ensemble': True},
                         'ensemble_details': ensemble_result.get('ensemble_details', {})
                     },
@@ -177,6 +262,90 @@ class HairLossAnalyzer:
                 'timestamp': datetime.now().isoformat()
             }
 
+    def _index_folder(self, folder_path: str, recreate_index: bool) -> Dict:
+        """샤드 디렉토리를 잠그고 폴더 인덱싱 (다른 프로세스가 진행 중이면 IndexingBusyError)"""
+        from .embedding_pipeline import shard_suffix
+
+        output_dir = os.path.join(settings.EMBEDDING_SHARD_DIR, 'pinecone_dual' + shard_suffix())
+        with _shard_dir_lock(output_dir):
+            return self._index_folder_locked(folder_path, recreate_index, output_dir)
+
+    def _index_folder_locked(self, folder_path: str, recreate_index: bool, output_dir: str) -> Dict:
+        """폴더 이미지를 임베딩 파이프라인으로 샤드에 저장하고, 아직 올리지 않은 샤드를 두 인덱스에 업로드"""
+        from .embedding_pipeline import EmbeddingPipeline
+
+        pipeline = EmbeddingPipeline(
+            self.image_processor,
+            backbones=('convnext', 'vit'),
+            output_dir=output_dir,
+            metadata_extra={'gender': settings.DEFAULT_GENDER_FILTER},
+            mp_context='spawn'
+        )
+        if recreate_index:
+            pipeline.reset()
+            self.dual_manager.create_indices(delete_if_exists=True)
+
+        # 서비스 검색과 같은 두 종류 (Full / ROI) 임베딩
+        items = pipeline.scan(folder_path, embedding_types=('full', 'roi'))
+        summary = pipeline.run(items)
+
+        uploaded = 0
+        for shard_id in pipeline.pending_uploads('pinecone'):
+            uploaded += self.dual_manager.upsert_dual_embeddings(
+                pipeline.load_shard('convnext', shard_id),
+                pipeline.load_shard('vit', shard_id)
+            )
+            pipeline.mark_uploaded(shard_id, 'pinecone')
+
+        summary['uploaded'] = uploaded
+        return summary
+
+    async def add_data_from_folder(self, folder_path: str, recreate_index: bool = False) -> Dict:
+        """로컬 폴더(LEVEL_* 하위 폴더)의 이미지를 증분 임베딩해서 듀얼 인덱스에 추가"""
+        try:
+            if not os.path.isdir(folder_path):
+                return {
+                    'success': False,
+                    'message': '폴더를 찾을 수 없습니다',
+                    'error': f'폴더를 찾을 수 없습니다: {folder_path}',
+                    'timestamp': datetime.now().isoformat()
+                }
+
+            # 한 번에 하나만 실행 (진행 중이면 기다리지 않고 거절)
+            if not _indexing_lock.acquire(blocking=False):
+                raise IndexingBusyError("이미 폴더 인덱싱이 진행 중입니다")
+            try:
+                loop = asyncio.get_running_loop()
+                summary = await loop.run_in_executor(_indexing_executor, self._index_folder, folder_path, recreate_index)
+            finally:
+                _indexing_lock.release()
+
+            return {
+                'success': True,
+                'message': (f"임베딩 {summary['embedded']}개 생성, {summary['skipped']}개 건너뜀 (이미 처리됨), "
+                            f"실패 {summary['failed']}개, 업로드 {summary['uploaded']}개"),
+                'total_embeddings': summary['uploaded'],
+                'timestamp': datetime.now().isoformat()
+            }
+
+        except IndexingBusyError as e:
+            self.logger.warning(f"폴더 데이터 추가 거절: {e}")
+            return {
+                'success': False,
+                'busy': True,
+                'message': '이미 폴더 인덱싱이 진행 중입니다',
+                'error': str(e),
+                'timestamp': datetime.now().isoformat()
+            }
+        except Exception as e:
+            self.logger.error(f"폴더 데이터 추가 실패: {e}")
+            return {
+                'success': False,
+                'message': '폴더 데이터 추가 실패',
+                'error': str(e),
+                'timestamp': datetime.now().isoformat()
+            }
+
     def get_database_info(self) -> Dict:
         """데이터베이스 정보 조회 (듀얼 인덱스)"""
         try:
@@ -247,6 +416,9 @@ class HairLossAnalyzer:
             if not all(health_status['services'].values()):
                 health_status['status'] = 'degraded'
 
+            # Gemini 호출 통계 (마감 초과 / 헤지 / 응답 지연)
+            health_status['llm'] = self.llm_analyzer.get_llm_stats()
+
             return health_status
 
         except Exception as e:
@@ -0,0 +1,151 @@
+"""
+캐스케이드 모드 오프라인 리포트 / 임계값 보정
+LEVEL_* 폴더의 라벨 이미지마다 ViT-S / ConvNeXt-L 임베딩과 검색을 모두 실행한 뒤,
+(RAG_CASCADE_MIN_PROB, RAG_CASCADE_MIN_MARGIN) 조합별로
+- 조기 종료율 (ConvNeXt-L을 생략한 비율)
+- 전체 앙상블과의 예측 일치율
+- 라벨 정확도 (캐스케이드 / 전체 앙상블)
+- 평균 비용 절감 (서비스와 같은 단계 구분으로 측정한 ConvNeXt 추론 + 검색 시간 기준)
+을 계산하고, 목표 일치율을 만족하면서 조기 종료율이 가장 높은 임계값을 추천
+
+실행 (backend/python 디렉토리에서):
+    python -m services.hair_classification_rag.services.cascade_report --dataset <LEVEL_* 폴더> --target-agreement 0.98
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from .embedding_pipeline import scan_dataset
+
+
+def _exclude_self(matches: List[Dict], filename: str) -> List[Dict]:
+    """평가 이미지가 인덱스에 들어있으면 자기 자신은 kNN에서 제외"""
+    return [m for m in matches if m.get('metadata', {}).get('filename') != filename]
+
+
+def collect_predictions(analyzer, dataset_path: str, top_k: int, use_roi: bool, limit: int = None) -> List[Dict]:
+    """이미지별 ViT 확률 분포, 전체 앙상블 예측, 단계별 소요 시간 수집"""
+    from .ensemble_manager import EnsembleManager
+
+    processor = analyzer.image_processor
+    manager = analyzer.dual_manager
+    ensemble = EnsembleManager()
+    num_classes, t_vit = ensemble.config["num_classes"], ensemble.config["Tvit"]
+    search_filter = manager._build_search_filter(use_roi)
+
+    items = scan_dataset(dataset_path)
+    if limit:
+        items = items[:limit]
+
+    records = []
+    for item in items:
+        image = Image.open(item['path'])
+
+        # 서비스의 캐스케이드와 같은 순서로 시간 측정 (extract_cascade_embeddings / predict_cascade_stage)
+        # 1단계: 두 백본 몫 전처리 1회 + ViT forward + ViT 검색, 2단계(폴백): ConvNeXt forward + 검색
+        started = time.perf_counter()
+        vit_input, conv_input = processor._preprocess(image, use_roi, ('vit', 'convnext'))
+        vit_embedding = processor.embed_tensors(processor.vit_model, vit_input.unsqueeze(0))[0]
+        vit_matches = manager._search_many({'vit': ('vit', vit_embedding)}, top_k + 1, search_filter)[0]['vit']
+        vit_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        conv_embedding = processor.embed_tensors(processor.conv_model, conv_input.unsqueeze(0))[0]
+        conv_matches = manager._search_many({'convnext': ('convnext', conv_embedding)}, top_k + 1, search_filter)[0]['convnext']
+        conv_ms = (time.perf_counter() - started) * 1000
+
+        vit_matches = _exclude_self(vit_matches, item['filename'])[:top_k]
+        conv_matches = _exclude_self(conv_matches, item['filename'])[:top_k]
+
+        p_vit = ensemble.knn_to_probs(vit_matches, num_classes, t_vit)
+        full = ensemble.predict_from_dual_results(conv_matches, vit_matches)
+        top2 = np.sort(p_vit)[-2:]
+        records.append({
+            'filename': item['filename'],
+            'label': item['stage'],
+            'vit_pred': int(np.argmax(p_vit)) + 1,
+            'vit_max_prob': float(top2[-1]),
+            'vit_margin': float(top2[-1] - top2[0]),
+            'full_pred': full['predicted_stage'],
+            'vit_ms': vit_ms,
+            'conv_ms': conv_ms
+        })
+    return records
+
+
+def evaluate_thresholds(records: List[Dict], min_probs, min_margins) -> List[Dict]:
+    """임계값 조합별 조기 종료율 / 일치율 / 정확도 / 비용 절감"""
+    vit_ms = np.array([r['vit_ms'] for r in records])
+    conv_ms = np.array([r['conv_ms'] for r in records])
+    full_cost = float(np.mean(vit_ms + conv_ms))
+    labels = np.array([r['label'] for r in records])
+    full_pred = np.array([r['full_pred'] for r in records])
+    vit_pred = np.array([r['vit_pred'] for r in records])
+    max_prob = np.array([r['vit_max_prob'] for r in records])
+    margin = np.array([r['vit_margin'] for r in records])
+
+    rows = []
+    for min_prob in min_probs:
+        for min_margin in min_margins:
+            exit_early = (max_prob >= min_prob) & (margin >= min_margin)
+            cascade_pred = np.where(exit_early, vit_pred, full_pred)
+            cascade_cost = float(np.mean(vit_ms + np.where(exit_early, 0.0, conv_ms)))
+            rows.append({
+                'min_prob': round(float(min_prob), 2),
+                'min_margin': round(float(min_margin), 2),
+                'early_exit_rate': float(exit_early.mean()),
+                'agreement': float((cascade_pred == full_pred).mean()),
+                'cascade_accuracy': float((cascade_pred == labels).mean()),
+                'full_accuracy': float((full_pred == labels).mean()),
+                'avg_cost_ms': cascade_cost,
+                'cost_saved': 1.0 - cascade_cost / full_cost if full_cost > 0 else 0.0
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="캐스케이드 모드 일치율 / 비용 절감 리포트")
+    parser.add_argument("--dataset", required=True, help="LEVEL_* 하위 폴더가 있는 라벨 데이터셋 경로")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--full", action="store_true", help="ROI 대신 Full 임베딩으로 평가")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--target-agreement", type=float, default=0.98)
+    parser.add_argument("--output", default="cascade_report.json")
+    args = parser.parse_args()
+
+    from .analysis_service import HairLossAnalyzer
+
+    analyzer = HairLossAnalyzer()
+    records = collect_predictions(analyzer, args.dataset, args.top_k, use_roi=not args.full, limit=args.limit)
+    if not records:
+        print("⚠️ 평가할 이미지가 없습니다")
+        return
+
+    rows = evaluate_thresholds(records, np.arange(0.40, 0.96, 0.05), np.arange(0.0, 0.61, 0.05))
+    eligible = [r for r in rows if r['agreement'] >= args.target_agreement]
+    recommended = max(eligible, key=lambda r: (r['early_exit_rate'], -r['min_prob'])) if eligible else None
+
+    print(f"평가 이미지: {len(records)}개, 평균 ViT {np.mean([r['vit_ms'] for r in records]):.0f}ms / "
+          f"ConvNeXt {np.mean([r['conv_ms'] for r in records]):.0f}ms (임베딩 + 검색)")
+    if recommended:
+        print(f"✅ 추천 임계값 (일치율 ≥ {args.target_agreement}): RAG_CASCADE_MIN_PROB={recommended['min_prob']} "
+              f"RAG_CASCADE_MIN_MARGIN={recommended['min_margin']}")
+        print(f"   조기 종료 {recommended['early_exit_rate']:.1%}, 일치율 {recommended['agreement']:.1%}, "
+              f"정확도 {recommended['cascade_accuracy']:.1%} (전체 앙상블 {recommended['full_accuracy']:.1%}), "
+              f"평균 비용 절감 {recommended['cost_saved']:.1%}")
+    else:
+        print(f"⚠️ 일치율 {args.target_agreement}을 만족하는 임계값이 없습니다")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'recommended': recommended, 'thresholds': rows, 'records': records}, f, ensure_ascii=False, indent=2)
+    print(f"리포트 저장: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
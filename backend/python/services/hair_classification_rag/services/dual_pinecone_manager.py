@@ -5,9 +5,11 @@ ConvNeXt + ViT-S/16 듀얼 Pinecone 매니저
 
 import os
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from ..config.settings import settings
 from ..config.ensemble_config import get_ensemble_config
 
@@ -16,9 +18,17 @@ try:
 except ImportError as e:
     raise ImportError("Pinecone v3+ SDK is required. Install with: pip install pinecone==3.*") from e
 
+# ConvNeXt / ViT 인덱스 검색을 동시에 보내기 위한 전용 스레드 풀 (프로세스 전역)
+_query_executor = ThreadPoolExecutor(max_workers=settings.PINECONE_QUERY_WORKERS,
+                                     thread_name_prefix="pinecone-query")
+
 
 class DualPineconeManager:
-    def __init__(self):
+    def __init__(self, image_processor=None):
+        """
+        Args:
+            image_processor: 임베딩 추출에 사용할 ImageProcessor (분석기가 가진 인스턴스를 주입, 없으면 처음 필요할 때 한 번 생성)
+        """
         if not settings.PINECONE_API_KEY:
             raise ValueError("Pinecone API Key missing. Set PINECONE_API_KEY in .env")
 
@@ -50,6 +60,22 @@ class DualPineconeManager:
         self.cloud = cloud
         self.region = region
 
+        # 인덱스 핸들 캐시 (요청마다 Index 객체를 새로 만들지 않음)
+        self._indices = None
+        self._indices_lock = threading.Lock()
+
+        self._image_processor = image_processor
+        self._processor_lock = threading.Lock()
+
+        # 로컬 FAISS 복제본 (동기화된 인덱스가 있고 최신이면 네트워크 없이 검색)
+        self.local_replica = None
+        if settings.LOCAL_INDEX_ENABLED:
+            try:
+                from .local_index_sync import LocalIndexReplica
+                self.local_replica = LocalIndexReplica()
+            except ImportError as e:
+                self.logger.warning(f"로컬 인덱스 비활성화 (faiss 없음): {e}")
+
     def create_indices(self, delete_if_exists: bool = False) -> Tuple[bool, bool]:
         """두 인덱스 모두 생성"""
         conv_success = self._create_single_index(
@@ -99,53 +125,126 @@ class DualPineconeManager:
             return False
 
     def get_indices(self) -> Tuple:
-        """두 인덱스 객체 반환"""
+        """두 인덱스 객체 반환 (처음 한 번만 생성하고 재사용)"""
+        indices = self._indices
+        if indices is not None:
+            return indices
+
+        with self._indices_lock:
+            if self._indices is None:
+                try:
+                    self._indices = (self.pc.Index(self.index_conv), self.pc.Index(self.index_vit))
+                except Exception as e:
+                    self.logger.error(f"Get indices failed: {e}")
+                    raise
+            return self._indices
+
+    def _build_search_filter(self, use_roi: bool = False) -> Dict:
+        """검색 필터 구성"""
+        search_filter = {
+            "gender": {"$eq": settings.DEFAULT_GENDER_FILTER}
+        }
+
+        # ROI 임베딩 검색 시 embedding_type 필터 추가
+        if use_roi:
+            search_filter["embedding_type"] = {"$eq": "roi"}
+
+        # NOTE: viewpoint 필터를 제거하여 test_dual_image_fusion.py와 동일한 방식으로 동작
+        # 모든 각도의 이미지를 참조하는 RAG 방식으로 성능 향상
+        return search_filter
+
+    def _query_index(self, index, embedding: np.ndarray, top_k: int, search_filter: Dict) -> List[Dict]:
+        # 요청 자체에도 타임아웃을 걸어, _collect_matches가 포기한 검색이 _query_executor 스레드를 계속 잡고 있지 않게 함
+        res = index.query(
+            vector=embedding.tolist(),
+            top_k=top_k,
+            include_metadata=True,
+            filter=search_filter,
+            _request_timeout=settings.PINECONE_QUERY_TIMEOUT
+        )
+        return self._process_matches(res)
+
+    def _collect_matches(self, futures: Dict[str, object], timeout: float) -> Tuple[Dict[str, List[Dict]], List[str]]:
+        """
+        동시에 보낸 검색 결과 수집 (전체 대기 시간은 timeout 한 번으로 제한)
+        Returns: (이름별 매치 리스트, 실패/타임아웃된 검색 이름)
+        """
+        deadline = time.monotonic() + timeout
+        results, failed = {}, []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                self.logger.warning(f"Pinecone query timed out ({name}, {timeout}s)")
+                results[name] = []
+                failed.append(name)
+            except Exception as e:
+                self.logger.error(f"Pinecone query failed ({name}): {e}")
+                results[name] = []
+                failed.append(name)
+        return results, failed
+
+    def _get_image_processor(self):
+        """주입된 ImageProcessor 반환 (없으면 한 번만 생성해서 재사용)"""
+        if self._image_processor is None:
+            with self._processor_lock:
+                if self._image_processor is None:
+                    from .image_processor import ImageProcessor
+                    self._image_processor = ImageProcessor()
+        return self._image_processor
+
+    def _search_many(self, queries: Dict[str, Tuple[str, np.ndarray]], top_k: int,
+                     search_filter: Dict) -> Tuple[Dict[str, List[Dict]], List[str]]:
+        """
+        여러 검색 실행 (queries: 이름 → (모델 키 'convnext'/'vit', 임베딩))
+        로컬 복제본이 최신이면 로컬에서 바로 검색, 아니면 Pinecone에 동시에 보내고 PINECONE_QUERY_TIMEOUT 안에 수집
+        """
+        results, remote = {}, {}
+        use_local = self.local_replica is not None and self.local_replica.is_fresh()
+        for name, (model_key, embedding) in queries.items():
+            if use_local:
+                try:
+                    results[name] = self.local_replica.query(model_key, embedding, top_k, search_filter)
+                    continue
+                except Exception as e:
+                    self.logger.warning(f"Local index query failed ({name}), falling back to Pinecone: {e}")
+            remote[name] = (model_key, embedding)
+
+        if not remote:
+            return results, []
+
         try:
-            idx_conv = self.pc.Index(self.index_conv)
-            idx_vit = self.pc.Index(self.index_vit)
-            return idx_conv, idx_vit
-        except Exception as e:
-            self.logger.error(f"Get indices failed: {e}")
-            raise
+            indices = dict(zip(('convnext', 'vit'), self.get_indices()))
+        except Exception:
+            results.update({name: [] for name in remote})
+            return results, list(remote)
+
+        futures = {
+            name: _query_executor.submit(self._query_index, indices[model_key], embedding, top_k, search_filter)
+            for name, (model_key, embedding) in remote.items()
+        }
+        remote_results, failed = self._collect_matches(futures, settings.PINECONE_QUERY_TIMEOUT)
+        results.update(remote_results)
+        return results, failed
+
+    def _dual_search(self, conv_embedding: np.ndarray, vit_embedding: np.ndarray, top_k: int = 10,
+                     use_roi: bool = False) -> Tuple[List[Dict], List[Dict], List[str]]:
+        """
+        ConvNeXt / ViT 인덱스를 동시에 검색
+        한쪽이 타임아웃/실패하면 빈 결과로 두고 나머지 모델만으로 앙상블 (EnsembleManager에서 가중치 0)
+        Returns: (conv 매치, vit 매치, 실패한 모델 이름 리스트)
+        """
+        results, failed = self._search_many(
+            {'convnext': ('convnext', conv_embedding), 'vit': ('vit', vit_embedding)},
+            top_k, self._build_search_filter(use_roi)
+        )
+        return results['convnext'], results['vit'], failed
 
     def dual_search(self, conv_embedding: np.ndarray, vit_embedding: np.ndarray,
                    top_k: int = 10, viewpoint: str = None, use_roi: bool = False) -> Tuple[List[Dict], List[Dict]]:
         """ConvNeXt와 ViT 임베딩으로 동시 검색 (Full 또는 ROI)"""
         try:
-            idx_conv, idx_vit = self.get_indices()
-
-            # 필터 구성
-            search_filter = {
-                "gender": {"$eq": settings.DEFAULT_GENDER_FILTER}
-            }
-
-            # ROI 임베딩 검색 시 embedding_type 필터 추가
-            if use_roi:
-                search_filter["embedding_type"] = {"$eq": "roi"}
-
-            # NOTE: viewpoint 필터를 제거하여 test_dual_image_fusion.py와 동일한 방식으로 동작
-            # 모든 각도의 이미지를 참조하는 RAG 방식으로 성능 향상
-
-            # ConvNeXt 검색
-            res_conv = idx_conv.query(
-                vector=conv_embedding.tolist(),
-                top_k=top_k,
-                include_metadata=True,
-                filter=search_filter
-            )
-
-            # ViT 검색
-            res_vit = idx_vit.query(
-                vector=vit_embedding.tolist(),
-                top_k=top_k,
-                include_metadata=True,
-                filter=search_filter
-            )
-
-            # 결과 정리
-            conv_matches = self._process_matches(res_conv)
-            vit_matches = self._process_matches(res_vit)
-
+            conv_matches, vit_matches, _ = self._dual_search(conv_embedding, vit_embedding, top_k, use_roi)
             return conv_matches, vit_matches
 
         except Exception as e:
@@ -173,9 +272,9 @@ class DualPineconeManager:
         try:
             from .ensemble_manager import EnsembleManager
 
-            # 듀얼 검색 수행 (use_roi 파라미터 전달)
-            conv_matches, vit_matches = self.dual_search(
-                conv_embedding, vit_embedding, top_k, viewpoint, use_roi=use_roi
+            # 듀얼 검색 수행 (use_roi 파라미터 전달, 두 인덱스 동시 검색)
+            conv_matches, vit_matches, failed_models = self._dual_search(
+                conv_embedding, vit_embedding, top_k, use_roi=use_roi
             )
 
             if not conv_matches and not vit_matches:
@@ -191,12 +290,18 @@ class DualPineconeManager:
             ensemble = EnsembleManager()
             result = ensemble.predict_from_dual_results(conv_matches, vit_matches)
 
+            ensemble_details = result.get('ensemble_details', {})
+            if failed_models:
+                # 한쪽 인덱스만 응답 → 단일 모델 결과
+                ensemble_details['degraded'] = True
+                ensemble_details['failed_models'] = failed_models
+
             return {
                 'predicted_stage': result['predicted_stage'],
                 'confidence': result['confidence'],
                 'stage_scores': result['stage_scores'],
                 'similar_images': result['similar_images'],
-                'ensemble_details': result.get('ensemble_details', {}),
+                'ensemble_details': ensemble_details,
                 'embedding_type': 'roi' if use_roi else 'full'
             }
 
@@ -210,34 +315,110 @@ class DualPineconeManager:
                 'error': str(e)
             }
 
+    async def predict_cascade_stage(self, vit_embedding: np.ndarray,
+                                    conv_embedding_fn: Callable[[], Awaitable[Optional[np.ndarray]]],
+                                    top_k: int = 10, use_roi: bool = False) -> Dict:
+        """
+        캐스케이드 예측: ViT-S 검색 → kNN 확률이 충분히 확실하면 조기 종료,
+        애매할 때만 await conv_embedding_fn()으로 ConvNeXt-L 임베딩을 만들어 듀얼 앙상블 (ViT 결과 재사용)
+        검색 대기는 io_pool에서 실행 (ConvNeXt 추론은 conv_embedding_fn 쪽에서 cpu_pool로)
+        """
+        try:
+            from services.common.worker_pools import io_pool
+            from .ensemble_manager import EnsembleManager
+
+            ensemble = EnsembleManager()
+            search_filter = self._build_search_filter(use_roi)
+            results, failed_models = await io_pool.run(
+                self._search_many, {'vit': ('vit', vit_embedding)}, top_k, search_filter
+            )
+            vit_matches = results['vit']
+
+            p_vit = ensemble.knn_to_probs(vit_matches, ensemble.config["num_classes"], ensemble.config["Tvit"])
+            decision = ensemble.cascade_decision(p_vit)
+
+            if decision['accept']:
+                result = ensemble.predict_from_vit_result(vit_matches, p_vit)
+                cascade_stage = 'vit_only'
+            else:
+                conv_embedding = await conv_embedding_fn()
+                if conv_embedding is None:
+                    raise ValueError('ConvNeXt 임베딩 추출 실패')
+                conv_results, conv_failed = await io_pool.run(
+                    self._search_many, {'convnext': ('convnext', conv_embedding)}, top_k, search_filter
+                )
+                failed_models += conv_failed
+                conv_matches = conv_results['convnext']
+                if not conv_matches and not vit_matches:
+                    return {
+                        'predicted_stage': None,
+                        'confidence': 0,
+                        'stage_scores': {},
+                        'similar_images': [],
+                        'error': 'No similar images found'
+                    }
+                result = ensemble.predict_from_dual_results(conv_matches, vit_matches)
+                cascade_stage = 'full_ensemble'
+
+            ensemble_details = result.get('ensemble_details', {})
+            ensemble_details['cascade'] = {'stage': cascade_stage, **decision}
+            if failed_models:
+                ensemble_details['degraded'] = True
+                ensemble_details['failed_models'] = failed_models
+
+            return {
+                'predicted_stage': result['predicted_stage'],
+                'confidence': result['confidence'],
+                'stage_scores': result['stage_scores'],
+                'similar_images': result['similar_images'],
+                'ensemble_details': ensemble_details,
+                'embedding_type': 'roi' if use_roi else 'full'
+            }
+
+        except Exception as e:
+            self.logger.error(f"Cascade prediction failed: {e}")
+            return {
+                'predicted_stage': None,
+                'confidence': 0,
+                'stage_scores': {},
+                'similar_images': [],
+                'error': str(e)
+            }
+
     async def dual_search_and_ensemble(self, primary_image, secondary_image,
                                      top_k: int = 10,
                                      primary_viewpoint: str = None,
                                      secondary_viewpoint: str = None) -> Dict:
         """듀얼 이미지 검색 및 Late Fusion을 위한 결과 반환"""
         try:
-            from .image_processor import ImageProcessor
-
-            # 이미지 프로세서 초기화
-            processor = ImageProcessor()
+            from services.common.worker_pools import cpu_pool, io_pool
 
-            # Primary 이미지 임베딩
-            primary_conv_emb = processor.get_convnext_embedding(primary_image)
-            primary_vit_emb = processor.get_vit_embedding(primary_image)
+            processor = self._get_image_processor()
 
-            # Secondary 이미지 임베딩
-            secondary_conv_emb = processor.get_convnext_embedding(secondary_image)
-            secondary_vit_emb = processor.get_vit_embedding(secondary_image)
-
-            # Primary 이미지 검색
-            primary_conv_matches, primary_vit_matches = self.dual_search(
-                primary_conv_emb, primary_vit_emb, top_k, primary_viewpoint
+            # Primary / Secondary 이미지를 백본별 batch-of-2 forward로 임베딩
+            conv_embs, vit_embs = await cpu_pool.run(
+                processor.extract_dual_embeddings_batch, [primary_image, secondary_image]
             )
-
-            # Secondary 이미지 검색
-            secondary_conv_matches, secondary_vit_matches = self.dual_search(
-                secondary_conv_emb, secondary_vit_emb, top_k, secondary_viewpoint
+            if any(emb is None for emb in conv_embs + vit_embs):
+                raise ValueError('이미지 임베딩 추출 실패')
+
+            # 4개 검색 (Primary/Secondary × ConvNeXt/ViT) 동시 실행
+            results, failed = await io_pool.run(
+                self._search_many,
+                {
+                    'primary_convnext': ('convnext', conv_embs[0]),
+                    'primary_vit': ('vit', vit_embs[0]),
+                    'secondary_convnext': ('convnext', conv_embs[1]),
+                    'secondary_vit': ('vit', vit_embs[1])
+                },
+                top_k, self._build_search_filter()
             )
+            primary_conv_matches = results['primary_convnext']
+            primary_vit_matches = results['primary_vit']
+            secondary_conv_matches = results['secondary_convnext']
+            secondary_vit_matches = results['secondary_vit']
+            if failed:
+                self.logger.warning(f"Dual image search degraded: {failed}")
 
             return {
                 'success': True,
@@ -246,7 +427,8 @@ class DualPineconeManager:
                 'secondary_convnext_matches': secondary_conv_matches,
                 'secondary_vit_matches': secondary_vit_matches,
                 'primary_viewpoint': primary_viewpoint,
-                'secondary_viewpoint': secondary_viewpoint
+                'secondary_viewpoint': secondary_viewpoint,
+                'failed_searches': failed
             }
 
         except Exception as e:
@@ -256,6 +438,22 @@ class DualPineconeManager:
                 'error': str(e)
             }
 
+    def upsert_dual_embeddings(self, conv_data: Dict, vit_data: Dict, batch_size: int = 100) -> int:
+        """
+        ConvNeXt / ViT 임베딩을 각 인덱스에 배치 업로드 (embeddings는 float32 NumPy 배열, 배치 단위로만 리스트 변환)
+        Returns: 인덱스당 업로드한 벡터 수
+        """
+        idx_conv, idx_vit = self.get_indices()
+        for index, data in ((idx_conv, conv_data), (idx_vit, vit_data)):
+            embeddings, metadata, ids = data['embeddings'], data['metadata'], data['ids']
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                index.upsert(vectors=[
+                    {'id': id_, 'values': np.asarray(vector, dtype=np.float32).tolist(), 'metadata': meta}
+                    for id_, vector, meta in zip(ids[start:end], embeddings[start:end], metadata[start:end])
+                ])
+        return len(conv_data['ids'])
+
     def indices_exist(self) -> Tuple[bool, bool]:
         """두 인덱스 존재 여부 확인"""
         try:
@@ -292,7 +490,8 @@ class DualPineconeManager:
             return {
                 'success': True,
                 'convnext': conv_info,
-                'vit': vit_info
+                'vit': vit_info,
+                'local_replica': self.local_replica.stats() if self.local_replica is not None else None
             }
 
         except Exception as e:
@@ -0,0 +1,330 @@
+"""
+배치 / 재개 가능한 데이터셋 임베딩 파이프라인
+- DataLoader 워커에서 디코딩 + 향상 + ROI 크롭 + 백본별 전처리
+- 백본(ConvNeXt-L / ViT-S)별 배치 forward
+- float32 NumPy 샤드(.npy) + 메타데이터(.json)를 샤드 단위로 바로 디스크에 저장 (Python 리스트로 모으지 않음)
+- state.json에 완료된 샤드 / 업로드 여부 기록 → 중단 후 다시 실행하면 이어서 처리
+- 파일 내용 해시(blake2b)가 이미 처리된 이미지는 건너뜀 (파일명이 바뀌어도 중복 임베딩 없음)
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+import logging
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+STATE_FILE = "state.json"
+
+# 백본 이름 → (ImageProcessor 모델 속성, 전처리 속성)
+BACKBONES = {
+    'convnext': ('conv_model', 'transform_conv'),
+    'vit': ('vit_model', 'transform_vit')
+}
+
+
+def preprocess_mode() -> str:
+    """현재 전처리 방식 이름 (state.json / 샤드 디렉토리 구분용)"""
+    return 'fused' if settings.FUSED_PREPROCESS else 'legacy'
+
+
+def shard_suffix() -> str:
+    """전처리 방식별 샤드 디렉토리 접미사 (기존 PIL 경로는 접미사 없음)"""
+    return '_fused' if settings.FUSED_PREPROCESS else ''
+
+
+def hash_file(path: str) -> str:
+    """파일 내용 해시 (blake2b 128bit)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_dataset(dataset_path: str, stages: Optional[Iterable[int]] = None,
+                 embedding_types: Tuple[str, ...] = ('full',)) -> List[Dict]:
+    """LEVEL_{stage} 폴더의 이미지 목록 (stages=None이면 존재하는 LEVEL_* 폴더 전체)"""
+    if stages is None:
+        stages = sorted(int(m.group(1)) for m in
+                        (re.fullmatch(r"LEVEL_(\d+)", name) for name in os.listdir(dataset_path)) if m)
+
+    items = []
+    for stage in stages:
+        stage_folder = os.path.join(dataset_path, f"LEVEL_{stage}")
+        if not os.path.exists(stage_folder):
+            logger.warning(f"폴더가 존재하지 않음: {stage_folder}")
+            continue
+
+        for filename in sorted(os.listdir(stage_folder)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image_path = os.path.join(stage_folder, filename)
+            try:
+                content_hash = hash_file(image_path)
+            except OSError as e:
+                logger.error(f"파일 읽기 실패 {image_path}: {e}")
+                continue
+            for embedding_type in embedding_types:
+                file_id = f"level_{stage}_{filename}"
+                items.append({
+                    'id': file_id if embedding_type == 'full' else f"{file_id}_{embedding_type}",
+                    'stage': stage,
+                    'level': f'level_{stage}',
+                    'filename': filename,
+                    'path': image_path,
+                    'content_hash': content_hash,
+                    'embedding_type': embedding_type
+                })
+    return items
+
+
+class _ImageFileDataset(Dataset):
+    """DataLoader 워커에서 이미지 디코딩 + 향상 + 백본별 전처리 (모델은 들고 있지 않음)"""
+
+    def __init__(self, items: List[Dict], transforms: Dict[str, Callable], fused: bool = False):
+        self.items = items
+        self.transforms = transforms
+        self.fused = fused
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        from .image_processor import INPUT_SIZES, crop_center_roi, enhance_image, fused_preprocess
+
+        item = self.items[i]
+        use_roi = item['embedding_type'] == 'roi'
+        try:
+            if self.fused:
+                # 경로를 넘겨 JPEG는 필요한 해상도까지만 디코딩
+                tensors = fused_preprocess(item['path'], use_roi, [INPUT_SIZES[name] for name in self.transforms])
+                return i, dict(zip(self.transforms, tensors))
+
+            image = Image.open(item['path']).convert('RGB')
+            if use_roi:
+                image = crop_center_roi(image)
+            image = enhance_image(image)
+            return i, {name: transform(image) for name, transform in self.transforms.items()}
+        except Exception as e:
+            logger.error(f"이미지 로드 실패 {item['path']}: {e}")
+            return i, None
+
+
+def _collate(batch):
+    """디코딩 실패한 샘플은 빼고 백본별로 stack"""
+    loaded = [(i, tensors) for i, tensors in batch if tensors is not None]
+    failed = [i for i, tensors in batch if tensors is None]
+    if not loaded:
+        return [], {}, failed
+    indices = [i for i, _ in loaded]
+    stacked = {name: torch.stack([tensors[name] for _, tensors in loaded]) for name in loaded[0][1]}
+    return indices, stacked, failed
+
+
+class EmbeddingPipeline:
+    """ImageProcessor의 백본으로 데이터셋을 샤드 단위 임베딩 (output_dir에 상태 저장, 재실행 시 이어서 처리)"""
+
+    def __init__(self, processor, backbones: Tuple[str, ...] = ('convnext', 'vit'), output_dir: str = None,
+                 batch_size: int = None, num_workers: int = None, shard_size: int = None,
+                 metadata_extra: Dict = None, mp_context: str = None):
+        self.processor = processor
+        self.backbones = tuple(backbones)
+        # 전처리 방식이 다르면 임베딩이 달라지므로 샤드 디렉토리를 분리 (state.json에도 기록해서 섞이지 않게 함)
+        self.preprocess = preprocess_mode()
+        shard_name = '_'.join(self.backbones) + shard_suffix()
+        self.output_dir = output_dir or os.path.join(settings.EMBEDDING_SHARD_DIR, shard_name)
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.num_workers = settings.EMBEDDING_NUM_WORKERS if num_workers is None else num_workers
+        self.shard_size = shard_size or settings.EMBEDDING_SHARD_SIZE
+        self.metadata_extra = metadata_extra or {}
+        # DataLoader 워커 시작 방식 (서버 스레드에서 실행할 때는 'spawn' - 스레드가 있는 프로세스를 fork하지 않음)
+        self.mp_context = mp_context
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.state = self._load_state()
+        self.known_keys = self._load_known_keys()
+
+    # ---------- 상태 ----------
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.output_dir, STATE_FILE)
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('backbones') != list(self.backbones):
+                raise ValueError(f"다른 백본 구성의 샤드 디렉토리입니다: {self.output_dir}")
+            # preprocess 항목이 없는 상태 파일은 단일 전처리 도입 전(기존 PIL 경로)에 만든 것
+            if state.get('preprocess', 'legacy') != self.preprocess:
+                raise ValueError(
+                    f"다른 전처리 방식({state.get('preprocess', 'legacy')})의 샤드 디렉토리입니다: {self.output_dir} "
+                    f"(현재 {self.preprocess}, RAG_FUSED_PREPROCESS 확인 또는 recreate로 재생성)"
+                )
+            return state
+        return {'backbones': list(self.backbones), 'preprocess': self.preprocess, 'shards': []}
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _shard_paths(self, shard_id: int) -> Dict[str, str]:
+        paths = {name: os.path.join(self.output_dir, f"{name}_{shard_id:05d}.npy") for name in self.backbones}
+        paths['meta'] = os.path.join(self.output_dir, f"meta_{shard_id:05d}.json")
+        return paths
+
+    def _load_shard_metadata(self, shard_id: int) -> List[Dict]:
+        with open(self._shard_paths(shard_id)['meta'], encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load_known_keys(self) -> Set[Tuple[str, str]]:
+        keys = set()
+        for shard in self.state['shards']:
+            for meta in self._load_shard_metadata(shard['id']):
+                keys.add((meta['content_hash'], meta['embedding_type']))
+        return keys
+
+    def reset(self):
+        """샤드 / 상태 전체 삭제 (인덱스 재생성 시)"""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.state = {'backbones': list(self.backbones), 'preprocess': self.preprocess, 'shards': []}
+        self.known_keys = set()
+
+    # ---------- 스캔 / 임베딩 ----------
+
+    def scan(self, dataset_path: str, stages: Optional[Iterable[int]] = None,
+             embedding_types: Tuple[str, ...] = ('full',)) -> List[Dict]:
+        return scan_dataset(dataset_path, stages, embedding_types)
+
+    def _write_shard(self, buffers: Dict[str, List[np.ndarray]], metadata: List[Dict]):
+        """샤드 파일을 쓴 뒤 state.json에 마지막으로 기록 (중간에 멈추면 다음 실행에서 덮어씀)"""
+        shard_id = (self.state['shards'][-1]['id'] + 1) if self.state['shards'] else 0
+        paths = self._shard_paths(shard_id)
+
+        for name in self.backbones:
+            embeddings = np.concatenate(buffers[name]).astype(np.float32, copy=False)
+            tmp_path = paths[name] + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, embeddings)
+            os.replace(tmp_path, paths[name])
+
+        tmp_path = paths['meta'] + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(tmp_path, paths['meta'])
+
+        self.state['shards'].append({'id': shard_id, 'count': len(metadata), 'uploaded_to': []})
+        self._save_state()
+        self.known_keys.update((meta['content_hash'], meta['embedding_type']) for meta in metadata)
+        logger.info(f"샤드 {shard_id} 저장: {len(metadata)}개")
+
+    def run(self, items: List[Dict]) -> Dict:
+        """아직 처리되지 않은 이미지만 임베딩해서 샤드로 저장"""
+        pending, seen = [], set()
+        for item in items:
+            key = (item['content_hash'], item['embedding_type'])
+            if key in self.known_keys or key in seen:
+                continue
+            seen.add(key)
+            pending.append(item)
+
+        summary = {'total': len(items), 'skipped': len(items) - len(pending), 'embedded': 0, 'failed': 0}
+        if not pending:
+            return summary
+
+        transforms = {name: getattr(self.processor, BACKBONES[name][1]) for name in self.backbones}
+        models = {name: getattr(self.processor, BACKBONES[name][0]) for name in self.backbones}
+        loader = DataLoader(
+            _ImageFileDataset(pending, transforms, fused=settings.FUSED_PREPROCESS),
+            batch_size=self.batch_size,
+            num_workers=self.num_workers,
+            collate_fn=_collate,
+            multiprocessing_context=self.mp_context if self.num_workers > 0 else None
+        )
+
+        started = time.perf_counter()
+        buffers = {name: [] for name in self.backbones}
+        buffer_metadata = []
+        for indices, tensors, failed in loader:
+            summary['failed'] += len(failed)
+            if not indices:
+                continue
+
+            with torch.no_grad():
+                for name in self.backbones:
+                    features = models[name](tensors[name].to(self.processor.device)).float().cpu().numpy()
+                    features /= np.linalg.norm(features, axis=1, keepdims=True) + 1e-12  # L2 정규화
+                    buffers[name].append(features)
+
+            for i in indices:
+                buffer_metadata.append({**pending[i], **self.metadata_extra})
+
+            if len(buffer_metadata) >= self.shard_size:
+                summary['embedded'] += len(buffer_metadata)
+                self._write_shard(buffers, buffer_metadata)
+                buffers = {name: [] for name in self.backbones}
+                buffer_metadata = []
+
+        if buffer_metadata:
+            summary['embedded'] += len(buffer_metadata)
+            self._write_shard(buffers, buffer_metadata)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"임베딩 완료: {summary['embedded']}개 ({elapsed:.1f}s), 건너뜀 {summary['skipped']}개, 실패 {summary['failed']}개")
+        return summary
+
+    # ---------- 결과 읽기 / 업로드 상태 ----------
+
+    def load_shard(self, backbone: str, shard_id: int) -> Dict:
+        """샤드 하나 ({'embeddings': float32 [N, D] (mmap), 'metadata', 'ids'})"""
+        metadata = self._load_shard_metadata(shard_id)
+        return {
+            'embeddings': np.load(self._shard_paths(shard_id)[backbone], mmap_mode='r'),
+            'metadata': metadata,
+            'ids': [meta['id'] for meta in metadata]
+        }
+
+    def load(self, backbone: str, keys: Optional[Set[Tuple[str, str]]] = None) -> Dict:
+        """저장된 샤드를 합쳐서 반환 (keys가 있으면 해당 (content_hash, embedding_type)만)"""
+        embeddings, metadata = [], []
+        for shard in self.state['shards']:
+            shard_data = self.load_shard(backbone, shard['id'])
+            rows = [i for i, meta in enumerate(shard_data['metadata'])
+                    if keys is None or (meta['content_hash'], meta['embedding_type']) in keys]
+            if rows:
+                embeddings.append(np.asarray(shard_data['embeddings'][rows], dtype=np.float32))
+                metadata.extend(shard_data['metadata'][i] for i in rows)
+
+        dim = embeddings[0].shape[1] if embeddings else 0
+        return {
+            'embeddings': np.concatenate(embeddings) if embeddings else np.zeros((0, dim), dtype=np.float32),
+            'metadata': metadata,
+            'ids': [meta['id'] for meta in metadata]
+        }
+
+    def pending_uploads(self, target: str) -> List[int]:
+        """target(예: 'pinecone')에 아직 업로드되지 않은 샤드 id"""
+        return [shard['id'] for shard in self.state['shards'] if target not in shard['uploaded_to']]
+
+    def mark_uploaded(self, shard_id: int, target: str):
+        for shard in self.state['shards']:
+            if shard['id'] == shard_id and target not in shard['uploaded_to']:
+                shard['uploaded_to'].append(target)
+        self._save_state()
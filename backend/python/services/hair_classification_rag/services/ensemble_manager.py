@@ -93,6 +93,51 @@ class EnsembleManager:
 
         return pred, P_ens, weights_info
 
+    def cascade_decision(self, p_vit: np.ndarray, min_prob: float = None, min_margin: float = None) -> Dict:
+        """
+        ViT 확률 분포만으로 결정해도 되는지 (최대 확률과 1-2위 차이가 모두 임계값 이상이면 조기 종료)
+        """
+        cascade = self.config["cascade"]
+        min_prob = cascade["min_prob"] if min_prob is None else min_prob
+        min_margin = cascade["min_margin"] if min_margin is None else min_margin
+
+        top2 = np.sort(p_vit)[-2:]
+        max_prob = float(top2[-1])
+        margin = float(top2[-1] - top2[0])
+        return {
+            "accept": max_prob >= min_prob and margin >= min_margin,
+            "max_prob": max_prob,
+            "margin": margin,
+            "min_prob": min_prob,
+            "min_margin": min_margin
+        }
+
+    def predict_from_vit_result(self, vit_matches: List[Dict], p_vit: np.ndarray = None) -> Dict:
+        """ViT 검색 결과만으로 예측 (캐스케이드 조기 종료 시, predict_from_dual_results와 같은 형식)"""
+        if p_vit is None:
+            p_vit = self.knn_to_probs(vit_matches, self.config["num_classes"], self.config["Tvit"])
+
+        similar_images = []
+        for i, match in enumerate(vit_matches[:5]):  # 상위 5개
+            if "metadata" in match:
+                similar_images.append({
+                    "filename": match["metadata"].get("filename", f"vit_image_{i}"),
+                    "stage": self._extract_stage_from_metadata(match["metadata"]),
+                    "similarity": round(match["score"], 3),
+                    "source": "vit"
+                })
+
+        return {
+            "predicted_stage": int(np.argmax(p_vit)) + 1,
+            "confidence": float(np.max(p_vit)),
+            "stage_scores": {i+1: float(p_vit[i]) for i in range(self.config["num_classes"])},
+            "similar_images": similar_images,
+            "ensemble_details": {
+                "method": "cascade_vit_only",
+                "vit_probs": p_vit.tolist()
+            }
+        }
+
     def predict_from_dual_results(self, conv_matches: List[Dict], vit_matches: List[Dict]) -> Dict:
         """ConvNeXt + ViT 검색 결과로부터 앙상블 예측"""
         try:
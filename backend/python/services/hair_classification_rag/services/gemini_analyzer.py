@@ -1,14 +1,21 @@
 import os
+import asyncio
 import base64
 import logging
 import json
 import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from PIL import Image
 import io
 import google.generativeai as genai
 from ..config.settings import settings
 
+# 동기 Gemini 호출 / 이미지 축소용 전용 스레드 (cpu_pool·io_pool과 분리, 헤지 요청 몫까지 2배)
+_llm_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY * 2, thread_name_prefix="gemini-llm")
+
 
 class GeminiHairAnalyzer:
     def __init__(self):
@@ -50,6 +57,11 @@ class GeminiHairAnalyzer:
             5: "Sinclair Scale Stage 5 (최중증 탈모) - 정수리 전체 두피 노출, 모발 밀도 심각한 감소"
         }
 
+        # 동시 호출 수 제한 + 최근 응답 지연 (헤지 기준) + 호출 통계
+        self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._latencies = deque(maxlen=200)
+        self._stats = {'calls': 0, 'timeouts': 0, 'failures': 0, 'hedged': 0, 'hedge_wins': 0}
+
     def encode_image_to_base64(self, image: Image.Image) -> str:
         """PIL Image를 base64로 인코딩"""
         try:
@@ -218,24 +230,102 @@ class GeminiHairAnalyzer:
 """
         return prompt
 
+    @staticmethod
+    def _prepare_image(image: Image.Image) -> Image.Image:
+        """Gemini 전송용 축소본 (원본은 임베딩 해시가 기억되어 있고 다른 단계에서도 쓰므로 복사본을 축소)"""
+        max_size = 1024
+        if image.width > max_size or image.height > max_size:
+            image = image.copy()
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        return image
+
+    async def _generate(self, prompt: str, image: Image.Image) -> str:
+        """Gemini 호출 1회 (비동기 API, 또는 전용 스레드 풀에서 동기 API)"""
+        if settings.LLM_USE_ASYNC_API and hasattr(self.model, 'generate_content_async'):
+            response = await self.model.generate_content_async([prompt, image])
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(_llm_executor, self.model.generate_content, [prompt, image])
+        return response.text.strip()
+
+    async def _attempt(self, prompt: str, image: Image.Image) -> str:
+        """동시 호출 수 제한 안에서 호출하고 응답 지연 기록"""
+        async with self._semaphore:
+            started = time.perf_counter()
+            content = await self._generate(prompt, image)
+            self._latencies.append(time.perf_counter() - started)
+            return content
+
+    def _latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        """헤지 요청을 보낼 대기 시간 (비활성화 또는 표본 부족 시 None)"""
+        if not settings.LLM_HEDGE_ENABLED or len(self._latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self._latency_percentile(settings.LLM_HEDGE_PERCENTILE)
+
+    async def _generate_with_hedge(self, prompt: str, image: Image.Image) -> str:
+        """
+        첫 요청이 지연 백분위를 넘기면 같은 요청을 한 번 더 보내고 먼저 성공한 응답 사용
+        (동시 호출 슬롯이 남아 있을 때만 헤지, 끝나지 않은 요청은 취소)
+        """
+        tasks = [asyncio.ensure_future(self._attempt(prompt, image))]
+        try:
+            delay = self._hedge_delay()
+            if delay is None:
+                return await tasks[0]
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or self._semaphore.locked():
+                return await tasks[0]
+
+            self._stats['hedged'] += 1
+            self.logger.info(f"Gemini 응답 지연 ({delay:.1f}s 초과) - 헤지 요청 전송")
+            tasks.append(asyncio.ensure_future(self._attempt(prompt, image)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self._stats['hedge_wins'] += 1
+                        return task.result()
+            return tasks[0].result()  # 둘 다 실패 → 첫 요청의 예외
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
     async def analyze_with_llm(self, image: Image.Image, rag_results: Dict, survey_data: Dict = None) -> Dict:
-        """Gemini를 사용한 탈모 분석 (Swin과 동일한 응답 형식)"""
+        """
+        Gemini를 사용한 탈모 분석 (Swin과 동일한 응답 형식)
+        이벤트 루프를 막지 않도록 비동기로 호출하고, RAG_LLM_DEADLINE_SECONDS를 넘기면 기본 템플릿 반환
+        """
         try:
             self.logger.info("Gemini LLM 분석 시작")
+            self._stats['calls'] += 1
 
-            # 이미지를 PIL Image로 준비 (Gemini는 PIL Image 직접 지원)
-            # 크기 최적화
-            max_size = 1024
-            if image.width > max_size or image.height > max_size:
-                image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+            # 이미지를 PIL Image로 준비 (Gemini는 PIL Image 직접 지원) - 크기 최적화는 전용 스레드에서
+            loop = asyncio.get_running_loop()
+            image = await loop.run_in_executor(_llm_executor, self._prepare_image, image)
 
             # 프롬프트 생성
             prompt = self.create_analysis_prompt(rag_results, survey_data)
 
             # Gemini API 호출 (이미지 + 텍스트)
             self.logger.info("Gemini API 호출 중...")
-            response = self.model.generate_content([prompt, image])
-            content = response.text.strip()
+            try:
+                content = await asyncio.wait_for(self._generate_with_hedge(prompt, image),
+                                                 timeout=settings.LLM_DEADLINE_SECONDS)
+            except asyncio.TimeoutError:
+                self._stats['timeouts'] += 1
+                self.logger.warning(f"Gemini 응답 마감 시간 초과 ({settings.LLM_DEADLINE_SECONDS}s) - 기본 템플릿 사용")
+                return self._generate_fallback_result(rag_results, survey_data, reason='LLM 응답 시간 초과로 기본 템플릿 사용')
 
             self.logger.info(f"Gemini 응답 수신 완료 (길이: {len(content)})")
 
@@ -270,12 +360,29 @@ class GeminiHairAnalyzer:
             }
 
         except Exception as e:
+            self._stats['failures'] += 1
             self.logger.error(f"Gemini 분석 실패: {e}")
             return self._generate_fallback_result(rag_results, survey_data)
 
-    def _generate_fallback_result(self, rag_results: Dict, survey_data: Dict = None) -> Dict:
+    def get_llm_stats(self) -> Dict:
+        """LLM 호출 통계 (마감 초과 / 실패 / 헤지 횟수, 응답 지연 p50·p95)"""
+        p50, p95 = self._latency_percentile(50), self._latency_percentile(95)
+        return {
+            **self._stats,
+            'deadline_seconds': settings.LLM_DEADLINE_SECONDS,
+            'max_concurrency': settings.LLM_MAX_CONCURRENCY,
+            'hedge_enabled': settings.LLM_HEDGE_ENABLED,
+            'hedge_delay_seconds': self._hedge_delay(),
+            'latency_p50_seconds': round(p50, 3) if p50 is not None else None,
+            'latency_p95_seconds': round(p95, 3) if p95 is not None else None
+        }
+
+    def _generate_fallback_result(self, rag_results: Dict, survey_data: Dict = None,
+                                  reason: str = 'LLM 분석 실패로 기본 템플릿 사용') -> Dict:
         """LLM 실패 시 기본 템플릿 생성 (Swin 스타일)"""
         grade = rag_results.get('grade', 0)
+        # 템플릿은 Sinclair 1-5 기준 (predicted_stage 없으면 grade로 환산)
+        stage = rag_results.get('predicted_stage') or grade + 1
 
         # 5단계 기준 템플릿
         stage_info = {
@@ -315,7 +422,7 @@ class GeminiHairAnalyzer:
             'advice': info['advice'],
             'llm_analysis': {
                 'model': 'fallback_template',
-                'reason': 'LLM 분석 실패로 기본 템플릿 사용'
+                'reason': reason
             }
         }
 
@@ -4,14 +4,167 @@ from PIL import Image, ImageEnhance
 import torch
 import torchvision.transforms as transforms
 import timm
-import os
 import base64
 import io
 import re
-from typing import List, Tuple, Dict, Optional
+from typing import Callable, List, Tuple, Dict, Optional
 import logging
+import math
 from ..config.settings import settings
 from ..config.ensemble_config import get_ensemble_config
+from services.common.embedding_cache import embedding_cache, hash_image
+
+ROI_MARGIN = 0.15  # 중앙 70% ROI (각 변에서 15%씩 제외)
+CONV_INPUT_SIZE = 384
+VIT_INPUT_SIZE = 224
+INPUT_SIZES = {'convnext': CONV_INPUT_SIZE, 'vit': VIT_INPUT_SIZE}
+MODEL_NAMES = {'convnext': "convnext_large.fb_in22k_ft_in1k_384", 'vit': "vit_small_patch16_224"}
+
+# PIL ImageFilter.SMOOTH 커널 (ImageEnhance.Sharpness의 degenerate 이미지)
+_SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13.0
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+_IMAGENET_MEAN = torch.tensor([0.485, 0.456, 0.406]).view(3, 1, 1)
+_IMAGENET_STD = torch.tensor([0.229, 0.224, 0.225]).view(3, 1, 1)
+
+
+def enhance_image(img: Image.Image) -> Image.Image:
+    """이미지 향상 (DataLoader 워커에서도 쓰도록 모듈 함수로 분리)"""
+    img = ImageEnhance.Sharpness(img).enhance(1.05)
+    img = ImageEnhance.Contrast(img).enhance(1.05)
+    img = ImageEnhance.Brightness(img).enhance(1.03)
+    img = ImageEnhance.Color(img).enhance(1.03)
+    return img
+
+
+def weights_fingerprint(model) -> str:
+    """timm 버전 + 사전학습 가중치 출처 (임베딩 캐시 키용 - 가중치가 바뀌면 예전 캐시를 쓰지 않게)"""
+    cfg = getattr(model, 'pretrained_cfg', None) or {}
+    source = cfg.get('hf_hub_id') or cfg.get('url') or cfg.get('file') or 'unknown'
+    tag = cfg.get('tag')
+    return f"timm-{timm.__version__}|{source}" + (f".{tag}" if tag and not source.endswith(tag) else "")
+
+
+def roi_box(width: int, height: int) -> Tuple[int, int, int, int]:
+    """중앙 70% ROI 좌표 (left, top, right, bottom)"""
+    return (int(width * ROI_MARGIN), int(height * ROI_MARGIN),
+            int(width * (1 - ROI_MARGIN)), int(height * (1 - ROI_MARGIN)))
+
+
+def crop_center_roi(image: Image.Image) -> Image.Image:
+    """
+    중앙 70% 영역을 ROI로 크롭
+    (BiSeNet 사용 시 효용성 감소로 단순 크롭 방식 사용)
+    """
+    width, height = image.size
+
+    # ROI 추출
+    roi_img = image.crop(roi_box(width, height))
+
+    # 원본 크기로 resize (모델 입력 크기 맞추기)
+    roi_img = roi_img.resize((width, height), Image.Resampling.LANCZOS)
+
+    return roi_img
+
+
+def _luma(rgb: np.ndarray) -> np.ndarray:
+    """PIL convert('L')과 같은 ITU-R 601 휘도 (반올림)"""
+    return np.rint(rgb.astype(np.float32) @ _LUMA)
+
+
+def _blend(degenerate: np.ndarray, image: np.ndarray, factor: float) -> np.ndarray:
+    """
+    PIL Image.blend(degenerate, image, factor)와 같은 계산 (float32, 0~255 클립 후 버림)
+    ImageEnhance의 factor > 1 경로는 반올림이 아니라 버림이라서 그대로 맞춤
+    """
+    factor = np.float32(factor)
+    out = degenerate + factor * (image - degenerate)
+    return np.floor(np.clip(out, 0, 255)).astype(np.uint8)
+
+
+def enhance_array(rgb: np.ndarray) -> np.ndarray:
+    """
+    enhance_image와 같은 향상을 NumPy로 한 번에 적용 (uint8 HxWx3 → uint8 HxWx3)
+    Sharpness(1.05) → Contrast(1.05) + Brightness(1.03)는 채널 공통 LUT 하나로 → Color(1.03)
+    단계마다 PIL처럼 uint8로 양자화해서 결과가 픽셀당 ±1 안에서 일치
+    """
+    x = rgb.astype(np.float32)
+
+    # Sharpness: SMOOTH(x)와 x의 블렌드, PIL처럼 가장자리 픽셀은 그대로
+    smooth = np.rint(cv2.filter2D(x, -1, _SMOOTH_KERNEL, borderType=cv2.BORDER_REPLICATE))
+    smooth[[0, -1]] = x[[0, -1]]
+    smooth[:, [0, -1]] = x[:, [0, -1]]
+    sharp = _blend(smooth, x, 1.05)
+
+    # Contrast(평균 휘도 기준) + Brightness를 256 엔트리 LUT 하나로
+    mean = np.float32(int(float(_luma(sharp).mean(dtype=np.float64)) + 0.5))
+    levels = np.arange(256, dtype=np.float32)
+    lut = _blend(np.float32(0), _blend(mean, levels, 1.05).astype(np.float32), 1.03)
+    x = cv2.LUT(sharp, lut)
+
+    # Color: 흑백 이미지 기준으로 채도 1.03배
+    gray = _luma(x)[..., None]
+    return _blend(gray, x.astype(np.float32), 1.03)
+
+
+def _resize_short_side(image: Image.Image, size: int) -> Image.Image:
+    """transforms.Resize(size, BICUBIC)와 같은 짧은 변 기준 리사이즈"""
+    width, height = image.size
+    if width <= height:
+        new_size = (size, int(size * height / width))
+    else:
+        new_size = (int(size * width / height), size)
+    if new_size == image.size:
+        return image
+    return image.resize(new_size, Image.Resampling.BICUBIC)
+
+
+def _center_crop(arr: np.ndarray, size: int) -> np.ndarray:
+    """transforms.CenterCrop(size)과 같은 오프셋"""
+    height, width = arr.shape[:2]
+    top = int(round((height - size) / 2.0))
+    left = int(round((width - size) / 2.0))
+    return arr[top:top + size, left:left + size]
+
+
+def _to_input_tensor(arr: np.ndarray) -> torch.Tensor:
+    """uint8 HxWx3 → ImageNet 정규화된 float 3xHxW (ToTensor + Normalize)"""
+    tensor = torch.from_numpy(np.ascontiguousarray(arr)).permute(2, 0, 1).float().div_(255.0)
+    return tensor.sub_(_IMAGENET_MEAN).div_(_IMAGENET_STD)
+
+
+def fused_preprocess(image, use_roi: bool = False, sizes=(CONV_INPUT_SIZE, VIT_INPUT_SIZE)) -> List[torch.Tensor]:
+    """
+    단일 전처리 단계: 디코딩 1회 → ROI 크롭 → 가장 큰 입력 크기로 바로 리사이즈 → 향상 1회 → 크기별 center crop
+    image: PIL Image 또는 파일 경로 (경로 / 아직 디코딩 전 JPEG는 draft로 필요한 해상도까지만 디코딩)
+    Returns: sizes 순서대로 정규화된 입력 텐서 [3, size, size]
+    """
+    if isinstance(image, str):
+        image = Image.open(image)
+
+    largest = max(sizes)
+    width, height = image.size
+    needed = largest / (1 - 2 * ROI_MARGIN) if use_roi else largest
+    scale = needed / min(width, height)
+    if scale < 1:
+        image.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))  # 디코딩 전 JPEG에만 적용됨
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if use_roi:
+        image = image.crop(roi_box(*image.size))
+
+    # ROI를 원본 해상도로 되돌리지 않고 모델 입력 크기로 한 번만 리사이즈한 뒤 향상
+    working = _resize_short_side(image, largest)
+    enhanced = enhance_array(np.asarray(working))
+
+    tensors = []
+    for size in sizes:
+        arr = enhanced
+        if size != largest:
+            arr = np.asarray(_resize_short_side(Image.fromarray(enhanced), size))
+        tensors.append(_to_input_tensor(_center_crop(arr, size)))
+    return tensors
+
 
 class ImageProcessor:
     def __init__(self):
@@ -21,7 +174,7 @@ class ImageProcessor:
 
         # ConvNeXt 모델 로드
         try:
-            self.conv_model = timm.create_model("convnext_large.fb_in22k_ft_in1k_384",
+            self.conv_model = timm.create_model(MODEL_NAMES['convnext'],
                                               pretrained=True, num_classes=0, global_pool="avg")
             self.conv_model.eval().to(self.device)
             logging.info("ConvNeXt 모델 로드 완료")
@@ -31,7 +184,7 @@ class ImageProcessor:
 
         # ViT-S/16 모델 로드
         try:
-            self.vit_model = timm.create_model("vit_small_patch16_224",
+            self.vit_model = timm.create_model(MODEL_NAMES['vit'],
                                              pretrained=True, num_classes=0, global_pool="avg")
             self.vit_model.eval().to(self.device)
             logging.info("ViT-S/16 모델 로드 완료")
@@ -39,6 +192,8 @@ class ImageProcessor:
             logging.error(f"ViT-S/16 모델 로드 실패: {e}")
             raise
 
+        self.weights_fingerprints = {key: weights_fingerprint(self._model(key)) for key in MODEL_NAMES}
+
         # 전처리 변환
         self.transform_conv = transforms.Compose([
             transforms.Resize(384, interpolation=transforms.InterpolationMode.BICUBIC),
@@ -82,45 +237,142 @@ class ImageProcessor:
 
     def enhance_image(self, img: Image.Image) -> Image.Image:
         """이미지 향상"""
-        img = ImageEnhance.Sharpness(img).enhance(1.05)
-        img = ImageEnhance.Contrast(img).enhance(1.05)
-        img = ImageEnhance.Brightness(img).enhance(1.03)
-        img = ImageEnhance.Color(img).enhance(1.03)
-        return img
-
-    def extract_embedding(self, image: Image.Image, model, transform) -> Optional[np.ndarray]:
-        """단일 모델 임베딩 추출"""
-        try:
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-            image = self.enhance_image(image)
+        return enhance_image(img)
 
-            input_tensor = transform(image).unsqueeze(0).to(self.device)
-
-            with torch.no_grad():
-                features = model(input_tensor)
-                embedding = features.squeeze().cpu().numpy()
+    def _preprocess(self, image: Image.Image, use_roi: bool, model_keys) -> List[torch.Tensor]:
+        """
+        model_keys 순서대로 입력 텐서 생성 (디코딩 / ROI 크롭 / 향상은 한 번만)
+        RAG_FUSED_PREPROCESS=false면 기존 PIL 경로 (ROI 원본 크기 복원 + ImageEnhance + transforms)
+        """
+        if settings.FUSED_PREPROCESS:
+            return fused_preprocess(image, use_roi, [INPUT_SIZES[key] for key in model_keys])
+
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if use_roi:
+            image = crop_center_roi(image)
+        image = self.enhance_image(image)
+        transforms_by_key = {'convnext': self.transform_conv, 'vit': self.transform_vit}
+        return [transforms_by_key[key](image) for key in model_keys]
+
+    def preprocess_dual(self, image: Image.Image, use_roi: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+        """ConvNeXt / ViT 입력 텐서를 함께 생성"""
+        conv_tensor, vit_tensor = self._preprocess(image, use_roi, ('convnext', 'vit'))
+        return conv_tensor, vit_tensor
+
+    def _model(self, model_key: str):
+        return self.conv_model if model_key == 'convnext' else self.vit_model
+
+    def _cache_flags(self, model_key: str, use_roi: bool) -> str:
+        """가중치 / 전처리 플래그 (둘 중 하나라도 달라지면 임베딩도 달라지므로 캐시 키에 포함)"""
+        return (f"{self.weights_fingerprints[model_key]}|"
+                f"{'fused' if settings.FUSED_PREPROCESS else 'legacy'}|roi={int(use_roi)}")
+
+    def _cache_lookup(self, image: Image.Image, model_keys, use_roi: bool) -> Tuple[Optional[str], Dict[str, Optional[np.ndarray]]]:
+        """(이미지 해시, 모델별 캐시 결과) - 캐시 비활성화 시 해시 계산 생략"""
+        if not embedding_cache.enabled:
+            return None, {key: None for key in model_keys}
+        image_hash = hash_image(image)
+        return image_hash, {key: embedding_cache.get(image_hash, MODEL_NAMES[key], self._cache_flags(key, use_roi))
+                            for key in model_keys}
+
+    def extract_embeddings(self, image: Image.Image, model_keys=('convnext', 'vit'), use_roi: bool = False) -> Dict[str, Optional[np.ndarray]]:
+        """
+        모델별 임베딩 (임베딩 캐시 확인 후, 없는 모델만 전처리 1회 + forward)
+        Returns: {'convnext': ..., 'vit': ...} - 실패 시 None
+        """
+        image_hash, results = self._cache_lookup(image, model_keys, use_roi)
+        missing = [key for key in model_keys if results[key] is None]
+        if not missing:
+            return results
 
-            # L2 정규화
-            embedding = embedding / (np.linalg.norm(embedding) + 1e-12)
-            return embedding
+        try:
+            inputs = self._preprocess(image, use_roi, missing)
+            for key, input_tensor in zip(missing, inputs):
+                results[key] = self._embed_and_cache(key, input_tensor, image_hash, use_roi)
         except Exception as e:
             self.logger.error(f"임베딩 추출 실패: {e}")
-            return None
+        return results
 
-    def extract_dual_embeddings(self, image: Image.Image) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
-        """ConvNeXt + ViT 듀얼 임베딩 추출"""
-        conv_embedding = self.extract_embedding(image, self.conv_model, self.transform_conv)
-        vit_embedding = self.extract_embedding(image, self.vit_model, self.transform_vit)
-        return conv_embedding, vit_embedding
+    def _embed_and_cache(self, model_key: str, input_tensor: torch.Tensor, image_hash: Optional[str], use_roi: bool) -> np.ndarray:
+        """전처리된 입력 하나 → 임베딩 (캐시가 켜져 있으면 저장)"""
+        embedding = self.embed_tensors(self._model(model_key), input_tensor.unsqueeze(0))[0]
+        if image_hash is not None:
+            embedding_cache.put(image_hash, MODEL_NAMES[model_key], self._cache_flags(model_key, use_roi), embedding)
+        return embedding
+
+    def extract_cascade_embeddings(self, image: Image.Image, use_roi: bool = False) -> Tuple[Optional[np.ndarray], Callable[[], Optional[np.ndarray]]]:
+        """
+        캐스케이드용: ViT 임베딩 + ConvNeXt 임베딩 함수
+        디코딩 / ROI 크롭 / 향상은 두 백본 몫을 한 번에 하고, ConvNeXt forward는 함수를 호출할 때만 실행
+        Returns: (ViT 임베딩 - 실패 시 None, ConvNeXt 임베딩을 돌려주는 함수 - 실패 시 None 반환)
+        """
+        model_keys = ('vit', 'convnext')
+        image_hash, results = self._cache_lookup(image, model_keys, use_roi)
+        missing = [key for key in model_keys if results[key] is None]
+        try:
+            inputs = dict(zip(missing, self._preprocess(image, use_roi, missing))) if missing else {}
+            if results['vit'] is None:
+                results['vit'] = self._embed_and_cache('vit', inputs['vit'], image_hash, use_roi)
+        except Exception as e:
+            self.logger.error(f"ViT 임베딩 추출 실패: {e}")
+            return None, lambda: None
+
+        def conv_embedding_fn() -> Optional[np.ndarray]:
+            if results['convnext'] is None:
+                try:
+                    results['convnext'] = self._embed_and_cache('convnext', inputs['convnext'], image_hash, use_roi)
+                except Exception as e:
+                    self.logger.error(f"ConvNeXt 임베딩 추출 실패: {e}")
+            return results['convnext']
+
+        return results['vit'], conv_embedding_fn
+
+    def embed_tensors(self, model, tensors: torch.Tensor) -> np.ndarray:
+        """전처리된 입력 배치 [N, 3, H, W] → L2 정규화된 임베딩 [N, D]"""
+        with torch.no_grad():
+            features = model(tensors.to(self.device)).float().cpu().numpy()
+        return features / (np.linalg.norm(features, axis=1, keepdims=True) + 1e-12)
+
+    def extract_dual_embeddings_batch(self, images: List[Image.Image], use_roi: bool = False) -> Tuple[List[Optional[np.ndarray]], List[Optional[np.ndarray]]]:
+        """여러 이미지의 ConvNeXt + ViT 듀얼 임베딩 (캐시에 없는 것만 이미지별 전처리 1회, 모델별 배치 forward 1회)"""
+        model_keys = ('convnext', 'vit')
+        try:
+            lookups = [self._cache_lookup(image, model_keys, use_roi) for image in images]
+            pending = {key: [] for key in model_keys}  # 모델별 [(이미지 인덱스, 입력 텐서)]
+            for i, (image, (_, results)) in enumerate(zip(images, lookups)):
+                missing = [key for key in model_keys if results[key] is None]
+                if missing:
+                    for key, input_tensor in zip(missing, self._preprocess(image, use_roi, missing)):
+                        pending[key].append((i, input_tensor))
+
+            for key, entries in pending.items():
+                if not entries:
+                    continue
+                embeddings = self.embed_tensors(self._model(key), torch.stack([t for _, t in entries]))
+                for (i, _), embedding in zip(entries, embeddings):
+                    image_hash, results = lookups[i]
+                    results[key] = embedding
+                    if image_hash is not None:
+                        embedding_cache.put(image_hash, MODEL_NAMES[key], self._cache_flags(key, use_roi), embedding)
+
+            return [r['convnext'] for _, r in lookups], [r['vit'] for _, r in lookups]
+        except Exception as e:
+            self.logger.error(f"배치 듀얼 임베딩 추출 실패: {e}")
+            return [None] * len(images), [None] * len(images)
+
+    def extract_dual_embeddings(self, image: Image.Image, use_roi: bool = False) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """ConvNeXt + ViT 듀얼 임베딩 추출 (전처리 1회)"""
+        results = self.extract_embeddings(image, ('convnext', 'vit'), use_roi)
+        return results['convnext'], results['vit']
 
     def get_convnext_embedding(self, image: Image.Image) -> Optional[np.ndarray]:
         """ConvNeXt 단일 임베딩 추출"""
-        return self.extract_embedding(image, self.conv_model, self.transform_conv)
+        return self.extract_embeddings(image, ('convnext',))['convnext']
 
     def get_vit_embedding(self, image: Image.Image) -> Optional[np.ndarray]:
         """ViT 단일 임베딩 추출"""
-        return self.extract_embedding(image, self.vit_model, self.transform_vit)
+        return self.extract_embeddings(image, ('vit',))['vit']
 
     def extract_clip_embedding(self, image: Image.Image) -> Optional[np.ndarray]:
         """하위 호환성을 위한 메서드 (ConvNeXt 임베딩 반환)"""
@@ -137,97 +389,36 @@ class ImageProcessor:
             return None
 
     def process_dataset(self, dataset_path: str, stages: List[int] = [0, 1, 2, 3, 4, 5, 6, 7]) -> Dict:
-        """데이터셋의 모든 이미지를 처리하여 임베딩 생성"""
-        embeddings_data = {
-            'embeddings': [],
-            'metadata': [],
-            'ids': []
-        }
-
-        for stage in stages:
-            stage_folder = os.path.join(dataset_path, f"LEVEL_{stage}")
-
-            if not os.path.exists(stage_folder):
-                self.logger.warning(f"폴더가 존재하지 않음: {stage_folder}")
-                continue
-
-            self.logger.info(f"LEVEL_{stage} 처리 중...")
-
-            # 폴더 내 모든 이미지 파일 처리
-            processed_count = 0
-            for filename in os.listdir(stage_folder):
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                    image_path = os.path.join(stage_folder, filename)
-
-                    try:
-                        embedding = self.extract_clip_embedding_from_path(image_path)
-                        if embedding is not None:
-                            embeddings_data['embeddings'].append(embedding.tolist())
-                            embeddings_data['metadata'].append({
-                                'stage': stage,
-                                'level': f'level_{stage}',
-                                'filename': filename,
-                                'path': image_path
-                            })
-                            embeddings_data['ids'].append(f"level_{stage}_{filename}")
-                            processed_count += 1
-
-                    except Exception as e:
-                        self.logger.error(f"이미지 처리 실패 {image_path}: {e}")
-
-            self.logger.info(f"LEVEL_{stage}: {processed_count}개 이미지 처리 완료")
-
-        self.logger.info(f"총 {len(embeddings_data['embeddings'])}개 임베딩 생성 완료")
-        return embeddings_data
-
-    def process_dual_dataset(self, dataset_path: str, stages: List[int] = [2, 3, 4, 5, 6, 7]) -> Tuple[Dict, Dict]:
-        """ConvNeXt + ViT 듀얼 임베딩 데이터셋 생성"""
-        conv_data = {'embeddings': [], 'metadata': [], 'ids': []}
-        vit_data = {'embeddings': [], 'metadata': [], 'ids': []}
-
-        for stage in stages:
-            stage_folder = os.path.join(dataset_path, f"LEVEL_{stage}")
-
-            if not os.path.exists(stage_folder):
-                self.logger.warning(f"폴더가 존재하지 않음: {stage_folder}")
-                continue
-
-            self.logger.info(f"LEVEL_{stage} 듀얼 임베딩 처리 중...")
-            processed_count = 0
-
-            for filename in os.listdir(stage_folder):
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                    image_path = os.path.join(stage_folder, filename)
-
-                    try:
-                        image = Image.open(image_path).convert('RGB')
-                        conv_emb, vit_emb = self.extract_dual_embeddings(image)
-
-                        if conv_emb is not None and vit_emb is not None:
-                            metadata = {
-                                'stage': stage,
-                                'level': f'level_{stage}',
-                                'filename': filename,
-                                'path': image_path
-                            }
-                            file_id = f"level_{stage}_{filename}"
+        """
+        데이터셋의 모든 이미지를 처리하여 ConvNeXt 임베딩 생성 (배치 / 재개 가능한 임베딩 파이프라인)
+        Returns: {'embeddings': float32 [N, 1536], 'metadata': [...], 'ids': [...]}
+        """
+        from .embedding_pipeline import EmbeddingPipeline
 
-                            conv_data['embeddings'].append(conv_emb.tolist())
-                            conv_data['metadata'].append(metadata)
-                            conv_data['ids'].append(file_id)
+        pipeline = EmbeddingPipeline(self, backbones=('convnext',))
+        items = pipeline.scan(dataset_path, stages)
+        pipeline.run(items)
 
-                            vit_data['embeddings'].append(vit_emb.tolist())
-                            vit_data['metadata'].append(metadata)
-                            vit_data['ids'].append(file_id)
+        embeddings_data = pipeline.load('convnext', keys={(it['content_hash'], it['embedding_type']) for it in items})
+        self.logger.info(f"총 {len(embeddings_data['ids'])}개 임베딩 생성 완료")
+        return embeddings_data
 
-                            processed_count += 1
+    def process_dual_dataset(self, dataset_path: str, stages: List[int] = [2, 3, 4, 5, 6, 7]) -> Tuple[Dict, Dict]:
+        """
+        ConvNeXt + ViT 듀얼 임베딩 데이터셋 생성 (배치 / 재개 가능한 임베딩 파이프라인)
+        Returns: (conv_data, vit_data) - embeddings는 float32 NumPy 배열
+        """
+        from .embedding_pipeline import EmbeddingPipeline
 
-                    except Exception as e:
-                        self.logger.error(f"듀얼 임베딩 처리 실패 {image_path}: {e}")
+        pipeline = EmbeddingPipeline(self, backbones=('convnext', 'vit'))
+        items = pipeline.scan(dataset_path, stages)
+        pipeline.run(items)
 
-            self.logger.info(f"LEVEL_{stage}: {processed_count}개 듀얼 임베딩 완료")
+        keys = {(it['content_hash'], it['embedding_type']) for it in items}
+        conv_data = pipeline.load('convnext', keys=keys)
+        vit_data = pipeline.load('vit', keys=keys)
 
-        self.logger.info(f"ConvNeXt: {len(conv_data['embeddings'])}개, ViT: {len(vit_data['embeddings'])}개 임베딩 생성")
+        self.logger.info(f"ConvNeXt: {len(conv_data['ids'])}개, ViT: {len(vit_data['ids'])}개 임베딩 생성")
         return conv_data, vit_data
 
     def simulate_bisenet_segmentation(self, image: Image.Image) -> Image.Image:
@@ -235,34 +426,11 @@ class ImageProcessor:
         중앙 70% 영역을 ROI로 크롭
         (BiSeNet 사용 시 효용성 감소로 단순 크롭 방식 사용)
         """
-        width, height = image.size
-        left = int(width * 0.15)
-        top = int(height * 0.15)
-        right = int(width * 0.85)
-        bottom = int(height * 0.85)
-
-        # ROI 추출
-        roi_img = image.crop((left, top, right, bottom))
-
-        # 원본 크기로 resize (모델 입력 크기 맞추기)
-        roi_img = roi_img.resize((width, height), Image.Resampling.LANCZOS)
-
-        return roi_img
+        return crop_center_roi(image)
 
     def extract_roi_dual_embeddings(self, image: Image.Image) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """
         BiSeNet ROI 처리 후 ConvNeXt + ViT 듀얼 임베딩 추출
+        (ROI 크롭은 전처리 단계에서 바로 모델 입력 크기로 리사이즈)
         """
-        try:
-            # BiSeNet으로 두피 영역 추출
-            roi_image = self.simulate_bisenet_segmentation(image)
-
-            # ROI 이미지로 듀얼 임베딩 생성
-            conv_embedding = self.extract_embedding(roi_image, self.conv_model, self.transform_conv)
-            vit_embedding = self.extract_embedding(roi_image, self.vit_model, self.transform_vit)
-
-            return conv_embedding, vit_embedding
-
-        except Exception as e:
-            self.logger.error(f"ROI 듀얼 임베딩 추출 실패: {e}")
-            return None, None
+        return self.extract_dual_embeddings(image, use_roi=True)
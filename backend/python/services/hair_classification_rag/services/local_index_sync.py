@@ -0,0 +1,190 @@
+"""
+ConvNeXt / ViT Pinecone 인덱스의 로컬 FAISS 복제본
+- 동기화 작업: 두 인덱스의 벡터 + 메타데이터를 모두 내려받아 FAISSManager(cosine) 인덱스로 저장
+- LocalIndexReplica: DualPineconeManager가 같은 gender / embedding_type 필터로 로컬 검색
+  (복제본이 없거나 LOCAL_INDEX_MAX_AGE_HOURS보다 오래되면 Pinecone으로 검색)
+
+동기화 (backend/python 디렉토리에서):
+    python -m services.hair_classification_rag.services.local_index_sync
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import logging
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MODEL_KEYS = ("convnext", "vit")
+
+
+def _index_paths(index_dir: str, model_key: str):
+    return (os.path.join(index_dir, f"{model_key}.index"),
+            os.path.join(index_dir, f"{model_key}_metadata.pkl"))
+
+
+def export_pinecone_index(index, fetch_batch_size: int = 100, namespace: str = "") -> Dict:
+    """
+    Pinecone 인덱스의 모든 벡터를 내려받아 FAISSManager.upload_embeddings 형식으로 반환
+    (serverless 인덱스의 list() → fetch() 사용)
+    """
+    embeddings_data = {'embeddings': [], 'metadata': [], 'ids': [], 'recreate': True}
+
+    for id_batch in index.list(namespace=namespace):
+        id_batch = list(id_batch)
+        for start in range(0, len(id_batch), fetch_batch_size):
+            ids = id_batch[start:start + fetch_batch_size]
+            fetched = index.fetch(ids=ids, namespace=namespace)
+            vectors = fetched.get('vectors', {}) if isinstance(fetched, dict) else getattr(fetched, 'vectors', {})
+            for vector_id, vector in vectors.items():
+                values = vector['values'] if isinstance(vector, dict) else getattr(vector, 'values', None)
+                metadata = vector.get('metadata') if isinstance(vector, dict) else getattr(vector, 'metadata', None)
+                if not values:
+                    continue
+                embeddings_data['embeddings'].append(np.asarray(values, dtype=np.float32))
+                embeddings_data['metadata'].append(dict(metadata or {}))
+                embeddings_data['ids'].append(vector_id)
+
+    return embeddings_data
+
+
+def sync_local_replica(dual_manager=None, index_dir: str = None) -> Dict:
+    """두 Pinecone 인덱스를 로컬 FAISS로 내보내고 manifest 기록 (파일 교체 후 manifest를 마지막에 씀)"""
+    from .dual_pinecone_manager import DualPineconeManager
+    from ..models.services.faiss_manager import FAISSManager
+
+    dual_manager = dual_manager or DualPineconeManager()
+    index_dir = index_dir or settings.LOCAL_INDEX_DIR
+    os.makedirs(index_dir, exist_ok=True)
+
+    idx_conv, idx_vit = dual_manager.get_indices()
+    sources = {
+        'convnext': (idx_conv, dual_manager.index_conv, dual_manager.dim_conv),
+        'vit': (idx_vit, dual_manager.index_vit, dual_manager.dim_vit)
+    }
+
+    manifest = {'synced_at': datetime.now().isoformat(), 'synced_at_ts': time.time(), 'indexes': {}}
+    for model_key, (index, index_name, dimension) in sources.items():
+        started = time.perf_counter()
+        embeddings_data = export_pinecone_index(index)
+        if not embeddings_data['ids']:
+            raise ValueError(f"내보낼 벡터가 없습니다: {index_name}")
+
+        index_file, metadata_file = _index_paths(index_dir, model_key)
+        manager = FAISSManager(dimension=dimension, index_file=index_file, metadata_file=metadata_file,
+                               metric="cosine")
+        if not manager.upload_embeddings(embeddings_data):
+            raise RuntimeError(f"로컬 인덱스 저장 실패: {index_name}")
+
+        manifest['indexes'][model_key] = {
+            'source_index': index_name,
+            'dimension': dimension,
+            'vector_count': len(embeddings_data['ids']),
+            'export_seconds': round(time.perf_counter() - started, 2)
+        }
+        logger.info(f"{index_name} → {index_file} ({len(embeddings_data['ids'])}개 벡터)")
+
+    # 다른 산출물처럼 임시 파일에 쓴 뒤 교체 (복제본이 쓰는 중인 매니페스트를 읽지 않도록)
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+class LocalIndexReplica:
+    """동기화된 로컬 FAISS 인덱스 (신선도 확인 + 동기화 작업이 파일을 바꾸면 다시 로드)"""
+
+    def __init__(self, index_dir: str = None, max_age_hours: float = None, check_interval: float = 60):
+        self.index_dir = index_dir or settings.LOCAL_INDEX_DIR
+        self.max_age_seconds = (max_age_hours if max_age_hours is not None
+                                else settings.LOCAL_INDEX_MAX_AGE_HOURS) * 3600
+        self.check_interval = check_interval
+        self.manifest = None
+        self.managers = {}
+        self._manifest_mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.index_dir, MANIFEST_FILE)
+
+    def refresh(self, force: bool = False):
+        """manifest가 바뀌었으면 인덱스 다시 로드 (check_interval마다 한 번만 확인)"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.manifest_path)
+            except OSError:
+                self.manifest, self.managers, self._manifest_mtime = None, {}, None
+                return
+            if mtime == self._manifest_mtime:
+                return
+            self._load()
+            self._manifest_mtime = mtime
+
+    def _load(self):
+        from ..models.services.faiss_manager import FAISSManager
+
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            managers = {}
+            for model_key in MODEL_KEYS:
+                info = manifest['indexes'][model_key]
+                index_file, metadata_file = _index_paths(self.index_dir, model_key)
+                manager = FAISSManager(dimension=info['dimension'], index_file=index_file,
+                                       metadata_file=metadata_file, metric="cosine")
+                if manager.index is None:  # 생성 시 load_index() 실행됨
+                    raise FileNotFoundError(index_file)
+                managers[model_key] = manager
+        except Exception as e:
+            logger.warning(f"로컬 인덱스 로드 실패 (Pinecone 사용): {e}")
+            self.manifest, self.managers = None, {}
+            return
+
+        self.manifest, self.managers = manifest, managers
+        logger.info(f"로컬 인덱스 로드 완료 (동기화: {manifest.get('synced_at')})")
+
+    def is_fresh(self) -> bool:
+        """두 인덱스가 모두 있고 최대 보관 시간 이내인지"""
+        self.refresh()
+        if self.manifest is None or len(self.managers) != len(MODEL_KEYS):
+            return False
+        age = time.time() - self.manifest.get('synced_at_ts', 0)
+        return age <= self.max_age_seconds
+
+    def query(self, model_key: str, embedding: np.ndarray, top_k: int, search_filter: Optional[Dict]) -> List[Dict]:
+        return self.managers[model_key].query(embedding, top_k, search_filter)
+
+    def stats(self) -> Dict:
+        return {
+            'index_dir': self.index_dir,
+            'fresh': self.is_fresh(),
+            'synced_at': self.manifest.get('synced_at') if self.manifest else None,
+            'vector_counts': {key: manager.ntotal for key, manager in self.managers.items()}
+        }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    manifest = sync_local_replica()
+    for model_key, info in manifest['indexes'].items():
+        print(f"✅ {model_key}: {info['source_index']} → {info['vector_count']}개 벡터 ({info['export_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
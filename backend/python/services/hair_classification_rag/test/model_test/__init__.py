@@ -0,0 +1 @@
+# test 패키지 초기화
@@ -0,0 +1,100 @@
+"""
+캐스케이드 모드 analyze_image 테스트
+이미지 처리기 / 벡터 검색을 스텁으로 바꾸고 조기 종료(ViT만) / 전체 앙상블 두 경로 확인
+(backend/python 디렉토리에서 실행, 의존성이 없으면 SKIP)
+"""
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("timm")
+pytest.importorskip("pinecone")
+pytest.importorskip("google.generativeai")
+
+import numpy as np
+from PIL import Image
+
+from services.hair_classification_rag.config.ensemble_config import get_ensemble_config
+from services.hair_classification_rag.services.analysis_service import HairLossAnalyzer
+from services.hair_classification_rag.services.dual_pinecone_manager import DualPineconeManager
+
+DIMS = {'convnext': 1536, 'vit': 384}
+
+
+def _embedding(key):
+    return np.full(DIMS[key], 1 / np.sqrt(DIMS[key]), dtype=np.float32)
+
+
+class StubImageProcessor:
+    """고정 임베딩 반환 + 전처리 횟수 / 어떤 백본을 실행했는지 기록"""
+
+    def __init__(self):
+        self.calls = []
+        self.preprocess_count = 0
+
+    def extract_cascade_embeddings(self, image, use_roi=False):
+        self.preprocess_count += 1
+        self.calls.append('vit')
+
+        def conv_embedding_fn():
+            self.calls.append('convnext')
+            return _embedding('convnext')
+
+        return _embedding('vit'), conv_embedding_fn
+
+
+def _matches(stages):
+    return [{'id': f"img_{i}", 'score': 0.9, 'metadata': {'stage': stage, 'filename': f"img_{i}.jpg"}}
+            for i, stage in enumerate(stages)]
+
+
+def _make_analyzer(vit_stages, conv_stages):
+    # 실제 predict_cascade_stage (캐스케이드 판단 + 앙상블)를 쓰고 검색만 스텁
+    manager = DualPineconeManager.__new__(DualPineconeManager)
+    manager.logger = logging.getLogger(__name__)
+    manager._search_many = lambda queries, top_k, search_filter: (
+        {name: _matches(vit_stages if model_key == 'vit' else conv_stages)
+         for name, (model_key, _) in queries.items()},
+        []
+    )
+
+    analyzer = HairLossAnalyzer.__new__(HairLossAnalyzer)
+    analyzer.image_processor = StubImageProcessor()
+    analyzer.dual_manager = manager
+    analyzer.llm_analyzer = None
+    analyzer.ensemble_config = get_ensemble_config()
+    analyzer.logger = logging.getLogger(__name__)
+    return analyzer
+
+
+def _analyze(analyzer):
+    image = Image.new('RGB', (64, 64))
+    return asyncio.run(analyzer.analyze_image(image, "test.jpg", use_llm=False, cascade=True))
+
+
+def test_cascade_accept_skips_convnext():
+    """ViT kNN이 한 단계로 모이면 ConvNeXt 없이 조기 종료"""
+    analyzer = _make_analyzer(vit_stages=[2] * 10, conv_stages=[3] * 10)
+    result = _analyze(analyzer)
+
+    assert result['success'], result
+    assert result['grade'] == 1  # Sinclair 2 → Grade 1
+    assert analyzer.image_processor.calls == ['vit']
+    details = result['analysis_details']
+    assert details['embedding_dimension'] == "ConvNeXt: skipped (cascade), ViT: 384"
+    assert details['ensemble_details']['cascade']['stage'] == 'vit_only'
+
+
+def test_cascade_reject_runs_full_ensemble():
+    """ViT kNN이 흩어져 있으면 ConvNeXt 임베딩 + 검색 후 전체 앙상블"""
+    analyzer = _make_analyzer(vit_stages=[1, 2, 3, 4, 5] * 2, conv_stages=[3] * 10)
+    result = _analyze(analyzer)
+
+    assert result['success'], result
+    assert analyzer.image_processor.calls == ['vit', 'convnext']
+    assert analyzer.image_processor.preprocess_count == 1  # ConvNeXt 폴백도 같은 전처리 결과 사용
+    details = result['analysis_details']
+    assert details['embedding_dimension'] == "ConvNeXt: 1536, ViT: 384"
+    assert details['ensemble_details']['cascade']['stage'] == 'full_ensemble'
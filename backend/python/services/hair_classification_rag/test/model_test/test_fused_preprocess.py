@@ -0,0 +1,40 @@
+"""
+단일 전처리(enhance_array)와 기존 PIL 경로(enhance_image) 일치 테스트
+RAG_FUSED_PREPROCESS를 켜도 기존 인덱스와 같은 입력이 되는지 픽셀 단위로 확인
+(backend/python 디렉토리에서 실행, 의존성이 없으면 SKIP)
+"""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("timm")
+pytest.importorskip("cv2")
+
+import numpy as np
+from PIL import Image
+
+from services.hair_classification_rag.services.image_processor import enhance_array, enhance_image
+
+
+def _max_pixel_diff(rgb: np.ndarray) -> int:
+    fused = enhance_array(rgb).astype(np.int16)
+    legacy = np.asarray(enhance_image(Image.fromarray(rgb))).astype(np.int16)
+    assert fused.shape == legacy.shape
+    return int(np.abs(fused - legacy).max())
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_enhance_array_matches_pil_on_noise(seed):
+    """무작위 노이즈 이미지 (가장자리 / 클립 구간까지 포함)"""
+    rgb = np.random.default_rng(seed).integers(0, 256, size=(97, 131, 3), dtype=np.uint8)
+    assert _max_pixel_diff(rgb) <= 1
+
+
+def test_enhance_array_matches_pil_on_smooth_image():
+    """두피 사진처럼 완만하게 변하는 이미지"""
+    ys, xs = np.mgrid[0:120, 0:160].astype(np.float32)
+    rgb = np.stack([
+        80 + 60 * np.sin(xs / 17.0),
+        60 + 40 * np.cos(ys / 11.0),
+        40 + 30 * np.sin((xs + ys) / 23.0)
+    ], axis=-1)
+    assert _max_pixel_diff(np.clip(rgb, 0, 255).astype(np.uint8)) <= 1
@@ -10,6 +10,7 @@ from datetime import datetime
 from ..services.rag_service import rag_service
 from ..services.ai_analysis_service import ai_analysis_service
 from ..services.pinecone_service import get_pinecone_service
+from services.common.worker_pools import cpu_pool, io_pool
 # CNN 모델 서비스는 삭제됨 (CLIP 앙상블 사용)
 
 # 모델 임포트
@@ -106,8 +107,8 @@ async def analyze_hair_image(
         
         print(f"📸 이미지 분석 요청: {file.filename}, 크기: {len(image_bytes)} bytes, 전처리: {use_preprocessing}")
         
-        # RAG 분석 실행
-        rag_result = rag_service.analyze_hair_image(image_bytes, top_k, use_preprocessing)
+        # RAG 분석 실행 (CPU 워커 풀)
+        rag_result = await cpu_pool.run(rag_service.analyze_hair_image, image_bytes, top_k, use_preprocessing)
         
         if not rag_result.get("success", False):
             return HairAnalysisResponse(
@@ -115,8 +116,8 @@ async def analyze_hair_image(
                 error=rag_result.get("error", "분석에 실패했습니다.")
             )
         
-        # AI 고급 분석 실행
-        ai_result = ai_analysis_service.generate_advanced_analysis(rag_result)
+        # AI 고급 분석 실행 (I/O 워커 풀)
+        ai_result = await io_pool.run(ai_analysis_service.generate_advanced_analysis, rag_result)
         
         # 응답 구성
         response = HairAnalysisResponse(
@@ -177,9 +178,9 @@ async def search_by_category(
         
         print(f"🔍 카테고리별 검색: {category.value}, 파일: {file.filename}")
         
-        # 카테고리별 검색 실행
-        result = rag_service.search_by_specific_condition(
-            image_bytes, category.value, top_k
+        # 카테고리별 검색 실행 (CPU 워커 풀)
+        result = await cpu_pool.run(
+            rag_service.search_by_specific_condition, image_bytes, category.value, top_k
         )
         
         if not result.get("success", False):
@@ -9,9 +9,10 @@ import io
 from typing import List, Dict, Optional, Tuple
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
 import hashlib
 
+from services.common.embedding_cache import embedding_cache, hash_bytes
+
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -57,7 +58,9 @@ class CLIPEnsembleService:
                     "preprocess": preprocess,
                     "tokenizer": tokenizer,
                     "weight": weight,
-                    "description": description
+                    "description": description,
+                    # 임베딩 캐시 키용 (open_clip 버전 / 가중치가 바뀌면 예전 캐시를 쓰지 않게)
+                    "cache_flags": f"open_clip-{open_clip.__version__}|{pretrained}"
                 }
                 logger.info(f"[OK] {model_name} 로드 완료 ({description})")
             except Exception as e:
@@ -116,10 +119,22 @@ class CLIPEnsembleService:
         return hashlib.md5(image_bytes).hexdigest()
     
     def _extract_single_model_features(self, image_bytes: bytes, model_name: str) -> Tuple[np.ndarray, np.ndarray]:
-        """단일 모델 특징 추출"""
+        """단일 모델 특징 추출 (같은 이미지 바이트는 임베딩 캐시에서 반환)"""
         if model_name not in self.models:
             raise ValueError(f"모델 {model_name}이 로드되지 않았습니다")
-        
+
+        if embedding_cache.enabled:
+            image_hash = hash_bytes(image_bytes)
+            result = embedding_cache.get_or_compute(
+                image_hash, f"clip:{model_name}", self.models[model_name]["cache_flags"],
+                lambda: self._encode_image(image_bytes, model_name)
+            )
+        else:
+            result = self._encode_image(image_bytes, model_name)
+        return result, None
+
+    def _encode_image(self, image_bytes: bytes, model_name: str) -> np.ndarray:
+        """단일 모델 이미지 인코딩 (L2 정규화)"""
         config = self.models[model_name]
         model = config["model"]
         preprocess = config["preprocess"]
@@ -141,7 +156,7 @@ class CLIPEnsembleService:
             if self.device == "cuda":
                 torch.cuda.empty_cache()
         
-        return result, None
+        return result
     
     def extract_single_model_features(self, image_bytes: bytes, model_name: str) -> np.ndarray:
         """단일 모델로 특징 추출"""
@@ -210,8 +225,11 @@ class CLIPEnsembleService:
         return ensemble_features
     
     def extract_prompt_ensemble_features(self, image_bytes: bytes) -> Dict[str, np.ndarray]:
-        """프롬프트 앙상블 특징 추출"""
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        """프롬프트 앙상블 특징 추출 (이미지 특징은 모델별 1회 - 임베딩 캐시 공유)"""
+        image_features_by_model = {
+            model_name: torch.from_numpy(self.extract_single_model_features(image_bytes, model_name)).unsqueeze(0)
+            for model_name in self.models
+        }
         prompt_features = {}
         
         for category, config in self.prompt_sets.items():
@@ -223,23 +241,18 @@ class CLIPEnsembleService:
             
             for model_name, model_config in self.models.items():
                 model = model_config["model"]
-                preprocess = model_config["preprocess"]
                 tokenizer = model_config["tokenizer"]
                 model_weight = model_config["weight"]
                 
                 # 텍스트 토큰화 (open_clip_torch 사용)
                 text_inputs = tokenizer(prompts).to(self.device)
                 
-                # 이미지 전처리
-                image_input = preprocess(image).unsqueeze(0).to(self.device)
-                
                 with torch.no_grad():
-                    # 이미지와 텍스트 특징 추출
-                    image_features = model.encode_image(image_input)
-                    text_features = model.encode_text(text_inputs)
+                    # 텍스트 특징 추출 (이미지 특징은 위에서 정규화된 값 재사용)
+                    image_features = image_features_by_model[model_name]
+                    text_features = model.encode_text(text_inputs).float().cpu()
                     
                     # 정규화
-                    image_features = image_features / image_features.norm(dim=-1, keepdim=True)
                     text_features = text_features / text_features.norm(dim=-1, keepdim=True)
                     
                     # 유사도 계산
@@ -396,7 +409,7 @@ class CLIPEnsembleService:
             "loaded_models": list(self.models.keys()),
             "prompt_sets": list(self.prompt_sets.keys()),
             "device": self.device,
-            "cache_size": self._cached_single_model_features.cache_info().currsize
+            "embedding_cache": embedding_cache.stats()
         }
 
 # 전역 인스턴스
@@ -0,0 +1,67 @@
+"""
+Swin freeze_for_inference 정합성 + 지연 시간 벤치마크
+- 원본 모델과 추론 최적화 모델(bias 캐시 + SDPA + 마스크 채널 접기)의 로짓 차이 확인
+- 배치 크기별 CPU/GPU 지연 시간 비교
+
+사용법 (backend/python 디렉토리에서):
+    python -m services.swin_hair_classification.benchmark_freeze --view top --batch_sizes 1 2 8
+"""
+
+import argparse
+import copy
+import time
+
+import torch
+
+MODELS_DIR = 'services/swin_hair_classification/models'
+
+
+def make_inputs(batch_size: int, device: torch.device) -> torch.Tensor:
+    """RGB + 반복 마스크 3채널 형태의 6채널 입력 생성 (실제 전처리와 같은 구조)"""
+    rgb = torch.randn(batch_size, 3, 224, 224, device=device)
+    mask = (torch.rand(batch_size, 1, 224, 224, device=device) > 0.5).float()
+    return torch.cat([rgb, mask.repeat(1, 3, 1, 1)], dim=1)
+
+
+def time_forward(model, inputs: torch.Tensor, iters: int, warmup: int = 3) -> float:
+    """평균 forward 시간 (ms)"""
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(inputs)
+        if inputs.is_cuda:
+            torch.cuda.synchronize()
+        started = time.perf_counter()
+        for _ in range(iters):
+            model(inputs)
+        if inputs.is_cuda:
+            torch.cuda.synchronize()
+    return (time.perf_counter() - started) / iters * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Swin freeze_for_inference 벤치마크")
+    parser.add_argument("--view", default="top", choices=["top", "side"])
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 2, 8])
+    parser.add_argument("--iters", type=int, default=20)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    from services.swin_hair_classification.hair_swin_check import load_swin_model, log_message
+
+    device = torch.device(args.device)
+    baseline = load_swin_model(f'{MODELS_DIR}/best_swin_hair_classifier_{args.view}.pth', device)
+    frozen = copy.deepcopy(baseline).freeze_for_inference()
+
+    for batch_size in args.batch_sizes:
+        inputs = make_inputs(batch_size, device)
+        with torch.no_grad():
+            max_diff = (baseline(inputs) - frozen(inputs)).abs().max().item()
+
+        baseline_ms = time_forward(baseline, inputs, args.iters)
+        frozen_ms = time_forward(frozen, inputs, args.iters)
+        log_message(f"[{args.view}] batch={batch_size} | 원본 {baseline_ms:.1f}ms → 최적화 {frozen_ms:.1f}ms "
+                    f"(x{baseline_ms / frozen_ms:.2f}) | 최대 로짓 차이 {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Swin / BiSeNet 체크포인트 로딩
+- .pth(pickle) 체크포인트를 safetensors로 변환하는 도구
+- 같은 경로에 .safetensors 파일이 있으면 mmap으로 열어 로드 (unpickling 없음,
+  가중치 페이지를 uvicorn 워커 프로세스끼리 OS 페이지 캐시로 공유)
+- 없으면 기존처럼 torch.load로 .pth 로드
+
+변환 (backend/python 디렉토리에서):
+    python -m services.swin_hair_classification.checkpoints
+"""
+
+import os
+from typing import Dict
+
+import torch
+import torch.nn as nn
+
+# safetensors 파일이 있으면 우선 사용 (기본 활성화)
+USE_SAFETENSORS = os.getenv("USE_SAFETENSORS", "true").lower() == "true"
+
+MODELS_DIR = 'services/swin_hair_classification/models'
+CHECKPOINT_PATHS = {
+    'top': f'{MODELS_DIR}/best_swin_hair_classifier_top.pth',
+    'side': f'{MODELS_DIR}/best_swin_hair_classifier_side.pth',
+    'face_parsing': f'{MODELS_DIR}/face_parsing/res/cp/79999_iter.pth'
+}
+
+
+def safetensors_path(pth_path: str) -> str:
+    """같은 위치의 .safetensors 경로 (예: 79999_iter.pth → 79999_iter.safetensors)"""
+    return os.path.splitext(pth_path)[0] + '.safetensors'
+
+
+def _load_pth_state_dict(pth_path: str, device) -> Dict[str, torch.Tensor]:
+    checkpoint = torch.load(pth_path, map_location=device)
+    if 'model_state_dict' in checkpoint:
+        return checkpoint['model_state_dict']
+    return checkpoint
+
+
+def load_checkpoint_into(model: nn.Module, pth_path: str, device) -> str:
+    """
+    체크포인트를 모델에 로드
+    .safetensors가 있으면 mmap 로드 후 assign=True로 파라미터가 매핑된 텐서를 그대로 사용 (CPU, 복사 없음)
+    Returns: 실제로 읽은 파일 경로
+    """
+    device = torch.device(device)
+    st_path = safetensors_path(pth_path)
+
+    if USE_SAFETENSORS and os.path.exists(st_path):
+        from safetensors.torch import load_file
+
+        state_dict = load_file(st_path, device='cpu')
+        model.load_state_dict(state_dict, assign=device.type == 'cpu')
+        return st_path
+
+    if not os.path.exists(pth_path):
+        raise FileNotFoundError(f"체크포인트 파일을 찾을 수 없습니다: {pth_path}")
+
+    model.load_state_dict(_load_pth_state_dict(pth_path, device))
+    return pth_path
+
+
+def checkpoint_exists(pth_path: str) -> bool:
+    """.pth 또는 변환된 .safetensors 중 하나라도 있는지"""
+    return os.path.exists(pth_path) or (USE_SAFETENSORS and os.path.exists(safetensors_path(pth_path)))
+
+
+def convert_to_safetensors(pth_path: str) -> str:
+    """.pth 체크포인트의 state_dict만 safetensors로 저장 (옵티마이저 등 나머지 항목은 제외)"""
+    from safetensors.torch import save_file, load_file
+
+    state_dict = _load_pth_state_dict(pth_path, 'cpu')
+    tensors = {name: tensor.detach().contiguous() for name, tensor in state_dict.items()}
+    output_path = safetensors_path(pth_path)
+    save_file(tensors, output_path, metadata={'source': os.path.basename(pth_path)})
+
+    # 변환 결과 검증
+    converted = load_file(output_path)
+    for name, tensor in tensors.items():
+        if not torch.equal(converted[name], tensor):
+            raise ValueError(f"변환 결과가 원본과 다릅니다: {name}")
+    return output_path
+
+
+def main():
+    for name, pth_path in CHECKPOINT_PATHS.items():
+        if not os.path.exists(pth_path):
+            print(f"⚠️ {name}: 체크포인트 없음 ({pth_path})")
+            continue
+        output_path = convert_to_safetensors(pth_path)
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        print(f"✅ {name}: {output_path} ({size_mb:.1f}MB)")
+
+
+if __name__ == "__main__":
+    main()
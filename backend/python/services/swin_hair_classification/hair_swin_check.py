@@ -2,14 +2,18 @@ import os
 import json
 import torch
 import torch.nn as nn
-from torchvision import transforms
 from PIL import Image
 import cv2
 import numpy as np
 import sys
 from typing import Dict, Any, List
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import io
+import re
+import threading
+import time
+from collections import Counter
 from dotenv import load_dotenv
 import google.generativeai as genai
 
@@ -17,7 +21,19 @@ import google.generativeai as genai
 from services.swin_hair_classification.models.swin_hair_classifier import SwinHairClassifier
 
 # Face parsing 모델 import
-from services.swin_hair_classification.models.face_parsing.model import BiSeNet
+from services.swin_hair_classification.models.face_parsing.model import BiSeNet, parse_face
+
+# 프로세스 전역 모델 레지스트리 (BiSeNet / Swin 공유)
+from services.common.model_registry import model_registry
+
+# 체크포인트 로더 (safetensors mmap 우선, 없으면 .pth)
+from services.swin_hair_classification.checkpoints import load_checkpoint_into, checkpoint_exists
+
+# 마이크로 배칭 스케줄러
+from services.swin_hair_classification.inference_batcher import MicroBatcher
+
+# 분석 결과 캐시
+from services.swin_hair_classification.result_cache import TTLLRUCache, hash_image_bytes, normalize_survey
 
 # 환경 변수 로드
 load_dotenv("../../../.env")
@@ -33,13 +49,9 @@ def load_swin_model(model_path: str, device: torch.device) -> SwinHairClassifier
     """Swin 모델 로드"""
     model = SwinHairClassifier(num_classes=4)
 
-    if os.path.exists(model_path):
-        checkpoint = torch.load(model_path, map_location=device)
-        if 'model_state_dict' in checkpoint:
-            model.load_state_dict(checkpoint['model_state_dict'])
-        else:
-            model.load_state_dict(checkpoint)
-        log_message(f"모델 로드 완료: {model_path}")
+    if checkpoint_exists(model_path):
+        loaded_path = load_checkpoint_into(model, model_path, device)
+        log_message(f"모델 로드 완료: {loaded_path}")
     else:
         raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {model_path}")
 
@@ -49,20 +61,85 @@ def load_swin_model(model_path: str, device: torch.device) -> SwinHairClassifier
 
 def load_face_parsing_model(device: torch.device) -> BiSeNet:
     """Face parsing 모델 로드 (마스킹용)"""
-    model = BiSeNet(n_classes=19)
     model_path = 'services/swin_hair_classification/models/face_parsing/res/cp/79999_iter.pth'
+    # 전체 체크포인트로 덮어쓰므로 ResNet18 ImageNet 가중치는 다운로드하지 않음
+    model = BiSeNet(n_classes=19, pretrained_backbone=False)
 
-    if os.path.exists(model_path):
-        model.load_state_dict(torch.load(model_path, map_location=device))
+    if checkpoint_exists(model_path):
+        loaded_path = load_checkpoint_into(model, model_path, device)
         model.to(device)
         model.eval()
-        log_message(f"Face parsing 모델 로드 완료: {model_path}")
+        log_message(f"Face parsing 모델 로드 완료: {loaded_path}")
     else:
         raise FileNotFoundError(f"Face parsing 모델을 찾을 수 없습니다: {model_path}")
 
     return model
 
-def apply_face_blur(image_bytes: bytes, face_parsing_model: BiSeNet, device: torch.device, blur_strength: int = 25) -> bytes:
+# ImageNet 정규화 상수 (호출마다 transforms.Compose를 만들지 않도록 미리 계산)
+_IMAGENET_MEAN = torch.tensor([0.485, 0.456, 0.406]).view(3, 1, 1)
+_IMAGENET_STD = torch.tensor([0.229, 0.224, 0.225]).view(3, 1, 1)
+
+# Face parsing 클래스 (CelebAMask-HQ 19클래스 기준)
+HAIR_CLASS = 17
+FACE_CLASSES = [1, 10, 11, 12, 13]  # skin, nose, mouth, lips
+EAR_CLASSES = [7, 8]                # 왼쪽/오른쪽 귀
+SIDE_VIEW_EAR_RATIO = 0.002         # 귀 픽셀 비율이 이 값을 넘으면 Side view로 판단
+
+# BiSeNet 1/8 해상도 argmax + nearest 업샘플 모드 (빠르지만 경계가 거칠어짐, 기본 비활성화)
+BISENET_FAST_ARGMAX = os.getenv("BISENET_FAST_ARGMAX", "false").lower() == "true"
+
+def normalize_image(image_np: np.ndarray) -> torch.Tensor:
+    """
+    uint8 RGB 배열(H, W, 3)을 정규화된 텐서(3, H, W)로 변환
+    transforms.ToTensor() + transforms.Normalize(ImageNet)와 동일한 결과
+    """
+    tensor = torch.from_numpy(np.ascontiguousarray(image_np)).permute(2, 0, 1).float().div_(255.0)
+    return tensor.sub_(_IMAGENET_MEAN).div_(_IMAGENET_STD)
+
+class ImagePreprocessContext:
+    """
+    이미지 1장에 대한 전처리 컨텍스트
+    - JPEG 디코딩은 한 번만 수행
+    - 512x512 BiSeNet 파싱도 한 번만 수행하고, 헤어 마스크/얼굴 블러/Top·Side 뷰 검사가 공유
+    """
+
+    def __init__(self, image_bytes: bytes, face_parsing_model: BiSeNet, device: torch.device):
+        self.image_bytes = image_bytes
+        self.face_parsing_model = face_parsing_model
+        self.device = device
+        self.image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        self.image_np = np.array(self.image)
+        self._parsing_map = None
+
+    @property
+    def original_size(self) -> tuple:
+        """원본 크기 (height, width)"""
+        return self.image_np.shape[:2]
+
+    def bisenet_input(self) -> torch.Tensor:
+        """BiSeNet 입력 텐서 [3, 512, 512]"""
+        return normalize_image(cv2.resize(self.image_np, (512, 512)))
+
+    @property
+    def parsing_map(self) -> np.ndarray:
+        """512x512 face parsing 결과 (클래스 인덱스), 최초 접근 시 한 번만 계산"""
+        if self._parsing_map is None:
+            input_tensor = self.bisenet_input().unsqueeze(0).to(self.device)
+            with torch.no_grad():
+                parsing = parse_face(self.face_parsing_model, input_tensor, fast=BISENET_FAST_ARGMAX)
+                self._parsing_map = parsing.squeeze().cpu().numpy()
+        return self._parsing_map
+
+    def hair_mask(self) -> np.ndarray:
+        """헤어 마스크 (클래스 17, 512x512, 0/255)"""
+        return (self.parsing_map == HAIR_CLASS).astype(np.uint8) * 255
+
+    def face_mask(self) -> np.ndarray:
+        """얼굴 영역 마스크 (512x512, 0/255)"""
+        return np.isin(self.parsing_map, FACE_CLASSES).astype(np.uint8) * 255
+
+def apply_face_blur(image_bytes: bytes, face_parsing_model: BiSeNet, device: torch.device, blur_strength: int = 25,
+                    context: ImagePreprocessContext = None) -> bytes:
     """
     얼굴 부분만 블러 처리한 이미지 반환
     Args:
@@ -70,32 +147,17 @@ def apply_face_blur(image_bytes: bytes, face_parsing_model: BiSeNet, device: tor
         face_parsing_model: Face parsing 모델
         device: 디바이스
         blur_strength: 블러 강도 (기본값 25)
+        context: 이미 만들어진 전처리 컨텍스트 (있으면 디코딩/파싱 재사용)
     Returns: 블러 처리된 이미지의 이진 데이터
     """
     try:
-        # bytes를 PIL Image로 변환
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        image_np = np.array(image)
-        original_size = image_np.shape[:2]  # (height, width)
-
-        # OpenCV 형식으로 변환 및 리사이즈
-        image_resized = cv2.resize(image_np, (512, 512))
-
-        # 정규화 및 텐서 변환
-        transform = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225))
-        ])
-
-        input_tensor = transform(image_resized).unsqueeze(0).to(device)
+        if context is None:
+            context = ImagePreprocessContext(image_bytes, face_parsing_model, device)
+        image_np = context.image_np
+        original_size = context.original_size  # (height, width)
 
-        # Face Parsing으로 얼굴 마스크 생성
-        with torch.no_grad():
-            output = face_parsing_model(input_tensor)[0]
-            mask = torch.argmax(output, dim=1).squeeze().cpu().numpy()
-
-        # 얼굴 영역 마스크 생성 (클래스: 1=skin, 10=nose, 11=eyes, 12=eyebrows, 13=ears)
-        face_mask = np.isin(mask, [1, 10, 11, 12, 13]).astype(np.uint8) * 255
+        # 얼굴 영역 마스크 (파싱 결과 재사용)
+        face_mask = context.face_mask()
 
         # 마스크를 원본 크기로 리사이즈
         face_mask_resized = cv2.resize(face_mask, (original_size[1], original_size[0]))
@@ -122,53 +184,55 @@ def apply_face_blur(image_bytes: bytes, face_parsing_model: BiSeNet, device: tor
         log_message(f"얼굴 블러 처리 실패: {e}")
         return image_bytes  # 실패 시 원본 반환
 
-def generate_hair_mask(image_bytes: bytes, face_parsing_model: BiSeNet, device: torch.device) -> np.ndarray:
+def generate_hair_mask(image_bytes: bytes, face_parsing_model: BiSeNet, device: torch.device,
+                       context: ImagePreprocessContext = None) -> np.ndarray:
     """이미지에서 헤어 마스크 생성"""
     try:
-        # bytes를 PIL Image로 변환
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        image_np = np.array(image)
-
-        # OpenCV 형식으로 변환 및 리사이즈
-        image_resized = cv2.resize(image_np, (512, 512))
-
-        # 정규화 및 텐서 변환
-        transform = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225))
-        ])
-
-        input_tensor = transform(image_resized).unsqueeze(0).to(device)
-
-        # 마스크 생성
-        with torch.no_grad():
-            output = face_parsing_model(input_tensor)[0]
-            mask = torch.argmax(output, dim=1).squeeze().cpu().numpy()
-
-        # 헤어 마스크 (클래스 17)
-        hair_mask = (mask == 17).astype(np.uint8) * 255
-        return hair_mask
+        if context is None:
+            context = ImagePreprocessContext(image_bytes, face_parsing_model, device)
+        return context.hair_mask()
 
     except Exception as e:
         log_message(f"마스크 생성 실패: {e}")
         return np.zeros((512, 512), dtype=np.uint8)
 
-def preprocess_image_with_mask(image_bytes: bytes, mask: np.ndarray) -> torch.Tensor:
+def check_view_type(context: ImagePreprocessContext, expected_view: str) -> Dict[str, Any]:
+    """
+    BiSeNet 파싱 결과로 Top/Side 이미지 타입 검사 (귀 감지)
+    - Side view: 귀가 보이는 것이 정상
+    - Top view: 귀가 거의 보이지 않는 것이 정상
+    결과는 참고용이며 분석을 중단하지 않음
+    """
+    parsing_map = context.parsing_map
+    total_pixels = parsing_map.size
+    ear_ratio = float(np.isin(parsing_map, EAR_CLASSES).sum()) / total_pixels
+    face_ratio = float(np.isin(parsing_map, FACE_CLASSES).sum()) / total_pixels
+
+    detected_view = 'side' if ear_ratio > SIDE_VIEW_EAR_RATIO else 'top'
+    matched = detected_view == expected_view
+    if not matched:
+        log_message(f"⚠️ 뷰 타입 불일치 - 기대: {expected_view}, 감지: {detected_view} (귀 비율 {ear_ratio:.4f})")
+
+    return {
+        'expected': expected_view,
+        'detected': detected_view,
+        'matched': matched,
+        'ear_ratio': round(ear_ratio, 4),
+        'face_ratio': round(face_ratio, 4)
+    }
+
+def preprocess_image_with_mask(image_bytes: bytes, mask: np.ndarray,
+                               context: ImagePreprocessContext = None) -> torch.Tensor:
     """이미지와 마스크를 전처리하여 6채널 텐서 생성"""
-    # 원본 이미지 로드
-    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    # 원본 이미지 로드 (컨텍스트가 있으면 디코딩 결과 재사용)
+    image = context.image if context is not None else Image.open(io.BytesIO(image_bytes)).convert('RGB')
     image = image.resize((224, 224))
 
     # 마스크 리사이즈
     mask_resized = cv2.resize(mask, (224, 224))
 
     # 이미지 정규화
-    transform = transforms.Compose([
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-
-    image_tensor = transform(image)  # [3, 224, 224]
+    image_tensor = normalize_image(np.asarray(image))  # [3, 224, 224]
 
     # 마스크를 3채널로 확장하고 정규화
     mask_normalized = mask_resized.astype(np.float32) / 255.0
@@ -180,34 +244,175 @@ def preprocess_image_with_mask(image_bytes: bytes, mask: np.ndarray) -> torch.Te
 
     return combined
 
+def parse_faces(contexts: List[ImagePreprocessContext], face_parsing_model: BiSeNet, device: torch.device):
+    """
+    여러 컨텍스트의 BiSeNet 파싱을 하나의 배치로 실행 (Top + Side → 배치 2)
+    이미 파싱된 컨텍스트는 건너뜀
+    """
+    pending = [ctx for ctx in contexts if ctx._parsing_map is None]
+    if not pending:
+        return
+
+    batch = torch.stack([ctx.bisenet_input() for ctx in pending]).to(device)  # [N, 3, 512, 512]
+    with torch.no_grad():
+        parsing_maps = parse_face(face_parsing_model, batch, fast=BISENET_FAST_ARGMAX).cpu().numpy()  # [N, 512, 512]
+
+    for ctx, parsing_map in zip(pending, parsing_maps):
+        ctx._parsing_map = parsing_map
+
+def predict_swin(model: SwinHairClassifier, input_tensor: torch.Tensor, device: torch.device) -> Dict[str, Any]:
+    """6채널 입력 텐서 [6, 224, 224]로 Swin 예측 수행"""
+    with torch.no_grad():
+        outputs = model(input_tensor.unsqueeze(0).to(device))  # [1, 6, 224, 224]
+
+    return logits_to_result(outputs[0])
+
+def logits_to_result(logits: torch.Tensor) -> Dict[str, Any]:
+    """Swin 로짓 [4]을 level/confidence/probabilities 결과로 변환"""
+    probabilities = torch.softmax(logits, dim=0)
+    predicted_class = torch.argmax(logits).item()
+    confidence = probabilities[predicted_class].item()
+
+    return {
+        'level': predicted_class,
+        'confidence': confidence,
+        'probabilities': probabilities.cpu().numpy().tolist()
+    }
+
 def analyze_single_image(image_bytes: bytes, model: SwinHairClassifier,
-                        face_parsing_model: BiSeNet, device: torch.device) -> Dict[str, Any]:
+                        face_parsing_model: BiSeNet, device: torch.device,
+                        view: str = None) -> Dict[str, Any]:
     """단일 이미지 분석"""
     try:
+        # 0. 전처리 컨텍스트 (디코딩 1회, BiSeNet 파싱 1회)
+        context = ImagePreprocessContext(image_bytes, face_parsing_model, device)
+
         # 1. 마스크 생성
-        mask = generate_hair_mask(image_bytes, face_parsing_model, device)
+        mask = generate_hair_mask(image_bytes, face_parsing_model, device, context=context)
 
         # 2. 전처리
-        input_tensor = preprocess_image_with_mask(image_bytes, mask)
-        input_tensor = input_tensor.unsqueeze(0).to(device)  # [1, 6, 224, 224]
+        input_tensor = preprocess_image_with_mask(image_bytes, mask, context=context)
 
         # 3. 예측
-        with torch.no_grad():
-            outputs = model(input_tensor)
-            probabilities = torch.softmax(outputs, dim=1)
-            predicted_class = torch.argmax(outputs, dim=1).item()
-            confidence = probabilities[0][predicted_class].item()
+        result = predict_swin(model, input_tensor, device)
 
-        return {
-            'level': predicted_class,
-            'confidence': confidence,
-            'probabilities': probabilities[0].cpu().numpy().tolist()
-        }
+        # 4. Top/Side 뷰 검사 (파싱 결과 재사용)
+        if view:
+            result['view_check'] = check_view_type(context, view)
+
+        return result
 
     except Exception as e:
         log_message(f"이미지 분석 실패: {e}")
         return None
 
+# Top/Side 동시 분석용 워커 풀 (Swin forward 2개를 병렬 실행)
+_dual_executor = None
+
+def _get_dual_executor() -> ThreadPoolExecutor:
+    global _dual_executor
+    if _dual_executor is None:
+        _dual_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="swin-dual")
+    return _dual_executor
+
+def analyze_dual_images(top_image_bytes: bytes, side_image_bytes: bytes, top_model: SwinHairClassifier,
+                        side_model: SwinHairClassifier, face_parsing_model: BiSeNet,
+                        device: torch.device) -> tuple:
+    """
+    Top + Side 이미지 배치/동시 분석
+    1. 두 이미지를 BiSeNet 배치 2로 한 번에 파싱
+    2. Top/Side Swin forward를 전용 워커 2개에서 동시에 실행
+       (intra-op 스레드 수는 시작 시 한 번만 설정 - 요청마다 torch.set_num_threads로 전역 값을 바꾸지 않음)
+    Returns: (top_result, side_result) - 실패한 쪽은 None
+    """
+    try:
+        top_ctx = ImagePreprocessContext(top_image_bytes, face_parsing_model, device)
+        side_ctx = ImagePreprocessContext(side_image_bytes, face_parsing_model, device)
+
+        # 1. BiSeNet 배치 파싱 (배치 2)
+        parse_faces([top_ctx, side_ctx], face_parsing_model, device)
+
+        # 2. Swin 입력 생성
+        top_input = preprocess_image_with_mask(top_image_bytes, top_ctx.hair_mask(), context=top_ctx)
+        side_input = preprocess_image_with_mask(side_image_bytes, side_ctx.hair_mask(), context=side_ctx)
+    except Exception as e:
+        log_message(f"배치 전처리 실패: {e}")
+        return None, None
+
+    # 3. Swin forward 동시 실행
+    executor = _get_dual_executor()
+    top_future = executor.submit(predict_swin, top_model, top_input, device)
+    side_future = executor.submit(predict_swin, side_model, side_input, device)
+
+    results = []
+    for future, ctx, view in ((top_future, top_ctx, 'top'), (side_future, side_ctx, 'side')):
+        try:
+            result = future.result()
+            result['view_check'] = check_view_type(ctx, view)
+            results.append(result)
+        except Exception as e:
+            log_message(f"{view} 이미지 분석 실패: {e}")
+            results.append(None)
+
+    return results[0], results[1]
+
+def analyze_with_batchers(image_inputs: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    마이크로 배칭 스케줄러를 통한 분석
+    다른 요청들의 입력과 함께 BiSeNet / Top / Side 배치 forward로 묶여 실행됨
+    Args:
+        image_inputs: [(image_bytes, view), ...] - view는 'top' 또는 'side'
+    Returns: 입력 순서대로 결과 리스트 (실패한 항목은 None)
+    """
+    results = [None] * len(image_inputs)
+    contexts = [None] * len(image_inputs)
+
+    # 1. BiSeNet 파싱 요청 (이미지별 Future)
+    parse_futures = []
+    for i, (image_bytes, view) in enumerate(image_inputs):
+        try:
+            contexts[i] = ImagePreprocessContext(image_bytes, _face_parsing_model, _device)
+            parse_futures.append((i, _parsing_batcher.submit(contexts[i].bisenet_input().to(_device))))
+        except Exception as e:
+            log_message(f"{view} 이미지 전처리 실패: {e}")
+
+    # 2. 파싱 결과 수신 → Swin 입력 생성 → Top/Side 배처에 제출
+    swin_futures = []
+    for i, future in parse_futures:
+        image_bytes, view = image_inputs[i]
+        try:
+            contexts[i]._parsing_map = future.result().cpu().numpy()
+            swin_input = preprocess_image_with_mask(image_bytes, contexts[i].hair_mask(), context=contexts[i])
+            batcher = _top_batcher if view == 'top' else _side_batcher
+            swin_futures.append((i, batcher.submit(swin_input.to(_device))))
+        except Exception as e:
+            log_message(f"{view} 이미지 분석 실패: {e}")
+
+    # 3. Swin 결과 수신
+    for i, future in swin_futures:
+        view = image_inputs[i][1]
+        try:
+            result = logits_to_result(future.result())
+            result['view_check'] = check_view_type(contexts[i], view)
+            results[i] = result
+        except Exception as e:
+            log_message(f"{view} 이미지 분석 실패: {e}")
+
+    return results
+
+def get_batching_stats() -> Dict[str, Any]:
+    """마이크로 배칭 스케줄러 통계 (배치 크기 / 큐 대기 시간 히스토그램)"""
+    if not SWIN_MICRO_BATCHING or _parsing_batcher is None:
+        return {'enabled': SWIN_MICRO_BATCHING, 'initialized': False}
+
+    return {
+        'enabled': True,
+        'initialized': True,
+        'face_parsing': _parsing_batcher.stats(),
+        'top': _top_batcher.stats(),
+        'side': _side_batcher.stats()
+    }
+
 def calculate_survey_score(survey_data: Dict[str, Any]) -> float:
     """
     의학 문헌 기반 설문 점수 계산 (0-3 범위)
@@ -448,91 +653,122 @@ def generate_advice(stage: int) -> List[str]:
     }
     return advice_map.get(stage, advice_map[0])
 
-def enhance_with_llm(stage: int, confidence: float, survey_data: Dict[str, Any] = None, has_side_image: bool = False) -> Dict[str, Any]:
+# Gemini 모델 이름 후보 (순서대로 시도)
+LLM_MODEL_NAMES = [
+    'gemini-2.5-pro',
+    'gemini-pro',
+    'gemini-1.5-pro-latest',
+    'models/gemini-pro',
+    'gemini-1.0-pro'
+]
+
+# 단계별 기본 정보
+STAGE_INFO = {
+    0: {"level": "정상", "severity": "건강한 상태"},
+    1: {"level": "초기 단계", "severity": "경미한 변화"},
+    2: {"level": "중등도", "severity": "진행 중"},
+    3: {"level": "심각 단계", "severity": "상당히 진행됨"}
+}
+
+_llm_model = None
+_llm_model_resolved = False
+_llm_model_lock = threading.Lock()
+
+def get_llm_model():
     """
-    LLM을 사용하여 분석 결과를 자연스럽고 상세하게 포장
-    Args:
-        stage: 분석된 탈모 단계 (0-3)
-        confidence: 분석 신뢰도
-        survey_data: 설문 데이터 (optional)
-    Returns: {"title": str, "description": str, "advice": List[str]}
+    결과 포장용 Gemini 모델을 한 번만 설정/선택해서 재사용
+    API 키가 없거나 모든 모델 로드에 실패하면 None (기본 템플릿 사용)
     """
-    try:
+    global _llm_model, _llm_model_resolved
+
+    with _llm_model_lock:
+        if _llm_model_resolved:
+            return _llm_model
+
         # Gemini API 설정 (결과 포장 전용 키 사용)
         api_key = os.getenv("GEMINI_API_KEY_1")
         log_message(f"🔑 API 키 확인: {'존재함' if api_key else '없음'}")
 
         if not api_key:
             log_message("⚠️ GEMINI_API_KEY_1 없음 - 기본 템플릿 사용")
-            return generate_title_and_description_fallback(stage)
-
-        log_message("📡 Gemini API 호출 준비 중...")
-        genai.configure(api_key=api_key)
-
-        # 사용 가능한 모델명 시도 (순서대로)
-        model_names = [
-            'gemini-2.5-pro',
-            'gemini-pro',
-            'gemini-1.5-pro-latest',
-            'models/gemini-pro',
-            'gemini-1.0-pro'
-        ]
+        else:
+            genai.configure(api_key=api_key)
+            for model_name in LLM_MODEL_NAMES:
+                try:
+                    _llm_model = genai.GenerativeModel(model_name)
+                    log_message(f"✅ 모델 로드 성공: {model_name}")
+                    break
+                except Exception as e:
+                    log_message(f"⚠️ {model_name} 실패: {str(e)[:100]}")
+                    continue
+
+            if _llm_model is None:
+                log_message("❌ 모든 모델 로드 실패 - 기본 템플릿 사용")
+
+        _llm_model_resolved = True
+        return _llm_model
+
+def confidence_bucket(confidence: float) -> float:
+    """신뢰도를 LLM_CONFIDENCE_BUCKET 간격 구간의 중앙값으로 변환 (예: 0.87 → 0.85)"""
+    step = LLM_CONFIDENCE_BUCKET
+    index = int(min(max(confidence, 0.0), 0.9999) // step)
+    return round(index * step + step / 2, 4)
+
+def build_survey_profile(survey_data: Dict[str, Any] = None, has_side_image: bool = False) -> tuple:
+    """
+    LLM 프롬프트에 들어가는 설문 정보만 남긴 프로필 (캐시 키로 사용)
+    Returns: (나이대, 가족력, 최근 탈모 증상, 스트레스 수준, 성별)
+    """
+    # 성별 정보 (없으면 side_image 유무로 추론)
+    gender = survey_data.get('gender') if survey_data else None
+    if gender == 'male' or gender == '남' or gender == '남성':
+        gender_text = "남성"
+    elif gender == 'female' or gender == '여' or gender == '여성':
+        gender_text = "여성"
+    else:
+        gender_text = "남성" if has_side_image else "여성"
 
-        model = None
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                log_message(f"✅ 모델 로드 성공: {model_name}")
-                break
-            except Exception as e:
-                log_message(f"⚠️ {model_name} 실패: {str(e)[:100]}")
-                continue
-
-        if model is None:
-            log_message("❌ 모든 모델 로드 실패 - 기본 템플릿 사용")
-            return generate_title_and_description_fallback(stage)
-
-        # 설문 데이터 정보 추가
-        survey_context = ""
-        if survey_data:
-            age = survey_data.get('age', '알 수 없음')
-            family_history = "있음" if survey_data.get('familyHistory') == 'yes' else "없음"
-            recent_loss = "있음" if survey_data.get('recentHairLoss') == 'yes' else "없음"
-            stress = survey_data.get('stress', 'low')
-            stress_level = {"low": "낮음", "medium": "보통", "high": "높음"}.get(stress, "보통")
-
-            survey_context = f"""
+    if not survey_data:
+        return (None, None, None, None, gender_text)
+
+    try:
+        age_band = f"{int(survey_data.get('age')) // 10 * 10}대"
+    except (TypeError, ValueError):
+        age_band = '알 수 없음'
+    family_history = "있음" if survey_data.get('familyHistory') == 'yes' else "없음"
+    recent_loss = "있음" if survey_data.get('recentHairLoss') == 'yes' else "없음"
+    stress = survey_data.get('stress', 'low')
+    stress_level = {"low": "낮음", "medium": "보통", "high": "높음"}.get(stress, "보통")
+
+    return (age_band, family_history, recent_loss, stress_level, gender_text)
+
+def _generate_enhancement(stage: int, confidence: float, profile: tuple) -> Dict[str, Any]:
+    """
+    Gemini로 결과 포장 텍스트 생성
+    Returns: {"title", "description", "advice"} 또는 실패 시 None
+    """
+    model = get_llm_model()
+    if model is None:
+        return None
+
+    age_band, family_history, recent_loss, stress_level, gender_text = profile
+
+    # 설문 데이터 정보 추가
+    survey_context = ""
+    if age_band is not None:
+        survey_context = f"""
 사용자 정보:
-- 나이: {age}세
+- 나이: {age_band}
 - 가족력: {family_history}
 - 최근 탈모 증상: {recent_loss}
 - 스트레스 수준: {stress_level}
 """
 
-        # 단계별 기본 정보
-        stage_info = {
-            0: {"level": "정상", "severity": "건강한 상태"},
-            1: {"level": "초기 단계", "severity": "경미한 변화"},
-            2: {"level": "중등도", "severity": "진행 중"},
-            3: {"level": "심각 단계", "severity": "상당히 진행됨"}
-        }
-        info = stage_info.get(stage, stage_info[0])
-
-        # 성별 정보 추가
-        gender = survey_data.get('gender') if survey_data else None
-        log_message(f"🚹🚺 성별 정보: {gender}")
-
-        if gender == 'male' or gender == '남' or gender == '남성':
-            gender_text = "남성"
-        elif gender == 'female' or gender == '여' or gender == '여성':
-            gender_text = "여성"
-        else:
-            # 성별 정보가 없으면 side_image 유무로 추론
-            gender_text = "남성" if has_side_image else "여성"
-            log_message(f"⚠️ 성별 정보 없음, 이미지 유무로 추론: {gender_text}")
+    info = STAGE_INFO.get(stage, STAGE_INFO[0])
+    log_message(f"🚹🚺 성별 정보: {gender_text}")
 
-        # LLM 프롬프트
-        prompt = f"""당신은 경험이 풍부한 탈모 전문의입니다. AI 분석 결과와 환자의 설문조사 정보를 종합적으로 분석하여, 환자 개개인에게 맞춤화된 상세한 설명과 조언을 제공해주세요.
+    # LLM 프롬프트
+    prompt = f"""당신은 경험이 풍부한 탈모 전문의입니다. AI 분석 결과와 환자의 설문조사 정보를 종합적으로 분석하여, 환자 개개인에게 맞춤화된 상세한 설명과 조언을 제공해주세요.
 
 AI 분석 결과:
 - 성별: {gender_text}
@@ -577,33 +813,121 @@ AI 분석 결과:
 5. 친절하고 희망적인 톤 유지하되, 정확한 정보 전달
 6. 추가 텍스트 없이 JSON만 반환"""
 
-        # LLM 호출
-        log_message("🤖 Gemini에 요청 전송 중...")
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        log_message(f"📥 Gemini 응답 수신 완료 (길이: {len(response_text)})")
+    # LLM 호출
+    log_message("🤖 Gemini에 요청 전송 중...")
+    response = model.generate_content(prompt)
+    response_text = response.text.strip()
+    log_message(f"📥 Gemini 응답 수신 완료 (길이: {len(response_text)})")
 
-        # JSON 추출
-        import re
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if not json_match:
-            log_message(f"❌ JSON 추출 실패 - 응답 내용: {response_text[:200]}")
-            return generate_title_and_description_fallback(stage)
+    # JSON 추출
+    json_match = re.search(r'\{[\s\S]*\}', response_text)
+    if not json_match:
+        log_message(f"❌ JSON 추출 실패 - 응답 내용: {response_text[:200]}")
+        return None
 
-        result = json.loads(json_match.group())
+    result = json.loads(json_match.group())
 
-        # 검증
-        if not all(key in result for key in ['title', 'description', 'advice']):
-            log_message(f"❌ 필드 누락 - 응답: {result}")
-            return generate_title_and_description_fallback(stage)
+    # 검증
+    if not all(key in result for key in ['title', 'description', 'advice']):
+        log_message(f"❌ 필드 누락 - 응답: {result}")
+        return None
 
-        log_message(f"✅ LLM 포장 완료: {result['title']}")
-        return result
+    log_message(f"✅ LLM 포장 완료: {result['title']}")
+    return result
+
+def enhance_with_llm(stage: int, confidence: float, survey_data: Dict[str, Any] = None, has_side_image: bool = False) -> Dict[str, Any]:
+    """
+    LLM을 사용하여 분석 결과를 자연스럽고 상세하게 포장
+    (단계, 신뢰도 구간, 설문 프로필) 키로 캐시해서 같은 조합은 Gemini를 다시 호출하지 않음
+    Args:
+        stage: 분석된 탈모 단계 (0-3)
+        confidence: 분석 신뢰도
+        survey_data: 설문 데이터 (optional)
+        has_side_image: Side 이미지 유무 (성별 정보가 없을 때 성별 추론에 사용)
+    Returns: {"title": str, "description": str, "advice": List[str]}
+    """
+    key = (stage, confidence_bucket(confidence), build_survey_profile(survey_data, has_side_image))
+    with _enhancement_key_lock:
+        _enhancement_key_counts[key] += 1
+
+    cached = _enhancement_cache.get(key)
+    if cached is not None:
+        log_message("♻️ LLM 포장 캐시 적중")
+        return cached
 
+    try:
+        result = _generate_enhancement(*key)
     except Exception as e:
         log_message(f"LLM 포장 실패: {e} - 기본 템플릿 사용")
+        result = None
+
+    if result is None:
         return generate_title_and_description_fallback(stage)
 
+    _enhancement_cache.set(key, result)
+    return result
+
+def _default_prewarm_keys() -> List[tuple]:
+    """설문 없는 기본 조합 (단계 0~3 × 남성/여성 × 자주 나오는 신뢰도 구간)"""
+    keys = []
+    for stage in STAGE_INFO:
+        for confidence in (0.8, 0.9):
+            for has_side_image in (True, False):
+                keys.append((stage, confidence_bucket(confidence), build_survey_profile(None, has_side_image)))
+    return keys
+
+def prewarm_llm_cache(top_n: int = None) -> int:
+    """
+    자주 쓰이는 키의 LLM 포장 텍스트를 미리 생성해서 캐시에 채움
+    기본 조합 + 지금까지 요청이 많았던 상위 top_n 키 중 캐시에 없는 것만 생성
+    Returns: 새로 생성한 항목 수
+    """
+    if top_n is None:
+        top_n = LLM_PREWARM_TOP_N
+    with _enhancement_key_lock:
+        frequent = [key for key, _ in _enhancement_key_counts.most_common(top_n)]
+
+    warmed = 0
+    for key in dict.fromkeys(frequent + _default_prewarm_keys()):
+        if _enhancement_cache.contains(key):
+            continue
+        try:
+            result = _generate_enhancement(*key)
+        except Exception as e:
+            log_message(f"⚠️ LLM 캐시 예열 실패 {key[:2]}: {e}")
+            continue
+        if result is None:
+            # 모델 없음 (API 키 없음 등) → 예열 중단
+            if get_llm_model() is None:
+                break
+            continue
+        _enhancement_cache.set(key, result)
+        warmed += 1
+    return warmed
+
+def _prewarm_loop():
+    while True:
+        warmed = prewarm_llm_cache()
+        log_message(f"🔥 LLM 포장 캐시 예열 완료: {warmed}개 생성")
+        if get_llm_model() is None:
+            return
+        time.sleep(LLM_PREWARM_INTERVAL)
+
+def start_llm_prewarm():
+    """Gemini 모델 선택 + LLM 포장 캐시 예열을 백그라운드 스레드로 시작 (한 번만)"""
+    global _prewarm_thread
+    if not LLM_PREWARM or _prewarm_thread is not None:
+        return
+    _prewarm_thread = threading.Thread(target=_prewarm_loop, name="llm-prewarm", daemon=True)
+    _prewarm_thread.start()
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """LLM 포장 캐시 통계"""
+    stats = _enhancement_cache.stats()
+    stats['model_resolved'] = _llm_model_resolved
+    stats['model_available'] = _llm_model is not None
+    return stats
+
 def generate_title_and_description_fallback(stage: int) -> Dict[str, Any]:
     """LLM 사용 불가 시 기본 템플릿 (기존 함수)"""
     stage_info = {
@@ -641,117 +965,415 @@ _top_model = None
 _face_parsing_model = None
 _device = None
 
-def initialize_models():
-    """모델들을 초기화 (한 번만 로드)"""
-    global _side_model, _top_model, _face_parsing_model, _device
-
-    if _side_model is None:
-        _device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        log_message(f"사용 디바이스: {_device}")
-
-        # 모델 경로
-        side_model_path = 'services/swin_hair_classification/models/best_swin_hair_classifier_side.pth'
-        top_model_path = 'services/swin_hair_classification/models/best_swin_hair_classifier_top.pth'
+# 모델 초기화 상태 (단일 로드 보장용 락 + 워밍업 완료 모델)
+SWIN_MODEL_NAMES = ('swin_top', 'swin_side', 'face_parsing')
+_init_lock = threading.Lock()
+_models_ready = False
+_models_warm = False
+_warm_models = set()
+
+# Top+Side 배치/동시 실행 모드 (기본 활성화)
+SWIN_BATCHED_DUAL = os.getenv("SWIN_BATCHED_DUAL", "true").lower() == "true"
+
+# 추론 백엔드 ('torch' 또는 'onnx' - ONNX Runtime CPU Execution Provider)
+SWIN_INFERENCE_BACKEND = os.getenv("SWIN_INFERENCE_BACKEND", "torch").lower()
+
+# INT8 양자화 CPU 추론 모드 (torch 백엔드 전용, 기본 비활성화)
+SWIN_QUANTIZED = os.getenv("SWIN_QUANTIZED", "false").lower() == "true"
+
+# Swin 추론 최적화 모드 (bias 캐시 + SDPA + 마스크 채널 접기, torch 백엔드 전용, 기본 활성화)
+SWIN_FREEZE_FOR_INFERENCE = os.getenv("SWIN_FREEZE_FOR_INFERENCE", "true").lower() == "true"
+
+# 요청 간 동적 마이크로 배칭 모드 (기본 비활성화)
+SWIN_MICRO_BATCHING = os.getenv("SWIN_MICRO_BATCHING", "false").lower() == "true"
+SWIN_MAX_BATCH_SIZE = int(os.getenv("SWIN_MAX_BATCH_SIZE", "8"))
+SWIN_MAX_WAIT_MS = float(os.getenv("SWIN_MAX_WAIT_MS", "10"))
+_parsing_batcher = None
+_top_batcher = None
+_side_batcher = None
+
+# 결과 캐시 (분류 결과 / LLM 텍스트 분리, 각각 TTL 적용)
+SWIN_RESULT_CACHE = os.getenv("SWIN_RESULT_CACHE", "true").lower() == "true"
+SWIN_RESULT_CACHE_MB = float(os.getenv("SWIN_RESULT_CACHE_MB", "32"))
+SWIN_RESULT_CACHE_TTL = float(os.getenv("SWIN_RESULT_CACHE_TTL", "86400"))
+SWIN_LLM_CACHE_TTL = float(os.getenv("SWIN_LLM_CACHE_TTL", "3600"))
+_classifier_cache = TTLLRUCache("swin_classifier", SWIN_RESULT_CACHE_MB, SWIN_RESULT_CACHE_TTL)
+_llm_cache = TTLLRUCache("swin_llm", SWIN_RESULT_CACHE_MB, SWIN_LLM_CACHE_TTL)
+
+# LLM 포장 캐시 (단계, 신뢰도 구간, 설문 프로필) + 백그라운드 예열
+LLM_CONFIDENCE_BUCKET = float(os.getenv("LLM_CONFIDENCE_BUCKET", "0.1"))
+LLM_ENHANCE_CACHE_MB = float(os.getenv("LLM_ENHANCE_CACHE_MB", "8"))
+LLM_ENHANCE_CACHE_TTL = float(os.getenv("LLM_ENHANCE_CACHE_TTL", "86400"))
+# 예열은 요청 없이 유료 LLM을 호출하고 프로세스마다 (pre-fork 워커 / reload 포함) 따로 돌므로 기본 비활성화
+# 켤 때는 한 프로세스에서만 LLM_PREWARM=true로 실행
+LLM_PREWARM = os.getenv("LLM_PREWARM", "false").lower() == "true"
+LLM_PREWARM_TOP_N = int(os.getenv("LLM_PREWARM_TOP_N", "20"))
+LLM_PREWARM_INTERVAL = float(os.getenv("LLM_PREWARM_INTERVAL", "3600"))
+_enhancement_cache = TTLLRUCache("llm_enhancement", LLM_ENHANCE_CACHE_MB, LLM_ENHANCE_CACHE_TTL)
+_enhancement_key_counts = Counter()
+_enhancement_key_lock = threading.Lock()
+_prewarm_thread = None
+
+def _resolve_device() -> torch.device:
+    """ONNX Runtime 백엔드와 INT8 양자화 모드는 CPU에서만 실행"""
+    if SWIN_INFERENCE_BACKEND == "onnx" or SWIN_QUANTIZED:
+        return torch.device('cpu')
+    return torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+def _load_served_swin(view: str):
+    """서빙용 Swin 모델 로드 (백엔드 / 추론 최적화 / 양자화 설정 적용)"""
+    if SWIN_INFERENCE_BACKEND == "onnx":
+        from services.swin_hair_classification.onnx_backend import OnnxSwinModel, ONNX_PATHS
+        log_message(f"ONNX Runtime 모델 로드: {ONNX_PATHS[view]}")
+        return OnnxSwinModel(ONNX_PATHS[view])
+
+    model = load_swin_model(f'services/swin_hair_classification/models/best_swin_hair_classifier_{view}.pth',
+                            _resolve_device())
+    if SWIN_FREEZE_FOR_INFERENCE:
+        model.freeze_for_inference()
+        log_message(f"Swin({view}) 추론 최적화 모드 적용 (freeze_for_inference)")
+    if SWIN_QUANTIZED:
+        from services.swin_hair_classification.quantization import quantize_swin_dynamic
+        model = quantize_swin_dynamic(model)
+        log_message(f"Swin({view}) 동적 INT8 양자화 완료")
+    return model
 
-        # 모델 로드
-        _side_model = load_swin_model(side_model_path, _device)
-        _top_model = load_swin_model(top_model_path, _device)
-        _face_parsing_model = load_face_parsing_model(_device)
+def _load_served_face_parsing():
+    """
+    서빙용 BiSeNet 로드
+    - ONNX 백엔드: ONNX Runtime 세션
+    - INT8 양자화 모드: 캘리브레이션된 정적 INT8 모델 (파일이 없으면 fp32 유지)
+    """
+    if SWIN_INFERENCE_BACKEND == "onnx":
+        from services.swin_hair_classification.onnx_backend import OnnxBiSeNet, ONNX_PATHS
+        log_message(f"ONNX Runtime 모델 로드: {ONNX_PATHS['face_parsing']}")
+        return OnnxBiSeNet(ONNX_PATHS['face_parsing'])
+
+    if SWIN_QUANTIZED:
+        from services.swin_hair_classification.quantization import load_quantized_bisenet
+        try:
+            model = load_quantized_bisenet()
+            log_message("INT8 BiSeNet 로드 완료")
+            return model
+        except Exception as e:
+            log_message(f"⚠️ INT8 BiSeNet 로드 실패, fp32 사용: {e}")
+
+    return load_face_parsing_model(_resolve_device())
+
+def get_shared_model(name: str):
+    """
+    프로세스 전역 레지스트리에서 공유 모델 가져오기 ('swin_top' / 'swin_side' / 'face_parsing')
+    time_series 등 다른 서비스도 같은 인스턴스를 사용
+    """
+    return model_registry.get(name)
+
+def get_model_states() -> Dict[str, Any]:
+    """모델별 로드 상태 (not_loaded / loading / loaded / warm / failed / evicted)"""
+    registry_models = model_registry.stats()['models']
+    models = {}
+    for name in SWIN_MODEL_NAMES:
+        info = registry_models.get(name, {})
+        state = info.get('state', 'not_loaded')
+        if state == 'loaded' and name in _warm_models:
+            state = 'warm'
+        models[name] = {'state': state, 'loaded_at': info.get('loaded_at'), 'error': info.get('error')}
 
-        log_message("모든 모델 초기화 완료")
+    return {
+        'ready': _models_ready,
+        'warm': _models_warm,
+        'backend': SWIN_INFERENCE_BACKEND,
+        'device': str(_device) if _device is not None else None,
+        'models': models
+    }
 
-def analyze_hair_with_swin(top_image_data: bytes, side_image_data: bytes = None,
-                          survey_data: Dict[str, Any] = None) -> Dict[str, Any]:
+def initialize_models() -> tuple:
     """
-    Swin 모델로 이미지 분석을 수행하고 표준 결과를 반환합니다.
-    Args:
-        top_image_data: Top view 이미지의 이진(bytes) 데이터
-        side_image_data: Side view 이미지의 이진(bytes) 데이터 (optional, 여성의 경우 None)
-        survey_data: 설문 데이터 (optional, 동적 가중치 계산에 사용)
-    Returns: {"stage": int, "title": str, "description": str, "advice": List[str]}
+    모델들을 초기화 (한 번만 로드)
+    모델은 프로세스 전역 레지스트리에서 가져오고, 동시에 여러 요청이 들어와도 한 번만 로드
+    Returns: (side_model, top_model, face_parsing_model, device)
     """
-    try:
-        # 모델 초기화 (처음 한 번만)
-        initialize_models()
+    global _side_model, _top_model, _face_parsing_model, _device
+    global _parsing_batcher, _top_batcher, _side_batcher, _models_ready
+
+    snapshot = (_side_model, _top_model, _face_parsing_model, _device)
+    if _models_ready and all(item is not None for item in snapshot):
+        model_registry.touch(*SWIN_MODEL_NAMES)
+        return snapshot
+
+    with _init_lock:
+        if not _models_ready:
+            device = _resolve_device()
+            log_message(f"사용 디바이스: {device} (백엔드: {SWIN_INFERENCE_BACKEND})")
+
+            # 모델 로드 (전역 변수는 모든 로드가 끝난 뒤에 한꺼번에 설정)
+            side_model = model_registry.get('swin_side')
+            top_model = model_registry.get('swin_top')
+            face_parsing_model = model_registry.get('face_parsing')
+            _side_model, _top_model, _face_parsing_model, _device = side_model, top_model, face_parsing_model, device
+
+            # 마이크로 배칭 스케줄러 (활성화된 경우, 이 모드에서는 모델이 해제되지 않음)
+            if SWIN_MICRO_BATCHING and _parsing_batcher is None:
+                _parsing_batcher = MicroBatcher(
+                    "face_parsing", lambda batch: parse_face(_face_parsing_model, batch, fast=BISENET_FAST_ARGMAX),
+                    max_batch_size=SWIN_MAX_BATCH_SIZE, max_wait_ms=SWIN_MAX_WAIT_MS)
+                _top_batcher = MicroBatcher(
+                    "swin_top", _top_model, max_batch_size=SWIN_MAX_BATCH_SIZE, max_wait_ms=SWIN_MAX_WAIT_MS)
+                _side_batcher = MicroBatcher(
+                    "swin_side", _side_model, max_batch_size=SWIN_MAX_BATCH_SIZE, max_wait_ms=SWIN_MAX_WAIT_MS)
+                log_message(f"마이크로 배칭 활성화 (max_batch={SWIN_MAX_BATCH_SIZE}, max_wait={SWIN_MAX_WAIT_MS}ms)")
+
+            _models_ready = True
+            log_message("모든 모델 초기화 완료")
+
+        return (_side_model, _top_model, _face_parsing_model, _device)
+
+def _on_model_evicted(name: str):
+    """레지스트리에서 유휴 모델이 해제되면 전역 참조도 놓음 (다음 요청에서 다시 로드)"""
+    global _side_model, _top_model, _face_parsing_model, _models_ready, _models_warm
+
+    with _init_lock:
+        _models_ready = False
+        _models_warm = False
+        _warm_models.discard(name)
+        if name == 'swin_side':
+            _side_model = None
+        elif name == 'swin_top':
+            _top_model = None
+        elif name == 'face_parsing':
+            _face_parsing_model = None
+    log_message(f"♻️ 유휴 모델 해제: {name}")
+
+def warm_up_models():
+    """
+    모델 로드 + 더미 입력으로 forward 한 번씩 실행 (메모리 할당기 / 커널 초기화)
+    첫 요청의 지연 시간을 줄이기 위해 서버 시작 시 호출
+    """
+    global _models_warm
+
+    side_model, top_model, face_parsing_model, device = initialize_models()
+    started = time.perf_counter()
+    with torch.no_grad():
+        parse_face(face_parsing_model, torch.zeros(1, 3, 512, 512, device=device), fast=BISENET_FAST_ARGMAX)
+        _warm_models.add('face_parsing')
+
+        dummy = torch.zeros(1, 6, 224, 224, device=device)
+        top_model(dummy)
+        _warm_models.add('swin_top')
+        side_model(dummy)
+        _warm_models.add('swin_side')
+
+    _models_warm = True
+    log_message(f"🔥 Swin/BiSeNet 워밍업 완료 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+# 프로세스 전역 레지스트리에 서빙 모델 로더 등록 (마이크로 배칭 모드에서는 배처가 참조를 들고 있으므로 해제 제외)
+model_registry.register('swin_side', lambda: _load_served_swin('side'), pinned=SWIN_MICRO_BATCHING, on_evict=_on_model_evicted)
+model_registry.register('swin_top', lambda: _load_served_swin('top'), pinned=SWIN_MICRO_BATCHING, on_evict=_on_model_evicted)
+model_registry.register('face_parsing', _load_served_face_parsing, pinned=SWIN_MICRO_BATCHING, on_evict=_on_model_evicted)
+
+def run_classification(top_image_data: bytes, side_image_data: bytes = None,
+                       survey_data: Dict[str, Any] = None, batched: bool = None) -> Dict[str, Any]:
+    """
+    BiSeNet + Swin 분류 후 Top/Side/설문 결과 융합 (LLM 포장 제외)
+    Returns: fuse_results 결과 {"stage", "confidence", "weights", ...}
+    """
+    # 모델 초기화 (처음 한 번만)
+    side_model, top_model, face_parsing_model, device = initialize_models()
 
-        log_message("Swin 모델 분석 시작")
-        if survey_data:
-            log_message(f"설문 데이터: 나이={survey_data.get('age')}, 가족력={survey_data.get('familyHistory')}")
+    if batched is None:
+        batched = SWIN_BATCHED_DUAL
 
+    side_result = None
+    if SWIN_MICRO_BATCHING:
+        # 요청 간 마이크로 배칭 (다른 요청과 함께 배치 forward)
+        log_message("마이크로 배칭 스케줄러로 분석 중...")
+        image_inputs = [(top_image_data, 'top')]
+        if side_image_data:
+            image_inputs.append((side_image_data, 'side'))
+        batch_results = analyze_with_batchers(image_inputs)
+        top_result = batch_results[0]
+        if side_image_data:
+            side_result = batch_results[1]
+    elif side_image_data and batched:
+        # Top + Side 배치/동시 분석 (BiSeNet 배치 2 + Swin 병렬 실행)
+        log_message("Top + Side view 배치 분석 중...")
+        top_result, side_result = analyze_dual_images(
+            top_image_data, side_image_data, top_model, side_model, face_parsing_model, device)
+    else:
         # Top 이미지 분석
         log_message("Top view 분석 중...")
-        top_result = analyze_single_image(top_image_data, _top_model, _face_parsing_model, _device)
+        top_result = analyze_single_image(top_image_data, top_model, face_parsing_model, device, view='top')
 
         # Side 이미지 분석 (있는 경우만)
-        side_result = None
         if side_image_data:
             log_message("Side view 분석 중...")
-            side_result = analyze_single_image(side_image_data, _side_model, _face_parsing_model, _device)
+            side_result = analyze_single_image(side_image_data, side_model, face_parsing_model, device, view='side')
         else:
             log_message("Side view 이미지 없음 (여성 분석)")
 
-        # 결과 융합 (설문 데이터 포함)
-        log_message("결과 융합 중...")
-        fused_result = fuse_results(top_result, side_result, survey_data)
+    # 결과 융합 (설문 데이터 포함)
+    log_message("결과 융합 중...")
+    return fuse_results(top_result, side_result, survey_data)
 
-        # 최종 결과 구성
-        final_stage = fused_result['stage']
-        final_confidence = fused_result['confidence']
+def get_cache_stats() -> Dict[str, Any]:
+    """분류 결과 / LLM 텍스트 캐시 통계 (적중률, 크기)"""
+    return {
+        'enabled': SWIN_RESULT_CACHE,
+        'classifier': _classifier_cache.stats(),
+        'llm': _llm_cache.stats(),
+        'llm_enhancement': get_llm_cache_stats()
+    }
+
+def is_cacheable_result(fused_result: Dict[str, Any], has_side_image: bool) -> bool:
+    """
+    요청한 모든 뷰가 결과를 냈는지 (BiSeNet/Swin 실패로 'error' 또는 한쪽만 남은 single_model_* 결과는
+    같은 이미지 재요청에 TTL 동안 계속 재사용되지 않도록 캐시하지 않음)
+    """
+    source = fused_result.get('source')
+    if source == 'error':
+        return False
+    if has_side_image and str(source).startswith('single_model_'):
+        return False
+    return True
+
+def classify_hair_with_swin(top_image_data: bytes, side_image_data: bytes = None,
+                            survey_data: Dict[str, Any] = None, batched: bool = None) -> tuple:
+    """
+    1단계: BiSeNet + Swin 분류 및 결과 융합 (캐시 적용, LLM 포장 제외)
+    Returns: (fuse_results 결과, 캐시 키 또는 None - 일부 뷰가 실패한 결과는 None)
+    """
+    log_message("Swin 모델 분석 시작")
+    if survey_data:
+        log_message(f"설문 데이터: 나이={survey_data.get('age')}, 가족력={survey_data.get('familyHistory')}")
+
+    # 캐시 키: 이미지 내용 해시 + 정규화된 설문
+    cache_key = None
+    fused_result = None
+    if SWIN_RESULT_CACHE:
+        cache_key = (hash_image_bytes(top_image_data), hash_image_bytes(side_image_data),
+                     normalize_survey(survey_data))
+        fused_result = _classifier_cache.get(cache_key)
+        if fused_result is not None:
+            log_message("♻️ 분류 결과 캐시 적중 - BiSeNet/Swin 추론 생략")
+
+    if fused_result is None:
+        fused_result = run_classification(top_image_data, side_image_data, survey_data, batched)
+        if cache_key is not None:
+            if is_cacheable_result(fused_result, side_image_data is not None):
+                _classifier_cache.set(cache_key, fused_result)
+            else:
+                # 실패한 결과는 분류 / LLM 텍스트 캐시 모두에 남기지 않음
+                log_message(f"⚠️ 일부 뷰 분석 실패 ({fused_result.get('source')}) - 결과 캐시 생략")
+                cache_key = None
+
+    return fused_result, cache_key
+
+def build_classification_payload(fused_result: Dict[str, Any]) -> Dict[str, Any]:
+    """융합 결과 → 응답의 분류 부분 (stage, confidence, 가중치 정보)"""
+    # 가중치 정보 구성 (프론트에 표시용)
+    weights_info = fused_result.get('weights', {'top': 1.0, 'side': 0.0, 'survey': 0.0})
+    survey_score = fused_result.get('survey_score', 0.0)
 
-        # LLM으로 결과 포장 (설문 데이터 포함)
-        log_message("=" * 50)
-        log_message("LLM으로 결과 포장 중...")
-        log_message(f"입력 정보 - Stage: {final_stage}, Confidence: {final_confidence:.2%}")
+    return {
+        "stage": fused_result['stage'],
+        "confidence": fused_result['confidence'],
+        "analysis_type": "hair_loss_male",
+        # 가중치 정보 추가 (프론트 표시용)
+        "weights": {
+            "top": round(weights_info['top'] * 100, 1),      # % 단위
+            "side": round(weights_info['side'] * 100, 1),
+            "survey": round(weights_info['survey'] * 100, 1)
+        },
+        "survey_score": round(survey_score, 2),
+        # 설명 텍스트
+        "weight_explanation": {
+            "title": "분석 가중치 (의학 논문 기반)",
+            "description": "이 분석은 의학 연구를 바탕으로 정수리 사진, 측면 사진, 설문 데이터를 종합하여 진단합니다.",
+            "details": [
+                f"정수리 사진 (Top): {round(weights_info['top'] * 100, 1)}% - Hamilton-Norwood Scale의 핵심 지표",
+                f"측면 사진 (Side): {round(weights_info['side'] * 100, 1)}% - 전두부 후퇴 패턴 확인",
+                f"설문 조사: {round(weights_info['survey'] * 100, 1)}% - 유전적 요인 및 생활습관 반영"
+            ],
+            "references": [
+                "유전적 기여도 80% (NCBI 2024)",
+                "부계 유전 62.8%, 모계 8.6% (PLOS One 2024)",
+                "나이별 유병률: 20대(25%), 30대(30%), 40대(40%), 50대(50%)"
+            ]
+        }
+    }
 
-        llm_result = enhance_with_llm(final_stage, final_confidence, survey_data, has_side_image=bool(side_image_data))
+def generate_result_text(fused_result: Dict[str, Any], survey_data: Dict[str, Any] = None,
+                         has_side_image: bool = False, cache_key: tuple = None) -> Dict[str, Any]:
+    """
+    2단계: LLM으로 결과 포장 (캐시 적용)
+    Returns: {"title": str, "description": str, "advice": List[str]}
+    """
+    final_stage = fused_result['stage']
+    final_confidence = fused_result['confidence']
 
-        log_message(f"LLM 포장 결과:")
-        log_message(f"  - 제목: {llm_result['title']}")
-        log_message(f"  - 설명: {llm_result['description'][:50]}...")
-        log_message(f"  - 조언 개수: {len(llm_result['advice'])}")
-        for i, advice in enumerate(llm_result['advice'], 1):
-            log_message(f"    [{i}] {advice}")
-        log_message("=" * 50)
+    # LLM으로 결과 포장 (설문 데이터 포함)
+    log_message("=" * 50)
+    log_message("LLM으로 결과 포장 중...")
+    log_message(f"입력 정보 - Stage: {final_stage}, Confidence: {final_confidence:.2%}")
 
-        # advice 배열을 하나의 텍스트로 합치기 (구분자: 줄바꿈)
-        advice_text = "\n".join(llm_result['advice']) if isinstance(llm_result['advice'], list) else str(llm_result['advice'])
+    llm_result = _llm_cache.get(cache_key) if cache_key is not None else None
+    if llm_result is not None:
+        log_message("♻️ LLM 텍스트 캐시 적중 - Gemini 호출 생략")
+    else:
+        llm_result = enhance_with_llm(final_stage, final_confidence, survey_data, has_side_image=has_side_image)
+        # 기본 템플릿(LLM 실패)은 캐시하지 않음 → 다음 요청에서 다시 시도
+        if cache_key is not None and llm_result != generate_title_and_description_fallback(final_stage):
+            _llm_cache.set(cache_key, llm_result)
+
+    log_message(f"LLM 포장 결과:")
+    log_message(f"  - 제목: {llm_result['title']}")
+    log_message(f"  - 설명: {llm_result['description'][:50]}...")
+    log_message(f"  - 조언 개수: {len(llm_result['advice'])}")
+    for i, advice in enumerate(llm_result['advice'], 1):
+        log_message(f"    [{i}] {advice}")
+    log_message("=" * 50)
+    return llm_result
+
+def build_text_payload(llm_result: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM 포장 결과 → 응답의 텍스트 부분 (advice 배열은 줄바꿈으로 합침)"""
+    advice_text = "\n".join(llm_result['advice']) if isinstance(llm_result['advice'], list) else str(llm_result['advice'])
+    return {
+        "title": llm_result['title'],
+        "description": llm_result['description'],
+        "advice": advice_text
+    }
 
-        # 가중치 정보 구성 (프론트에 표시용)
-        weights_info = fused_result.get('weights', {'top': 1.0, 'side': 0.0, 'survey': 0.0})
-        survey_score = fused_result.get('survey_score', 0.0)
+def analyze_hair_with_swin(top_image_data: bytes, side_image_data: bytes = None,
+                          survey_data: Dict[str, Any] = None, batched: bool = None) -> Dict[str, Any]:
+    """
+    Swin 모델로 이미지 분석을 수행하고 표준 결과를 반환합니다.
+    같은 사진 + 설문 재제출 시 분류 결과와 LLM 텍스트를 캐시에서 재사용 (각각 별도 TTL)
+    Args:
+        top_image_data: Top view 이미지의 이진(bytes) 데이터
+        side_image_data: Side view 이미지의 이진(bytes) 데이터 (optional, 여성의 경우 None)
+        survey_data: 설문 데이터 (optional, 동적 가중치 계산에 사용)
+        batched: Top+Side 배치/동시 실행 여부 (None이면 SWIN_BATCHED_DUAL 환경변수 사용)
+    Returns: {"stage": int, "title": str, "description": str, "advice": List[str]}
+    """
+    try:
+        fused_result, cache_key = classify_hair_with_swin(top_image_data, side_image_data, survey_data, batched)
+        llm_result = generate_result_text(fused_result, survey_data, bool(side_image_data), cache_key)
 
+        classification = build_classification_payload(fused_result)
+        text = build_text_payload(llm_result)
         result = {
-            "stage": final_stage,
-            "title": llm_result['title'],
-            "description": llm_result['description'],
-            "advice": advice_text,
-            "confidence": final_confidence,
-            "analysis_type": "hair_loss_male",
-            # 가중치 정보 추가 (프론트 표시용)
-            "weights": {
-                "top": round(weights_info['top'] * 100, 1),      # % 단위
-                "side": round(weights_info['side'] * 100, 1),
-                "survey": round(weights_info['survey'] * 100, 1)
-            },
-            "survey_score": round(survey_score, 2),
-            # 설명 텍스트
-            "weight_explanation": {
-                "title": "분석 가중치 (의학 논문 기반)",
-                "description": "이 분석은 의학 연구를 바탕으로 정수리 사진, 측면 사진, 설문 데이터를 종합하여 진단합니다.",
-                "details": [
-                    f"정수리 사진 (Top): {round(weights_info['top'] * 100, 1)}% - Hamilton-Norwood Scale의 핵심 지표",
-                    f"측면 사진 (Side): {round(weights_info['side'] * 100, 1)}% - 전두부 후퇴 패턴 확인",
-                    f"설문 조사: {round(weights_info['survey'] * 100, 1)}% - 유전적 요인 및 생활습관 반영"
-                ],
-                "references": [
-                    "유전적 기여도 80% (NCBI 2024)",
-                    "부계 유전 62.8%, 모계 8.6% (PLOS One 2024)",
-                    "나이별 유병률: 20대(25%), 30대(30%), 40대(40%), 50대(50%)"
-                ]
-            }
+            "stage": classification['stage'],
+            "title": text['title'],
+            "description": text['description'],
+            "advice": text['advice'],
+            "confidence": classification['confidence'],
+            "analysis_type": classification['analysis_type'],
+            "weights": classification['weights'],
+            "survey_score": classification['survey_score'],
+            "weight_explanation": classification['weight_explanation']
         }
 
-        log_message(f"✅ 분석 완료: Stage {final_stage}, 신뢰도 {final_confidence:.2%}")
+        weights_info = fused_result.get('weights', {'top': 1.0, 'side': 0.0, 'survey': 0.0})
+        log_message(f"✅ 분석 완료: Stage {result['stage']}, 신뢰도 {result['confidence']:.2%}")
         log_message(f"   가중치 - Top: {weights_info['top']:.1%}, Side: {weights_info['side']:.1%}, Survey: {weights_info['survey']:.1%}")
         return result
 
@@ -0,0 +1,136 @@
+"""
+Swin / BiSeNet 동적 마이크로 배칭 스케줄러
+여러 요청에서 들어온 배치 1 입력을 잠시 모아 한 번의 배치 forward로 실행하고,
+결과를 각 요청의 Future로 돌려준다.
+"""
+
+import bisect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Any
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# 큐 대기 시간 히스토그램 구간 (ms)
+QUEUE_WAIT_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class _Histogram:
+    """고정 구간 히스토그램 (스레드 안전성은 호출 측 락으로 보장)"""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b}" for b in self.buckets] + ["+Inf"]
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else 0.0
+        }
+
+
+class MicroBatcher:
+    """
+    동적 마이크로 배칭 워커
+    - max_batch_size개가 모이거나, 첫 입력이 들어온 뒤 max_wait_ms가 지나면 배치 실행
+    - forward_fn은 [N, ...] 배치 텐서를 받아 첫 번째 차원이 N인 결과를 반환해야 함
+    """
+
+    def __init__(self, name: str, forward_fn: Callable[[torch.Tensor], torch.Tensor],
+                 max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        self.name = name
+        self.forward_fn = forward_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_size_hist = _Histogram(range(1, self.max_batch_size + 1))
+        self._queue_wait_hist = _Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self._batches = 0
+        self._errors = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: torch.Tensor) -> Future:
+        """배치 1 입력(배치 차원 없이)을 큐에 넣고 Future 반환"""
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> list:
+        """첫 입력을 기다린 뒤, 배치가 차거나 대기 시간이 끝날 때까지 입력 수집"""
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # 대기 시간이 끝났어도 이미 쌓여 있는 입력은 함께 처리
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+
+            with self._stats_lock:
+                self._batches += 1
+                self._batch_size_hist.observe(len(batch))
+                for _, _, enqueued in batch:
+                    self._queue_wait_hist.observe((started - enqueued) * 1000.0)
+
+            try:
+                inputs = torch.stack([item for item, _, _ in batch])
+                with torch.no_grad():
+                    outputs = self.forward_fn(inputs)
+                for i, (_, future, _) in enumerate(batch):
+                    future.set_result(outputs[i])
+            except Exception as e:
+                logger.error(f"[{self.name}] 배치 추론 실패 (batch={len(batch)}): {e}")
+                with self._stats_lock:
+                    self._errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """배치 크기 / 큐 대기 시간 히스토그램"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'errors': self._errors,
+                'batch_size': self._batch_size_hist.snapshot(),
+                'queue_wait_ms': self._queue_wait_hist.snapshot()
+            }
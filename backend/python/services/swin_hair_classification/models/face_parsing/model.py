@@ -90,9 +90,9 @@ class AttentionRefinementModule(nn.Module):
 
 
 class ContextPath(nn.Module):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, pretrained_backbone=True, *args, **kwargs):
         super(ContextPath, self).__init__()
-        self.resnet = Resnet18()
+        self.resnet = Resnet18(pretrained=pretrained_backbone)
         self.arm16 = AttentionRefinementModule(256, 128)
         self.arm32 = AttentionRefinementModule(512, 128)
         self.conv_head32 = ConvBNReLU(128, 128, ks=3, stride=1, padding=1)
@@ -102,24 +102,24 @@ class ContextPath(nn.Module):
         self.init_weight()
 
     def forward(self, x):
-        H0, W0 = x.size()[2:]
+        # sizes are kept as size objects (no tuple unpacking) so the graph stays FX-traceable
         feat8, feat16, feat32 = self.resnet(x)
-        H8, W8 = feat8.size()[2:]
-        H16, W16 = feat16.size()[2:]
-        H32, W32 = feat32.size()[2:]
+        size8 = feat8.size()[2:]
+        size16 = feat16.size()[2:]
+        size32 = feat32.size()[2:]
 
-        avg = F.avg_pool2d(feat32, feat32.size()[2:])
+        avg = F.avg_pool2d(feat32, size32)
         avg = self.conv_avg(avg)
-        avg_up = F.interpolate(avg, (H32, W32), mode='nearest')
+        avg_up = F.interpolate(avg, size32, mode='nearest')
 
         feat32_arm = self.arm32(feat32)
         feat32_sum = feat32_arm + avg_up
-        feat32_up = F.interpolate(feat32_sum, (H16, W16), mode='nearest')
+        feat32_up = F.interpolate(feat32_sum, size16, mode='nearest')
         feat32_up = self.conv_head32(feat32_up)
 
         feat16_arm = self.arm16(feat16)
         feat16_sum = feat16_arm + feat32_up
-        feat16_up = F.interpolate(feat16_sum, (H8, W8), mode='nearest')
+        feat16_up = F.interpolate(feat16_sum, size8, mode='nearest')
         feat16_up = self.conv_head16(feat16_up)
 
         return feat8, feat16_up, feat32_up  # x8, x8, x16
@@ -228,9 +228,11 @@ class FeatureFusionModule(nn.Module):
 
 
 class BiSeNet(nn.Module):
-    def __init__(self, n_classes, *args, **kwargs):
+    def __init__(self, n_classes, pretrained_backbone=True, *args, **kwargs):
+        # pretrained_backbone=False: no ImageNet download for the ResNet18 backbone
+        # (offline construction when the full 79999_iter checkpoint is loaded right after)
         super(BiSeNet, self).__init__()
-        self.cp = ContextPath()
+        self.cp = ContextPath(pretrained_backbone=pretrained_backbone)
         ## here self.sp is deleted
         self.ffm = FeatureFusionModule(256, 256)
         self.conv_out = BiSeNetOutput(256, 256, n_classes)
@@ -239,7 +241,7 @@ class BiSeNet(nn.Module):
         self.init_weight()
 
     def forward(self, x):
-        H, W = x.size()[2:]
+        size = x.size()[2:]
         feat_res8, feat_cp8, feat_cp16 = self.cp(x)  # here return res3b1 feature
         feat_sp = feat_res8  # use res3b1 feature to replace spatial path feature
         feat_fuse = self.ffm(feat_sp, feat_cp8)
@@ -248,11 +250,31 @@ class BiSeNet(nn.Module):
         feat_out16 = self.conv_out16(feat_cp8)
         feat_out32 = self.conv_out32(feat_cp16)
 
-        feat_out = F.interpolate(feat_out, (H, W), mode='bilinear', align_corners=True)
-        feat_out16 = F.interpolate(feat_out16, (H, W), mode='bilinear', align_corners=True)
-        feat_out32 = F.interpolate(feat_out32, (H, W), mode='bilinear', align_corners=True)
+        feat_out = F.interpolate(feat_out, size, mode='bilinear', align_corners=True)
+        feat_out16 = F.interpolate(feat_out16, size, mode='bilinear', align_corners=True)
+        feat_out32 = F.interpolate(feat_out32, size, mode='bilinear', align_corners=True)
         return feat_out, feat_out16, feat_out32
 
+    def forward_main(self, x):
+        """inference only: main head at 1/8 resolution, auxiliary heads (conv_out16/32) are skipped"""
+        feat_res8, feat_cp8, _ = self.cp(x)
+        feat_fuse = self.ffm(feat_res8, feat_cp8)
+        return self.conv_out(feat_fuse)
+
+    def parse(self, x, fast=False):
+        """
+        inference only: per-pixel class map [N, H, W]
+        fast=False -> bilinear upsample of the main logits + argmax (same result as argmax(forward(x)[0]))
+        fast=True  -> argmax at 1/8 resolution + nearest upsample (no 19-channel full-size upsample)
+        """
+        size = x.size()[2:]
+        logits = self.forward_main(x)
+        if fast:
+            parsing = torch.argmax(logits, dim=1, keepdim=True).float()
+            return F.interpolate(parsing, size, mode='nearest').squeeze(1).long()
+        logits = F.interpolate(logits, size, mode='bilinear', align_corners=True)
+        return torch.argmax(logits, dim=1)
+
     def init_weight(self):
         for ly in self.children():
             if isinstance(ly, nn.Conv2d):
@@ -272,6 +294,17 @@ class BiSeNet(nn.Module):
         return wd_params, nowd_params, lr_mul_wd_params, lr_mul_nowd_params
 
 
+def parse_face(model, x, fast=False):
+    """
+    class map [N, H, W] for any face parsing backend
+    BiSeNet uses the inference-only head; wrappers without parse() (ONNX, INT8 TorchScript)
+    fall back to argmax over the main output
+    """
+    if hasattr(model, 'parse'):
+        return model.parse(x, fast=fast)
+    return torch.argmax(model(x)[0], dim=1)
+
+
 if __name__ == "__main__":
     net = BiSeNet(19)
     net.cuda()
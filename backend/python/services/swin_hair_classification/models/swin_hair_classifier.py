@@ -120,9 +120,10 @@ def window_reverse(windows, window_size, H, W):
     Returns:
         x: 복원된 이미지 (배치, 높이, 너비, 채널)
     """
-    B = int(windows.shape[0] / (H * W / window_size / window_size))
-    x = windows.view(B, H // window_size, W // window_size, window_size, window_size, -1)
-    x = x.permute(0, 1, 3, 2, 4, 5).contiguous().view(B, H, W, -1)
+    # 배치 크기는 -1로 추론 (ONNX 내보내기 시 배치 차원이 상수로 고정되지 않도록)
+    C = windows.shape[-1]
+    x = windows.view(-1, H // window_size, W // window_size, window_size, window_size, C)
+    x = x.permute(0, 1, 3, 2, 4, 5).contiguous().view(-1, H, W, C)
     return x
 
 
@@ -195,6 +196,30 @@ class WindowAttention(nn.Module):
         trunc_normal_(self.relative_position_bias_table, std=.02)
         self.softmax = nn.Softmax(dim=-1)
 
+        # 추론 전용 모드 (freeze_for_inference 호출 시 활성화)
+        self.frozen = False
+
+    def _relative_position_bias(self):
+        """Relative Position Bias 테이블에서 (heads, 49, 49) bias 텐서 생성"""
+        N = self.window_size[0] * self.window_size[1]
+        relative_position_bias = self.relative_position_bias_table[
+            self.relative_position_index.view(-1)].view(N, N, -1)
+        return relative_position_bias.permute(2, 0, 1).contiguous()
+
+    def freeze_for_inference(self):
+        """
+        ❄️ 추론 전용 모드로 전환
+
+        - Relative Position Bias를 미리 계산해서 캐시 (매 forward마다 gather/permute 생략)
+        - Attention을 F.scaled_dot_product_attention으로 계산 (fused kernel)
+
+        ⚠️ 이후 relative_position_bias_table이 바뀌면 다시 호출해야 함
+        """
+        with torch.no_grad():
+            bias = self._relative_position_bias()
+        self.register_buffer("cached_relative_position_bias", bias, persistent=False)
+        self.frozen = True
+
     def forward(self, x, mask=None):
         """
         🔄 Window Attention 순전파
@@ -219,16 +244,16 @@ class WindowAttention(nn.Module):
         qkv = self.qkv(x).reshape(B_, N, 3, self.num_heads, C // self.num_heads).permute(2, 0, 3, 1, 4)
         q, k, v = qkv[0], qkv[1], qkv[2]
 
+        # 추론 전용 모드: 캐시된 bias + fused SDPA
+        if self.frozen:
+            return self._forward_frozen(q, k, v, mask)
+
         # Scaled Dot-Product Attention
         q = q * self.scale
         attn = (q @ k.transpose(-2, -1))  # (B_, heads, N, N)
 
         # Relative Position Bias 추가 (Swin의 핵심!)
-        relative_position_bias = self.relative_position_bias_table[
-            self.relative_position_index.view(-1)].view(
-            self.window_size[0] * self.window_size[1],
-            self.window_size[0] * self.window_size[1], -1)
-        relative_position_bias = relative_position_bias.permute(2, 0, 1).contiguous()
+        relative_position_bias = self._relative_position_bias()
         attn = attn + relative_position_bias.unsqueeze(0)
 
         # Shifted Window Masking (필요시)
@@ -248,6 +273,31 @@ class WindowAttention(nn.Module):
         x = self.proj_drop(x)
         return x
 
+    def _forward_frozen(self, q, k, v, mask=None):
+        """
+        추론 전용 Attention (forward와 수치적으로 동일)
+        softmax(q·kᵀ·scale + bias [+ mask]) · v 를 SDPA 한 번으로 계산
+        """
+        B_, num_heads, N, head_dim = q.shape
+        bias = self.cached_relative_position_bias  # (heads, N, N)
+
+        if mask is not None:
+            # (B_/nW, nW, heads, N, d) 형태로 맞춰 윈도우별 마스크를 브로드캐스트
+            nW = mask.shape[0]
+            attn_mask = bias.unsqueeze(0) + mask.unsqueeze(1)  # (nW, heads, N, N)
+            q = q.view(B_ // nW, nW, num_heads, N, head_dim)
+            k = k.view(B_ // nW, nW, num_heads, N, head_dim)
+            v = v.view(B_ // nW, nW, num_heads, N, head_dim)
+            x = F.scaled_dot_product_attention(q, k, v, attn_mask=attn_mask, scale=self.scale)
+            x = x.view(B_, num_heads, N, head_dim)
+        else:
+            x = F.scaled_dot_product_attention(q, k, v, attn_mask=bias, scale=self.scale)
+
+        x = x.transpose(1, 2).reshape(B_, N, num_heads * head_dim)
+        x = self.proj(x)
+        x = self.proj_drop(x)
+        return x
+
 
 # ============================================================================
 # 🏗️ Transformer 블록
@@ -555,6 +605,32 @@ class PatchEmbed(nn.Module):
         else:
             self.norm = None
 
+        # 마스크 채널 접기 여부 (fold_repeated_mask_channels 호출 시 활성화)
+        self.mask_folded = False
+
+    def fold_repeated_mask_channels(self):
+        """
+        🗜️ 반복된 마스크 채널을 하나로 접기 (추론 전용)
+
+        입력 채널 3~5는 같은 헤어 마스크가 3번 반복된 것이므로
+        W[:, 3] * m + W[:, 4] * m + W[:, 5] * m = (W[:, 3] + W[:, 4] + W[:, 5]) * m
+        → 6채널 projection을 4채널(RGB + 마스크 1채널) projection으로 변환
+
+        ⚠️ 접은 뒤에는 6채널 체크포인트를 load_state_dict로 다시 불러올 수 없음
+        """
+        if self.mask_folded or self.in_chans != 6:
+            return
+
+        weight = self.proj.weight.data  # (embed_dim, 6, p, p)
+        folded = nn.Conv2d(4, self.embed_dim, kernel_size=self.patch_size, stride=self.patch_size,
+                           bias=self.proj.bias is not None).to(device=weight.device, dtype=weight.dtype)
+        folded.weight.data.copy_(torch.cat([weight[:, :3], weight[:, 3:].sum(dim=1, keepdim=True)], dim=1))
+        if self.proj.bias is not None:
+            folded.bias.data.copy_(self.proj.bias.data)
+
+        self.proj = folded
+        self.mask_folded = True
+
     def forward(self, x):
         """
         이미지를 패치 임베딩으로 변환
@@ -562,9 +638,14 @@ class PatchEmbed(nn.Module):
         변환 과정:
             (B, 6, 224, 224) → Conv2d → (B, 96, 56, 56)
             → Flatten → (B, 3136, 96)
+
+        마스크 채널을 접은 경우 4채널 입력을 받고, 6채널 입력은 앞 4채널만 사용
         """
         B, C, H, W = x.shape
 
+        if self.mask_folded and C == 6:
+            x = x[:, :4]
+
         x = self.proj(x).flatten(2).transpose(1, 2)
         if self.norm is not None:
             x = self.norm(x)
@@ -704,6 +785,23 @@ class SwinHairClassifier(nn.Module):
             nn.init.constant_(m.bias, 0)
             nn.init.constant_(m.weight, 1.0)
 
+    def freeze_for_inference(self):
+        """
+        ❄️ 추론 최적화 모드 (학습 불가, 출력은 기존 모델과 수치적으로 동일)
+
+        1. 블록별 Relative Position Bias 사전 계산 + 캐시
+        2. Attention을 F.scaled_dot_product_attention으로 계산
+        3. 반복 마스크 채널을 접어 PatchEmbed를 4채널 projection으로 변환
+
+        체크포인트를 모두 불러온 뒤에 호출해야 함
+        """
+        self.eval()
+        self.patch_embed.fold_repeated_mask_channels()
+        for module in self.modules():
+            if isinstance(module, WindowAttention):
+                module.freeze_for_inference()
+        return self
+
     @torch.jit.ignore
     def no_weight_decay(self):
         return {'absolute_pos_embed'}
@@ -0,0 +1,134 @@
+"""
+Swin / BiSeNet ONNX Runtime 추론 백엔드
+- PyTorch 체크포인트를 ONNX로 내보내는 경로 (export_*)
+- ONNX Runtime CPU Execution Provider로 서빙하는 래퍼 (OnnxSwinModel, OnnxBiSeNet)
+
+래퍼는 기존 PyTorch 모델과 같은 호출 규약을 따르므로 hair_swin_check의 전처리/후처리 코드를 그대로 사용한다.
+    - OnnxSwinModel(x) → 로짓 텐서 [N, 4]
+    - OnnxBiSeNet(x)[0] → 19클래스 파싱 로짓 [N, 19, H, W]
+
+내보내기:
+    cd backend/python
+    python -m services.swin_hair_classification.onnx_backend
+"""
+
+import os
+from typing import Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from services.swin_hair_classification.models.swin_hair_classifier import SwinHairClassifier
+from services.swin_hair_classification.models.face_parsing.model import BiSeNet
+
+MODELS_DIR = 'services/swin_hair_classification/models'
+ONNX_PATHS = {
+    'top': f'{MODELS_DIR}/best_swin_hair_classifier_top.onnx',
+    'side': f'{MODELS_DIR}/best_swin_hair_classifier_side.onnx',
+    'face_parsing': f'{MODELS_DIR}/face_parsing/res/cp/79999_iter.onnx'
+}
+ONNX_OPSET = 17
+
+
+def export_swin_to_onnx(model: SwinHairClassifier, output_path: str):
+    """Swin 분류 모델을 ONNX로 내보내기 (입력 [N, 6, 224, 224], 배치 차원 동적)"""
+    model.eval()
+    dummy = torch.randn(1, 6, 224, 224, device=next(model.parameters()).device)
+    torch.onnx.export(
+        model, dummy, output_path,
+        input_names=['input'], output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=ONNX_OPSET, do_constant_folding=True
+    )
+
+
+class _BiSeNetMainOutput(nn.Module):
+    """메인 출력만 반환하는 BiSeNet 래퍼 (보조 헤드는 내보내기 시 그래프에서 제거됨)"""
+
+    def __init__(self, model: BiSeNet):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x)[0]
+
+
+def export_bisenet_to_onnx(model: BiSeNet, output_path: str):
+    """BiSeNet을 ONNX로 내보내기 (입력 [N, 3, 512, 512], 메인 출력만 사용, 배치 차원 동적)"""
+    model.eval()
+    dummy = torch.randn(1, 3, 512, 512, device=next(model.parameters()).device)
+    torch.onnx.export(
+        _BiSeNetMainOutput(model).eval(), dummy, output_path,
+        input_names=['input'], output_names=['out'],
+        dynamic_axes={'input': {0: 'batch'}, 'out': {0: 'batch'}},
+        opset_version=ONNX_OPSET, do_constant_folding=True
+    )
+
+
+def _create_session(onnx_path: str, num_threads: int = None):
+    """ONNX Runtime 세션 생성 (CPU Execution Provider, 그래프 최적화 전체 적용)"""
+    import onnxruntime as ort
+
+    if not os.path.exists(onnx_path):
+        raise FileNotFoundError(f"ONNX 모델 파일을 찾을 수 없습니다: {onnx_path}")
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+class OnnxSwinModel:
+    """ONNX Runtime 기반 Swin 분류 모델 (PyTorch 모델과 같은 호출 방식)"""
+
+    def __init__(self, onnx_path: str, num_threads: int = None):
+        self.onnx_path = onnx_path
+        self.session = _create_session(onnx_path, num_threads)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        logits = self.session.run(['logits'], {self.input_name: inputs})[0]
+        return torch.from_numpy(logits)
+
+    def eval(self):
+        return self
+
+
+class OnnxBiSeNet:
+    """ONNX Runtime 기반 BiSeNet (메인 출력만 계산, 보조 출력은 None)"""
+
+    def __init__(self, onnx_path: str, num_threads: int = None):
+        self.onnx_path = onnx_path
+        self.session = _create_session(onnx_path, num_threads)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> Tuple[torch.Tensor, None, None]:
+        inputs = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        out = self.session.run(['out'], {self.input_name: inputs})[0]
+        return torch.from_numpy(out), None, None
+
+    def eval(self):
+        return self
+
+
+def export_all(device: torch.device = torch.device('cpu')):
+    """Top/Side Swin과 BiSeNet 체크포인트를 모두 ONNX로 내보내기"""
+    from services.swin_hair_classification.hair_swin_check import (
+        load_swin_model, load_face_parsing_model, log_message
+    )
+
+    for view in ('top', 'side'):
+        model = load_swin_model(f'{MODELS_DIR}/best_swin_hair_classifier_{view}.pth', device)
+        export_swin_to_onnx(model, ONNX_PATHS[view])
+        log_message(f"ONNX 내보내기 완료: {ONNX_PATHS[view]}")
+
+    face_parsing_model = load_face_parsing_model(device)
+    export_bisenet_to_onnx(face_parsing_model, ONNX_PATHS['face_parsing'])
+    log_message(f"ONNX 내보내기 완료: {ONNX_PATHS['face_parsing']}")
+
+
+if __name__ == "__main__":
+    export_all()
@@ -0,0 +1,211 @@
+"""
+Swin / BiSeNet INT8 양자화 CPU 추론 모드
+- Swin: WindowAttention / Mlp의 Linear 레이어를 동적 INT8로 양자화 (캘리브레이션 불필요)
+- BiSeNet: FX 그래프 모드 정적 INT8 (캘리브레이션 이미지로 activation 범위 수집, QAT 없음)
+- 캘리브레이션 + fp32 대비 정확도 리포트 (단계 일치율, 신뢰도 차이, 헤어 마스크 IoU)
+
+사용법 (backend/python 디렉토리에서):
+    python -m services.swin_hair_classification.quantization \
+        --calib_dir <캘리브레이션 이미지 폴더> --eval_dir <평가 이미지 폴더>
+
+평가 폴더에 top/, side/ 하위 폴더가 있으면 각각 Top/Side 모델로 평가하고, 없으면 Top 모델로 평가한다.
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from services.swin_hair_classification.models.swin_hair_classifier import SwinHairClassifier, WindowAttention, Mlp
+from services.swin_hair_classification.models.face_parsing.model import BiSeNet
+
+MODELS_DIR = 'services/swin_hair_classification/models'
+BISENET_INT8_PATH = f'{MODELS_DIR}/face_parsing/res/cp/79999_iter_int8.pt'
+REPORT_PATH = f'{MODELS_DIR}/quantization_report.json'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def quantize_swin_dynamic(model: SwinHairClassifier) -> nn.Module:
+    """WindowAttention / Mlp 내부 Linear 레이어만 동적 INT8로 양자화"""
+    from torch.ao.quantization import quantize_dynamic, default_dynamic_qconfig
+
+    qconfig_spec = {}
+    for name, module in model.named_modules():
+        if isinstance(module, (WindowAttention, Mlp)):
+            for child_name, child in module.named_children():
+                if isinstance(child, nn.Linear):
+                    qconfig_spec[f"{name}.{child_name}"] = default_dynamic_qconfig
+
+    return quantize_dynamic(model.cpu().eval(), qconfig_spec=qconfig_spec, dtype=torch.qint8)
+
+
+def quantize_bisenet_static(model: BiSeNet, calibration_inputs: List[torch.Tensor]) -> torch.jit.ScriptModule:
+    """
+    BiSeNet 정적 INT8 양자화 (FX 그래프 모드, fbgemm)
+    calibration_inputs: 정규화된 [3, 512, 512] 텐서 리스트
+    Returns: TorchScript로 고정된 INT8 모델
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    torch.backends.quantized.engine = 'fbgemm'
+    model = model.cpu().eval()
+    example_inputs = (torch.zeros(1, 3, 512, 512),)
+
+    prepared = prepare_fx(model, get_default_qconfig_mapping('fbgemm'), example_inputs)
+    with torch.no_grad():
+        for input_tensor in calibration_inputs:
+            prepared(input_tensor.unsqueeze(0))
+
+    quantized = convert_fx(prepared)
+    return torch.jit.freeze(torch.jit.trace(quantized, example_inputs).eval())
+
+
+def load_quantized_bisenet(path: str = BISENET_INT8_PATH) -> torch.jit.ScriptModule:
+    """캘리브레이션된 INT8 BiSeNet 로드"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"INT8 BiSeNet 모델을 찾을 수 없습니다: {path} (quantization 캘리브레이션 먼저 실행)")
+    torch.backends.quantized.engine = 'fbgemm'
+    return torch.jit.load(path, map_location='cpu').eval()
+
+
+def model_size_mb(model: nn.Module) -> float:
+    """state_dict 직렬화 크기 (MB)"""
+    import io
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / (1024 * 1024)
+
+
+def _list_images(folder: Path) -> List[Path]:
+    return sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def _mask_iou(mask_a: np.ndarray, mask_b: np.ndarray) -> float:
+    union = np.logical_or(mask_a, mask_b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(mask_a, mask_b).sum() / union)
+
+
+def evaluate(eval_dir: Path, fp32_models: Dict[str, nn.Module], int8_models: Dict[str, nn.Module]) -> Dict[str, Any]:
+    """fp32 vs INT8 단계 예측 / 신뢰도 / 헤어 마스크 IoU / 지연 시간 비교"""
+    from services.swin_hair_classification.hair_swin_check import (
+        ImagePreprocessContext, preprocess_image_with_mask, predict_swin
+    )
+
+    device = torch.device('cpu')
+    views = [v for v in ('top', 'side') if (eval_dir / v).is_dir()] or ['top']
+    per_image = []
+    timings = {'fp32': 0.0, 'int8': 0.0}
+
+    for view in views:
+        folder = eval_dir / view if (eval_dir / view).is_dir() else eval_dir
+        for image_path in _list_images(folder):
+            image_bytes = image_path.read_bytes()
+            row = {'image': str(image_path), 'view': view}
+
+            for precision, models in (('fp32', fp32_models), ('int8', int8_models)):
+                started = time.perf_counter()
+                context = ImagePreprocessContext(image_bytes, models['face_parsing'], device)
+                hair_mask = context.hair_mask()
+                swin_input = preprocess_image_with_mask(image_bytes, hair_mask, context=context)
+                result = predict_swin(models[view], swin_input, device)
+                timings[precision] += time.perf_counter() - started
+
+                row[f'{precision}_level'] = result['level']
+                row[f'{precision}_confidence'] = round(result['confidence'], 4)
+                row[f'{precision}_mask'] = hair_mask > 0
+
+            row['stage_match'] = row['fp32_level'] == row['int8_level']
+            row['confidence_diff'] = round(abs(row['fp32_confidence'] - row['int8_confidence']), 4)
+            row['hair_mask_iou'] = round(_mask_iou(row.pop('fp32_mask'), row.pop('int8_mask')), 4)
+            per_image.append(row)
+
+    count = len(per_image)
+    if count == 0:
+        raise ValueError(f"평가 이미지가 없습니다: {eval_dir}")
+
+    return {
+        'num_images': count,
+        'stage_agreement': round(sum(r['stage_match'] for r in per_image) / count, 4),
+        'confidence_diff_mean': round(float(np.mean([r['confidence_diff'] for r in per_image])), 4),
+        'confidence_diff_max': round(float(np.max([r['confidence_diff'] for r in per_image])), 4),
+        'hair_mask_iou_mean': round(float(np.mean([r['hair_mask_iou'] for r in per_image])), 4),
+        'hair_mask_iou_min': round(float(np.min([r['hair_mask_iou'] for r in per_image])), 4),
+        'latency_ms_per_image': {k: round(v / count * 1000, 1) for k, v in timings.items()},
+        'per_image': per_image
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Swin/BiSeNet INT8 캘리브레이션 및 정확도 리포트")
+    parser.add_argument("--calib_dir", required=True, help="BiSeNet 캘리브레이션 이미지 폴더")
+    parser.add_argument("--eval_dir", required=True, help="평가 이미지 폴더 (top/, side/ 하위 폴더 선택)")
+    parser.add_argument("--max_calib_images", type=int, default=100, help="캘리브레이션에 사용할 최대 이미지 수")
+    parser.add_argument("--min_agreement", type=float, default=0.95, help="허용 가능한 최소 단계 일치율")
+    parser.add_argument("--output", default=REPORT_PATH, help="리포트 출력 경로 (JSON)")
+    args = parser.parse_args()
+
+    from services.swin_hair_classification.hair_swin_check import (
+        ImagePreprocessContext, load_swin_model, load_face_parsing_model, log_message
+    )
+
+    device = torch.device('cpu')
+    fp32_models = {
+        'top': load_swin_model(f'{MODELS_DIR}/best_swin_hair_classifier_top.pth', device),
+        'side': load_swin_model(f'{MODELS_DIR}/best_swin_hair_classifier_side.pth', device),
+        'face_parsing': load_face_parsing_model(device)
+    }
+
+    # 1. BiSeNet 캘리브레이션 (정적 INT8)
+    calib_paths = _list_images(Path(args.calib_dir))[:args.max_calib_images]
+    log_message(f"BiSeNet 캘리브레이션: {len(calib_paths)}장")
+    calibration_inputs = [
+        ImagePreprocessContext(p.read_bytes(), None, device).bisenet_input() for p in calib_paths
+    ]
+    # prepare_fx는 원본 모델을 변경하므로 새로 로드한 모델로 양자화
+    int8_bisenet = quantize_bisenet_static(load_face_parsing_model(device), calibration_inputs)
+    torch.jit.save(int8_bisenet, BISENET_INT8_PATH)
+    log_message(f"INT8 BiSeNet 저장 완료: {BISENET_INT8_PATH}")
+
+    # 2. Swin 동적 INT8 (원본 fp32 모델은 보존)
+    int8_models = {
+        'top': quantize_swin_dynamic(load_swin_model(f'{MODELS_DIR}/best_swin_hair_classifier_top.pth', device)),
+        'side': quantize_swin_dynamic(load_swin_model(f'{MODELS_DIR}/best_swin_hair_classifier_side.pth', device)),
+        'face_parsing': int8_bisenet
+    }
+
+    # 3. 정확도 리포트
+    report = evaluate(Path(args.eval_dir), fp32_models, int8_models)
+    report['model_size_mb'] = {
+        name: {'fp32': round(model_size_mb(fp32_models[name]), 1), 'int8': round(model_size_mb(int8_models[name]), 1)}
+        for name in ('top', 'side', 'face_parsing')
+    }
+    report['min_agreement'] = args.min_agreement
+    report['acceptable'] = report['stage_agreement'] >= args.min_agreement
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    log_message(f"단계 일치율: {report['stage_agreement']:.2%} (기준 {args.min_agreement:.0%}) → "
+                f"{'허용' if report['acceptable'] else '불허'}")
+    log_message(f"신뢰도 차이 평균/최대: {report['confidence_diff_mean']} / {report['confidence_diff_max']}")
+    log_message(f"헤어 마스크 IoU 평균/최소: {report['hair_mask_iou_mean']} / {report['hair_mask_iou_min']}")
+    log_message(f"지연 시간 (ms/장): {report['latency_ms_per_image']}")
+    log_message(f"리포트 저장: {args.output}")
+    return 0 if report['acceptable'] else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,125 @@
+"""
+Swin 탈모 분석 결과 캐시
+- 같은 Top/Side 사진을 다시 제출하면 BiSeNet / Swin / Gemini를 다시 돌리지 않도록 결과를 재사용
+- LRU + TTL, 전체 크기 상한(MB) 기준으로 오래된 항목부터 제거
+- 캐시 키: 이미지 바이트 해시 + 정규화된 설문 값
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def hash_image_bytes(image_bytes: Optional[bytes]) -> str:
+    """이미지 바이트 내용 해시 (이미지 없음은 빈 문자열)"""
+    if not image_bytes:
+        return ""
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+def normalize_survey(survey_data: Optional[Dict[str, Any]]) -> tuple:
+    """설문 값 정규화 (키 정렬, 공백/대소문자 무시, 빈 값 제외) → 해시 가능한 튜플"""
+    if not survey_data:
+        return ()
+    normalized = []
+    for key in sorted(survey_data):
+        value = survey_data[key]
+        if value is None or value == "":
+            continue
+        normalized.append((key, str(value).strip().lower()))
+    return tuple(normalized)
+
+
+def _estimate_size(value: Any) -> int:
+    """캐시 항목 크기 추정 (JSON 직렬화 바이트 수)"""
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+class TTLLRUCache:
+    """
+    크기 상한(MB) + TTL을 가진 스레드 안전 LRU 캐시
+    get은 저장된 값의 복사본을 반환하므로 호출 측에서 수정해도 캐시에 영향 없음
+    """
+
+    def __init__(self, name: str, max_mb: float, ttl_seconds: float):
+        self.name = name
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()  # key → (value, size_bytes, expires_at)
+        self._lock = threading.Lock()
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._expired += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return copy.deepcopy(value)
+
+    def contains(self, key: Hashable) -> bool:
+        """만료되지 않은 항목이 있는지 확인 (통계/LRU 순서에 영향 없음)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[2] > time.monotonic()
+
+    def set(self, key: Hashable, value: Any):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (copy.deepcopy(value), size, time.monotonic() + self.ttl_seconds)
+            self._size_bytes += size
+
+            # 크기 상한을 넘으면 가장 오래 사용되지 않은 항목부터 제거
+            while self._size_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._size_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """적중/실패 수, 적중률, 항목 수, 사용 크기"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'size_mb': round(self._size_bytes / (1024 * 1024), 3),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 3),
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'expired': self._expired,
+                'evictions': self._evictions
+            }
@@ -0,0 +1 @@
+# ONNX/모델 정합성 테스트 패키지
@@ -0,0 +1,66 @@
+"""
+Swin freeze_for_inference 정합성 테스트
+무작위 초기화 모델과 추론 최적화 모델(bias 캐시 + SDPA + 마스크 채널 접기)의 로짓 비교
+(backend/python 디렉토리에서 실행, 체크포인트 불필요)
+"""
+import copy
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("timm")
+
+from services.swin_hair_classification.models.swin_hair_classifier import SwinHairClassifier, WindowAttention
+
+ATOL = 1e-4
+
+
+@pytest.fixture(scope="module")
+def models():
+    torch.manual_seed(0)
+    baseline = SwinHairClassifier(num_classes=4, in_chans=6).eval()
+    # 기본 초기화(std 0.02)보다 큰 bias를 넣어 캐시된 Relative Position Bias 경로가 결과에 드러나게 함
+    with torch.no_grad():
+        for module in baseline.modules():
+            if isinstance(module, WindowAttention):
+                module.relative_position_bias_table.normal_(std=1.0)
+    frozen = copy.deepcopy(baseline).freeze_for_inference()
+    return baseline, frozen
+
+
+def _inputs(batch_size: int) -> torch.Tensor:
+    """RGB + 같은 헤어 마스크를 3번 반복한 6채널 입력 (실제 전처리와 같은 구조)"""
+    generator = torch.Generator().manual_seed(batch_size)
+    rgb = torch.randn(batch_size, 3, 224, 224, generator=generator)
+    mask = (torch.rand(batch_size, 1, 224, 224, generator=generator) > 0.5).float()
+    return torch.cat([rgb, mask.repeat(1, 3, 1, 1)], dim=1)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_frozen_logits_match_baseline(models, batch_size):
+    baseline, frozen = models
+    inputs = _inputs(batch_size)
+    with torch.no_grad():
+        expected = baseline(inputs)
+        actual = frozen(inputs)
+    assert actual.shape == expected.shape == (batch_size, 4)
+    assert torch.allclose(actual, expected, atol=ATOL), (actual - expected).abs().max().item()
+
+
+def test_frozen_accepts_folded_four_channel_input(models):
+    """마스크 채널을 접은 뒤에는 RGB + 마스크 1채널 입력도 같은 로짓"""
+    baseline, frozen = models
+    inputs = _inputs(2)
+    assert frozen.patch_embed.mask_folded
+    with torch.no_grad():
+        expected = baseline(inputs)
+        actual = frozen(inputs[:, :4])
+    assert torch.allclose(actual, expected, atol=ATOL), (actual - expected).abs().max().item()
+
+
+def test_freeze_caches_relative_position_bias(models):
+    _, frozen = models
+    attentions = [m for m in frozen.modules() if isinstance(m, WindowAttention)]
+    assert attentions and all(m.frozen for m in attentions)
+    for module in attentions:
+        assert torch.equal(module.cached_relative_position_bias, module._relative_position_bias())
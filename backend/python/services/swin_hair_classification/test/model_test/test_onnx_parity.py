@@ -0,0 +1,95 @@
+"""
+ONNX Runtime 백엔드 정합성 테스트
+PyTorch 모델과 ONNX Runtime 모델의 Swin 로짓 / BiSeNet argmax 마스크를 고정 이미지 세트로 비교
+(backend/python 디렉토리에서 실행, 모델 체크포인트가 없으면 SKIP)
+"""
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+
+import numpy as np
+from PIL import Image
+
+from services.swin_hair_classification.hair_swin_check import (
+    ImagePreprocessContext, load_swin_model, load_face_parsing_model, preprocess_image_with_mask
+)
+from services.swin_hair_classification.onnx_backend import (
+    OnnxSwinModel, OnnxBiSeNet, export_swin_to_onnx, export_bisenet_to_onnx
+)
+
+MODELS_DIR = 'services/swin_hair_classification/models'
+TOP_MODEL_PATH = f'{MODELS_DIR}/best_swin_hair_classifier_top.pth'
+FACE_PARSING_PATH = f'{MODELS_DIR}/face_parsing/res/cp/79999_iter.pth'
+TEST_DATA_DIR = Path(__file__).parent.parent / "api_test" / "test_data"
+
+pytestmark = pytest.mark.skipif(
+    not (os.path.exists(TOP_MODEL_PATH) and os.path.exists(FACE_PARSING_PATH)),
+    reason="모델 체크포인트가 없습니다."
+)
+
+DEVICE = torch.device('cpu')
+
+
+def _fixed_image_set():
+    """테스트 이미지 (test_data의 jpg + 시드 고정 합성 이미지)"""
+    images = [p.read_bytes() for p in sorted(TEST_DATA_DIR.glob("*.jpg"))]
+    rng = np.random.default_rng(0)
+    for size in [(480, 640), (512, 512), (1024, 768)]:
+        pixels = rng.integers(0, 256, size=(*size, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    tmp_dir = tmp_path_factory.mktemp("onnx")
+    swin = load_swin_model(TOP_MODEL_PATH, DEVICE)
+    bisenet = load_face_parsing_model(DEVICE)
+
+    swin_path = str(tmp_dir / "swin_top.onnx")
+    bisenet_path = str(tmp_dir / "bisenet.onnx")
+    export_swin_to_onnx(swin, swin_path)
+    export_bisenet_to_onnx(bisenet, bisenet_path)
+
+    return swin, bisenet, OnnxSwinModel(swin_path), OnnxBiSeNet(bisenet_path)
+
+
+def test_bisenet_mask_parity(models):
+    """BiSeNet argmax 마스크 일치율 (경계 픽셀의 동률 차이만 허용)"""
+    _, bisenet, _, onnx_bisenet = models
+    for image_bytes in _fixed_image_set():
+        input_tensor = ImagePreprocessContext(image_bytes, bisenet, DEVICE).bisenet_input().unsqueeze(0)
+        with torch.no_grad():
+            torch_mask = torch.argmax(bisenet(input_tensor)[0], dim=1).numpy()
+        onnx_mask = torch.argmax(onnx_bisenet(input_tensor)[0], dim=1).numpy()
+
+        agreement = float((torch_mask == onnx_mask).mean())
+        assert agreement >= 0.999, f"마스크 일치율 낮음: {agreement:.5f}"
+
+
+def test_swin_logit_parity(models):
+    """Swin 로짓 / 예측 단계 일치 (배치 1과 배치 N 모두)"""
+    swin, bisenet, onnx_swin, _ = models
+    inputs = []
+    for image_bytes in _fixed_image_set():
+        context = ImagePreprocessContext(image_bytes, bisenet, DEVICE)
+        inputs.append(preprocess_image_with_mask(image_bytes, context.hair_mask(), context=context))
+    batch = torch.stack(inputs)
+
+    with torch.no_grad():
+        torch_logits = swin(batch)
+    onnx_logits = onnx_swin(batch)
+
+    np.testing.assert_allclose(onnx_logits.numpy(), torch_logits.numpy(), rtol=1e-3, atol=1e-4)
+    assert torch.equal(torch.argmax(onnx_logits, dim=1), torch.argmax(torch_logits, dim=1))
+
+    # 배치 1 결과도 배치 실행과 같아야 함 (동적 배치 차원 확인)
+    single = onnx_swin(batch[:1])
+    np.testing.assert_allclose(single.numpy(), onnx_logits[:1].numpy(), rtol=1e-3, atol=1e-4)
@@ -0,0 +1,70 @@
+"""
+분류 결과 캐시 테스트
+BiSeNet/Swin 실패로 생긴 degraded 결과('error', 한쪽 뷰만 남은 single_model_*)는 캐시하지 않고,
+모든 뷰가 성공한 결과만 캐시하는지 확인 (run_classification을 스텁으로 교체, 모델 로드 없음)
+"""
+import pytest
+
+pytest.importorskip("torch")
+
+from services.swin_hair_classification import hair_swin_check
+
+
+@pytest.fixture
+def classify(monkeypatch):
+    """run_classification 호출 횟수를 세고 지정한 결과를 반환하는 classify_hair_with_swin"""
+    monkeypatch.setattr(hair_swin_check, "SWIN_RESULT_CACHE", True)
+    calls = []
+
+    def _classify(top, side, fused_result):
+        def fake_run(*args, **kwargs):
+            calls.append(args)
+            return dict(fused_result)
+        monkeypatch.setattr(hair_swin_check, "run_classification", fake_run)
+        return hair_swin_check.classify_hair_with_swin(top, side)
+
+    return _classify, calls
+
+
+def test_error_result_not_cached(classify):
+    _classify, calls = classify
+    error = {'stage': 0, 'confidence': 0.5, 'source': 'error'}
+
+    _, cache_key = _classify(b"error-top", None, error)
+    _classify(b"error-top", None, error)
+
+    assert cache_key is None
+    assert len(calls) == 2
+
+
+def test_single_view_result_not_cached_when_side_sent(classify):
+    _classify, calls = classify
+    top_only = {'stage': 2, 'confidence': 0.8, 'source': 'single_model_top',
+                'weights': {'top': 1.0, 'side': 0.0, 'survey': 0.0}}
+
+    _, cache_key = _classify(b"partial-top", b"partial-side", top_only)
+    _classify(b"partial-top", b"partial-side", top_only)
+
+    assert cache_key is None
+    assert len(calls) == 2
+
+
+def test_complete_results_cached(classify):
+    _classify, calls = classify
+    top_only = {'stage': 1, 'confidence': 0.9, 'source': 'single_model_top',
+                'weights': {'top': 1.0, 'side': 0.0, 'survey': 0.0}}
+    dual = {'stage': 3, 'confidence': 0.7, 'source': 'dual_model',
+            'weights': {'top': 0.6, 'side': 0.4, 'survey': 0.0}}
+
+    # Top만 보낸 요청의 single_model_top은 정상 결과
+    _, top_key = _classify(b"female-top", None, top_only)
+    result, _ = _classify(b"female-top", None, top_only)
+    assert top_key is not None
+    assert result['stage'] == 1
+    assert len(calls) == 1
+
+    _, dual_key = _classify(b"male-top", b"male-side", dual)
+    result, _ = _classify(b"male-top", b"male-side", dual)
+    assert dual_key is not None
+    assert result['stage'] == 3
+    assert len(calls) == 2
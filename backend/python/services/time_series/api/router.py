@@ -18,6 +18,7 @@ from ..models.schemas import (
 )
 from ..services import analysis_service
 from ..services.density_visualizer import DensityVisualizer
+from services.common.worker_pools import cpu_pool
 
 logger = logging.getLogger(__name__)
 
@@ -48,8 +49,10 @@ async def root():
 async def analyze_single_image(request: ImageAnalysisRequest):
     """단일 이미지 분석 (밀도 + feature)"""
     try:
-        result = analysis_service.analyze_single_image(request.image_url)
+        result = await cpu_pool.run(analysis_service.analyze_single_image, request.image_url)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ 분석 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -59,11 +62,14 @@ async def analyze_single_image(request: ImageAnalysisRequest):
 async def compare_timeseries(request: TimeSeriesRequest):
     """시계열 비교 분석"""
     try:
-        result = analysis_service.compare_timeseries(
+        result = await cpu_pool.run(
+            analysis_service.compare_timeseries,
             request.current_image_url,
             request.past_image_urls
         )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ 시계열 분석 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -31,6 +31,15 @@ def _initialize_models():
     """모델 초기화 (lazy loading) - 밀도 분석만"""
     global _density_analyzer  # , _feature_extractor
 
+    if _density_analyzer is None and _bisenet_singleton is None:
+        # 프로세스 전역 모델 레지스트리의 BiSeNet 공유 (Swin 분석과 같은 인스턴스)
+        try:
+            from services.swin_hair_classification.hair_swin_check import get_shared_model
+            _density_analyzer = DensityAnalyzer(model_provider=lambda: get_shared_model('face_parsing'))
+            logger.info("✅ DensityAnalyzer 초기화 완료 (공유 BiSeNet)")
+        except ImportError as e:
+            logger.warning(f"   공유 모델 레지스트리 사용 불가, 직접 로드: {e}")
+
     if _density_analyzer is None:
         logger.info("🔄 DensityAnalyzer 초기화 중...")
 
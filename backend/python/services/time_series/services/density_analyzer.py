@@ -12,7 +12,8 @@ time_series_dir = os.path.dirname(current_dir)  # time_series/
 services_root = os.path.dirname(time_series_dir)  # services/
 sys.path.insert(0, services_root)
 
-from swin_hair_classification.models.face_parsing.model import BiSeNet
+from swin_hair_classification.models.face_parsing.model import BiSeNet, parse_face
+from swin_hair_classification.checkpoints import load_checkpoint_into, checkpoint_exists
 import torch
 import cv2
 import numpy as np
@@ -23,19 +24,28 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# BiSeNet 1/8 해상도 argmax + nearest 업샘플 모드 (기본 비활성화)
+BISENET_FAST_ARGMAX = os.getenv("BISENET_FAST_ARGMAX", "false").lower() == "true"
+
 
 class DensityAnalyzer:
     """BiSeNet 기반 헤어 밀도 측정기"""
 
-    def __init__(self, bisenet_model=None, device='cpu'):
+    def __init__(self, bisenet_model=None, device='cpu', model_provider=None):
         """
         Args:
             bisenet_model: 외부에서 주입받은 BiSeNet 모델 (싱글턴)
             device: 'cpu' 또는 'cuda'
+            model_provider: 호출할 때마다 공유 BiSeNet을 반환하는 함수 (프로세스 전역 모델 레지스트리)
         """
         self.device = torch.device(device)
+        self._model_provider = model_provider
 
-        if bisenet_model is not None:
+        if model_provider is not None:
+            # 참조를 들고 있지 않고 매 호출마다 레지스트리에서 가져옴 (유휴 해제 가능)
+            self.model = None
+            print(f"✅ DensityAnalyzer: 공유 모델 레지스트리의 BiSeNet 사용")
+        elif bisenet_model is not None:
             # 외부에서 주입받은 싱글턴 모델 사용
             self.model = bisenet_model
             print(f"✅ DensityAnalyzer: 싱글턴 BiSeNet 모델 주입 완료")
@@ -47,7 +57,7 @@ class DensityAnalyzer:
     def _load_model(self):
         """BiSeNet 모델 로드 (레거시 - 하위 호환성)"""
         try:
-            self.model = BiSeNet(n_classes=19)
+            self.model = BiSeNet(n_classes=19, pretrained_backbone=False)  # 전체 체크포인트를 바로 로드하므로 백본 다운로드 생략
 
             # 모델 파일 경로 (상대 경로 수정 - services 폴더 기준)
             # 현재 위치: services/time_series/services/density_analyzer.py
@@ -67,10 +77,11 @@ class DensityAnalyzer:
                 '79999_iter.pth'
             )
 
-            if not os.path.exists(model_path):
+            if not checkpoint_exists(model_path):
                 raise FileNotFoundError(f"BiSeNet 모델 파일을 찾을 수 없습니다: {model_path}")
 
-            self.model.load_state_dict(torch.load(model_path, map_location=self.device))
+            # safetensors 변환본이 있으면 mmap 로드, 없으면 .pth
+            model_path = load_checkpoint_into(self.model, model_path, self.device)
             self.model.to(self.device)
             self.model.eval()
 
@@ -79,6 +90,19 @@ class DensityAnalyzer:
             print(f"❌ BiSeNet 모델 로드 실패: {e}")
             raise
 
+    def _resolve_model(self):
+        """사용할 BiSeNet과 입력 디바이스 (공유 모델이면 모델 파라미터의 디바이스를 따름)"""
+        if self._model_provider is None:
+            return self.model, self.device
+
+        model = self._model_provider()
+        try:
+            device = next(model.parameters()).device
+        except (AttributeError, StopIteration, TypeError):
+            # ONNX Runtime / INT8 TorchScript 래퍼는 CPU 입력
+            device = torch.device('cpu')
+        return model, device
+
     def calculate_density(self, image_bytes: bytes) -> dict:
         """
         이미지로부터 헤어 밀도 측정
@@ -107,12 +131,12 @@ class DensityAnalyzer:
                 transforms.ToTensor(),
                 transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225))
             ])
-            input_tensor = transform(image_resized).unsqueeze(0).to(self.device)
+            model, device = self._resolve_model()
+            input_tensor = transform(image_resized).unsqueeze(0).to(device)
 
-            # 3. BiSeNet으로 마스크 생성
+            # 3. BiSeNet으로 마스크 생성 (추론 전용 헤드, 보조 출력 생략)
             with torch.no_grad():
-                output = self.model(input_tensor)[0]
-                mask = torch.argmax(output, dim=1).squeeze().cpu().numpy()
+                mask = parse_face(model, input_tensor, fast=BISENET_FAST_ARGMAX).squeeze().cpu().numpy()
 
             # 4. 헤어 마스크 추출 (클래스 17)
             hair_mask = (mask == 17).astype(np.uint8) * 255
@@ -13,7 +13,8 @@ services_root = os.path.dirname(time_series_dir)  # services/
 sys.path.insert(0, services_root)
 
 from swin_hair_classification.models.swin_hair_classifier import SwinHairClassifier
-from swin_hair_classification.models.face_parsing.model import BiSeNet
+from swin_hair_classification.models.face_parsing.model import BiSeNet, parse_face
+from swin_hair_classification.checkpoints import load_checkpoint_into, checkpoint_exists
 import torch
 import numpy as np
 from PIL import Image
@@ -46,7 +47,7 @@ class FeatureExtractor:
                 print(f"✅ FeatureExtractor: 싱글턴 BiSeNet 모델 주입 완료")
             else:
                 # 하위 호환성: 직접 로드 (레거시)
-                self.face_parser = BiSeNet(n_classes=19)
+                self.face_parser = BiSeNet(n_classes=19, pretrained_backbone=False)  # 전체 체크포인트를 바로 로드하므로 백본 다운로드 생략
                 face_model_path = os.path.join(
                     os.path.dirname(os.path.dirname(__file__)),
                     'swin_hair_classification',
@@ -57,15 +58,17 @@ class FeatureExtractor:
                     '79999_iter.pth'
                 )
 
-                if not os.path.exists(face_model_path):
+                if not checkpoint_exists(face_model_path):
                     raise FileNotFoundError(f"BiSeNet 모델 파일을 찾을 수 없습니다: {face_model_path}")
 
-                self.face_parser.load_state_dict(torch.load(face_model_path, map_location=self.device))
+                # safetensors 변환본이 있으면 mmap 로드, 없으면 .pth
+                load_checkpoint_into(self.face_parser, face_model_path, self.device)
                 self.face_parser.to(self.device)
                 self.face_parser.eval()
                 print(f"✅ BiSeNet 로드 완료 (레거시, 마스킹용)")
 
             # 2. Swin 모델 로드 (Top view)
+            # 공유 레지스트리의 swin_top은 ONNX / INT8 모델일 수 있어 forward_features가 없으므로 직접 로드
             self.swin_model = SwinHairClassifier(num_classes=4, in_chans=6)
             swin_model_path = os.path.join(
                 os.path.dirname(os.path.dirname(__file__)),
@@ -74,14 +77,10 @@ class FeatureExtractor:
                 'best_swin_hair_classifier_top.pth'
             )
 
-            if not os.path.exists(swin_model_path):
+            if not checkpoint_exists(swin_model_path):
                 raise FileNotFoundError(f"Swin 모델 파일을 찾을 수 없습니다: {swin_model_path}")
 
-            checkpoint = torch.load(swin_model_path, map_location=self.device)
-            if 'model_state_dict' in checkpoint:
-                self.swin_model.load_state_dict(checkpoint['model_state_dict'])
-            else:
-                self.swin_model.load_state_dict(checkpoint)
+            load_checkpoint_into(self.swin_model, swin_model_path, self.device)
 
             self.swin_model.to(self.device)
             self.swin_model.eval()
@@ -119,8 +118,7 @@ class FeatureExtractor:
             input_tensor_512 = transform_512(image_resized).unsqueeze(0).to(self.device)
 
             with torch.no_grad():
-                output = self.face_parser(input_tensor_512)[0]
-                mask = torch.argmax(output, dim=1).squeeze().cpu().numpy()
+                mask = parse_face(self.face_parser, input_tensor_512).squeeze().cpu().numpy()
 
             # 헤어 마스크 추출
             hair_mask = (mask == 17).astype(np.uint8) * 255